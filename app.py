@@ -1,55 +1,100 @@
+import hmac
 import os
+from functools import wraps
 
-from flask import Flask, render_template, request, flash, redirect, session, g, url_for
-from flask_debugtoolbar import DebugToolbarExtension
+from flask import Flask, Blueprint, abort, current_app, render_template, request, flash, redirect, session, g, url_for, jsonify, Response, stream_with_context
 from sqlalchemy.exc import IntegrityError
-from datetime import datetime
-from collections import defaultdict
-import calendar
-import plotly.graph_objs as go
-from plotly.offline import plot
-import plotly.express as px
-import pandas as pd
-import random
+from datetime import datetime, date
 from flask_migrate import Migrate
 from decimal import Decimal
-from forms import RegistrationForm, UserLoginForm, AccountCreationForm, BudgetCreationForm, TransactionForm, GoalCreationForm
-from models import db, connect_db, User, Accounts, Budgets, Transactions, Goals, Category, Expense
-from sqlalchemy import extract, func
+from config import CONFIGS, configure_database
+from forms import RegistrationForm, UserLoginForm, AccountCreationForm, BudgetCreationForm, TransactionForm, GoalCreationForm, ImportTransactionsForm
+from models import db, connect_db, User, Accounts, Budgets, Transactions, Goals
+from assets import assets
+from balance_snapshots import record_balance, rebuild_balance_snapshots
+from budget_spent import recompute_budget_spent
+from categories import category_registry
+from chart_cache import chart_cache
+from charts import CHART_DATA
+from compression import compression
+from dashboard import dashboard_snapshot
+from etags import etagged
+from data_version import bump_data_version
+from reconcile import find_drift, repair_drift
+from refresh import REFRESH_USER
+from routing import init_replica
+from search import search_transactions
+from synthetic import SeedPlan, seed
+from transaction_filters import TransactionFilter, filtered_transactions, SORTS, TYPES
+from exporter import export_rows, export_chunks, FORMATS as EXPORT_FORMATS
+from identity import CurrentUser, identity_cache
+from jobs import job_queue
+from metrics import metrics
+from passwords import password_hasher, PasswordHasherBusy
+from importer import import_transactions, guess_format, open_text
+from pagination import parse_per_page
+from monthly_totals import record_transaction, rebuild_monthly_totals
+import click
 
 
+CURR_USER_KEY = "user_id"
+BUSY_MESSAGE = "Lots of people are signing in right now. Please try again in a few seconds."
 
+# Routes and CLI commands live on this blueprint; create_app registers it
+main = Blueprint('main', __name__, cli_group=None)
+migrate = Migrate()
 
-# Initialize your Flask app instance
-app = Flask(__name__)
 
-# App configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = (os.environ.get('DATABASE_URL', 'postgresql:///financemanager'))
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SQLALCHEMY_ECHO'] = True
-app.config['DEBUG'] = True
-app.config['DEBUG_TB_INTERCEPT_REDIRECTS'] = False
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', "it's a secret")
-CURR_USER_KEY = "user_id"
-migrate = Migrate(app, db)
+def create_app(config='production'):
+    """Build the Flask app for a profile name ('development', 'production',
+    'testing') or a config class."""
+
+    app = Flask(__name__)
+    app.config.from_object(CONFIGS[config] if isinstance(config, str) else config)
+    configure_database(app.config)
+
+    # Connect the database to the Flask app
+    connect_db(app)
+    init_replica(app)
+    migrate.init_app(app, db)
+    chart_cache.init_app(app)
+    metrics.init_app(app)
+    job_queue.init_app(app)
+    password_hasher.init_app(app)
+    compression.init_app(app)
+    assets.init_app(app)
+    identity_cache.init_app(app)
+    category_registry.init_app(app)
+    app.jinja_env.globals['category_name'] = category_registry.name
+
+    if app.config.get('DEBUG_TB_ENABLED'):
+        from flask_debugtoolbar import DebugToolbarExtension
+        DebugToolbarExtension(app)
 
-toolbar = DebugToolbarExtension(app)
+    app.register_blueprint(main)
 
-# Connect the database to the Flask app
-connect_db(app)
+    return app
 
 
-@app.before_request
+@main.before_app_request
 def add_user_to_g():
     """If we're logged in, add curr user to Flask global."""
 
     if CURR_USER_KEY in session:
-        g.user = User.query.get(session[CURR_USER_KEY])
+        g.user = CurrentUser(session[CURR_USER_KEY])
 
     else:
         g.user = None
 
 
+def data_changed(user_id):
+    """Record a write to the user's data: bump its version, and refresh the
+    derived data in the background once the write commits."""
+
+    bump_data_version(user_id)
+    job_queue.defer(REFRESH_USER, user_id)
+
+
 def do_login(user):
     """Log in user."""
 
@@ -62,169 +107,8 @@ def do_logout():
     if CURR_USER_KEY in session:
         del session[CURR_USER_KEY]
 
-def random_value():
-    # Return a random integer between 1000 and 5000 for example purposes
-    return random.randint(1000, 5000)
-
-
-##### get data from last n monts
-    
-def get_financial_data(user_id):
-
-    year = datetime.now().year
-
-    transactions = db.session.query(
-        extract('month', Transactions.date).label('month'),
-        Transactions.type,
-        db.func.sum(Transactions.amount).label('total')
-    ).filter(
-        Transactions.user_id == user_id,
-        extract('year', Transactions.date) == year
-    ).group_by(
-        extract('month', Transactions.date),
-        Transactions.type
-    ).all()
-
-    income = [0] * 12 
-    spending = [0] * 12
-
-    for transaction in transactions:
-        month_index = int(transaction.month) - 1
-        if transaction.type == 'income':
-            income[month_index] += transaction.total 
-        else:
-            spending[month_index] += transaction.total 
-
-
-    months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-
-    return months, income, spending
-
-
-# CHARTS
-def create_budget_vs_spent_chart(user_id):
-    user_budgets = Budgets.query.filter_by(user_id=user_id).all()
-
-    categories = [budget.category.name for budget in user_budgets]
-    budgeted_amounts = [budget.amount for budget in user_budgets]
-    
-    spent_amounts = [budget.spent if budget.spent else 0 for budget in user_budgets]
-
-    remaining_budget = [max(0, b - s) for b, s in zip(budgeted_amounts, spent_amounts)]
-
-    fig = go.Figure(data=[
-        go.Pie(
-            labels=categories, 
-            values=remaining_budget, 
-            hole=0.3,
-            sort=False
-        )
-    ])
-
-    fig.update_layout(
-        title_text='Remaining Budget by Category',
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)'
-    )
-
-    budget_chart_div = plot(fig, output_type='div', include_plotlyjs=False)
-    
-    return budget_chart_div
-
-def create_account_balance_chart(user_id):
-    user_accounts = Accounts.query.filter_by(user_id=user_id).all()
-    plot_data = []
-
-    if not user_accounts:
-        return None
-
-    for account in user_accounts:
-        transactions = Transactions.query.filter_by(account_id=account.id).order_by(Transactions.date).all()
-        if not transactions:
-            continue
-
-        dates = [transaction.date for transaction in transactions]
-        balances = [0]
-        balance = 0
-
-        for transaction in transactions:
-            balance += transaction.amount
-            balances.append(balance)
-
-        plot_data.append(go.Scatter(x=dates, y=balances, mode='lines+markers', name=account.name))
-
-    if not plot_data:
-        return None
-
-    fig = go.Figure(data=plot_data)
-    fig.update_layout(
-        title='Account Balance Over Time',
-        xaxis=dict(title='Date'),
-        yaxis=dict(title='Balance'),
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)'
-    )
-
-    balance_chart_div = plot(fig, output_type='div', include_plotlyjs=False)
-    return balance_chart_div
-
-def generate_accounts_balance_chart(user_id):
-    account_types_balances =db.session.query(
-        Accounts.account_type,
-        func.sum(Accounts.balance).label('total_balance')
-    ).filter(Accounts.user_id == user_id).group_by(Accounts.account_type).all()
-
-    account_types = [result.account_type for result in account_types_balances]
-    balances = [float(result.total_balance) for result in account_types_balances]
-
-    fig = go.Figure(data=[go.Pie(labels=account_types, values=balances, hole=0.3,
-                                 textinfo='label+value',
-                                 texttemplate='%{label}: $%{value:,}',
-                                 insidetextorientation='radial'
-                                 )])
-    fig.update_layout(title='Accounts Balance Overview', paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)')
-    plot_div = plot(fig, output_type='div', include_plotlyjs=False)
-    return plot_div
-
-def generate_financials_chart(user_id):
-    monthly_financials = db.session.query(
-        extract('month', Transactions.date).label('month'),
-        extract('year', Transactions.date).label('year'),
-        Transactions.type,
-        func.sum(Transactions.amount).label('total_amount')
-    ).filter(Transactions.user_id == user_id).group_by('month', 'year', Transactions.type).all()
-
-    income_by_month = defaultdict(float)
-    expenses_by_month = defaultdict(float)
-
-    for financial in monthly_financials:
-        month = int(financial.month)
-        year = int(financial.year)
-        month_year_key = f"{year}-{month:02d}"
-        if financial.type == 'income':
-            income_by_month[month_year_key] += float(financial.total_amount)
-        elif financial.type == 'expense':
-            expenses_by_month[month_year_key] += abs(float(financial.total_amount))
-
-    all_months = sorted(set(income_by_month.keys()) | set(expenses_by_month.keys()))
-    income_amounts = [income_by_month[month] for month in all_months]
-    spending_amounts = [expenses_by_month[month] for month in all_months]
-
-    fig = go.Figure(data=[
-        go.Bar(name='Income', x=all_months, y=income_amounts),
-        go.Bar(name='Spending', x=all_months, y=spending_amounts)
-    ])
-    fig.update_layout(barmode='group', title='Monthly Spending and Income', paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)')
-    plot_div = plot(fig, output_type='div', include_plotlyjs=False)
-
-    return plot_div
-
-
-
 ##########homepages, login, logout, signup########################################
-@app.route('/test-commit')
+@main.route('/test-commit')
 def test_commit():
     user = User.query.first()
     if user:
@@ -235,30 +119,23 @@ def test_commit():
 
 
 
-@app.route('/')
+@main.route('/')
 def home():
 
     return render_template('homepage.html')
 
-@app.route('/main-page')
+@main.route('/main-page')
+@etagged
 def after_login():
     if g.user:
-        accounts_plot_div = generate_accounts_balance_chart(g.user.id)
-        financials_plot_div = generate_financials_chart(g.user.id)
-
-        accounts = Accounts.query.filter_by(user_id=g.user.id).all()
-        transactions = Transactions.query.filter_by(user_id=g.user.id).order_by(Transactions.date.desc()).all()
-        budgets = Budgets.query.filter_by(user_id=g.user.id).all()
-        goals = Goals.query.filter_by(user_id=g.user.id).all()
-        print(session) 
-        return render_template('main-page.html', accounts=accounts, transactions=transactions,
-                               budgets=budgets, goals=goals, accounts_plot_div=accounts_plot_div,
-                               financials_plot_div=financials_plot_div)
+        snapshot = dashboard_snapshot(g.user.id)
+        return render_template('main-page.html', transactions=snapshot.recent_transactions,
+                               charts=snapshot.charts())
     else:
         return render_template('main-page.html', message="Please log in to view this page.") 
 
     
-@app.route('/signup', methods=['GET', 'POST'])
+@main.route('/signup', methods=['GET', 'POST'])
 def registration():
     """Signup Page"""
     form = RegistrationForm()
@@ -276,49 +153,56 @@ def registration():
         except IntegrityError:
             flash("Username already taken", "danger")
             return render_template('signup.html', form=form)
+        except PasswordHasherBusy:
+            flash(BUSY_MESSAGE, "warning")
+            return render_template('signup.html', form=form), 503, {'Retry-After': '5'}
         
         do_login(user)
-        return redirect(url_for('after_login'))
+        return redirect(url_for('main.after_login'))
     else:
         return render_template('signup.html', form=form)
 
     
 
-@app.route('/login', methods=['GET', 'POST'])
+@main.route('/login', methods=['GET', 'POST'])
 def login():
     """Handle user login"""
 
     form = UserLoginForm()
 
     if form.validate_on_submit():
-        user = User.authentication(form.email.data,
-                                   form.password.data)
+        try:
+            user = User.authentication(form.email.data,
+                                       form.password.data)
+        except PasswordHasherBusy:
+            flash(BUSY_MESSAGE, "warning")
+            return render_template('login.html', form=form), 503, {'Retry-After': '5'}
         
         if user:
             do_login(user)
             flash("Welcome Back!", "success")
-            return redirect(url_for('after_login'))
+            return redirect(url_for('main.after_login'))
     
         flash("Invalid credentials.", "danger")
     
     return render_template('login.html', form=form)
 
-@app.route('/logout')
+@main.route('/logout')
 def logout():
     """Handle logout of user."""
 
     do_logout()
     flash("You have successfully logged out.", "success")
-    return redirect(url_for('home'))
+    return redirect(url_for('main.home'))
 
 
 #######adding account, transaction, setting goal, budget###########
-@app.route('/account/add', methods=["GET", "POST"])
+@main.route('/account/add', methods=["GET", "POST"])
 def addaccount():
     """Adding bank account"""
     if 'user_id' not in session:
         flash("You must be logged in to add an account.", "warning")
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
         print(session) 
     form = AccountCreationForm()
 
@@ -326,14 +210,16 @@ def addaccount():
         new_account = Accounts(name=form.name.data,
                                account_type=form.account_type.data,
                                balance=form.balance.data,
+                               opening_balance=form.balance.data,
                                user_id=session['user_id'],
                                )
         print(session) 
         db.session.add(new_account)
+        data_changed(session['user_id'])
         try:
             db.session.commit()
             flash("Account added successfully.", "success")
-            return redirect(url_for('accounts'))
+            return redirect(url_for('main.accounts'))
         except Exception as e:
             db.session.rollback()
             flash("Error adding account. Please try again.", "danger")
@@ -343,15 +229,15 @@ def addaccount():
     return render_template('forms-templates/add-account.html', form=form)
 
 
-@app.route('/transaction/add', methods=['GET', 'POST'])
+@main.route('/transaction/add', methods=['GET', 'POST'])
 def addtransaction():
     if 'user_id' not in session:
         flash("You must be logged in to add a transaction.", "warning")
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
 
     form = TransactionForm()
     form.account_id.choices = [(str(account.id), account.name) for account in Accounts.query.filter_by(user_id=session['user_id']).all()]
-    form.category.choices = [(str(category.id), category.name) for category in Category.query.all()]
+    form.category.choices = category_registry.choices()
     
     if form.validate_on_submit():
         transaction_type = form.type.data
@@ -364,11 +250,6 @@ def addtransaction():
 
         transaction_amount = Decimal(form.amount.data)
 
-        if transaction_type == 'income':
-            account.balance += transaction_amount
-        else: 
-            account.balance -= transaction_amount
-
         new_transaction = Transactions(
             type=transaction_type,
             description=form.description.data,
@@ -379,6 +260,8 @@ def addtransaction():
             category_id=category_id
         )
         db.session.add(new_transaction)
+        record_transaction(new_transaction)
+        record_balance(new_transaction)
 
 
         if transaction_type == 'expense':
@@ -395,37 +278,74 @@ def addtransaction():
                     active_budget.spent = Decimal('0')
                 active_budget.spent += transaction_amount
 
+        data_changed(session['user_id'])
         db.session.commit()
         flash('Transaction added successfully!', 'success')
-        return redirect(url_for('transactions'))
+        return redirect(url_for('main.transactions'))
 
     return render_template('forms-templates/add-transaction.html', form=form)
 
 
 
-        
-@app.route('/budget/set', methods=["GET", "POST"])
+
+@main.route('/transaction/import', methods=['GET', 'POST'])
+def importtransactions():
+    """Bulk import a CSV or OFX statement into one of the user's accounts"""
+    if 'user_id' not in session:
+        flash("You must be logged in to import transactions.", "warning")
+        return redirect(url_for('main.login'))
+
+    form = ImportTransactionsForm()
+    form.account_id.choices = [(account.id, account.name) for account in Accounts.query.filter_by(user_id=session['user_id']).all()]
+
+    if form.validate_on_submit():
+        account = Accounts.query.get(form.account_id.data)
+        if not account or account.user_id != session['user_id']:
+            flash("Account not found.", "danger")
+            return render_template('forms-templates/import-transactions.html', form=form)
+
+        upload = form.file.data
+        format = guess_format(upload.filename) if form.format.data == 'auto' else form.format.data
+
+        try:
+            result = import_transactions(open_text(upload.stream), account, format=format)
+            job_queue.defer(REFRESH_USER, account.user_id)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.exception("Importing a statement into account %s failed", account.id)
+            flash(f"Error importing statement: {e}. Nothing was imported.", "danger")
+            return render_template('forms-templates/import-transactions.html', form=form)
+
+        flash(f"Imported {result.imported} of {result.rows_read} transactions.",
+              "success" if not result.error_count else "warning")
+        return render_template('forms-templates/import-transactions.html', form=form, result=result)
+
+    return render_template('forms-templates/import-transactions.html', form=form)
+
+
+@main.route('/budget/set', methods=["GET", "POST"])
 def setbudget():
     if 'user_id' not in session:
         flash("You must be logged in to set a budget.", "warning")
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     
     form = BudgetCreationForm()
 
 
-    form.category.choices = [(str(c.id), c.name) for c in Category.query.order_by('name').all()]
+    form.category.choices = category_registry.choices()
     print("Category Choices:", form.category.choices)
 
     if form.validate_on_submit():
         category_id = int(form.category.data)
-        category = Category.query.get(category_id)
+        category_name = category_registry.name(category_id)
     
-        if category is None:
+        if category_name is None:
             flash(f"Category with ID '{category_id}' does not exist.", "danger")
-            return redirect(url_for('setbudget'))
+            return redirect(url_for('main.setbudget'))
     
         new_budget = Budgets(
-            category_name=category.name,
+            category_name=category_name,
             amount=form.amount.data,
             start_date=form.start_date.data,
             end_date=form.end_date.data,
@@ -434,10 +354,13 @@ def setbudget():
         )
 
         db.session.add(new_budget)
+        data_changed(session['user_id'])
         try:
+            db.session.flush()
+            recompute_budget_spent(budget_id=new_budget.id)
             db.session.commit()
             flash("Budget added.", "success")
-            return redirect(url_for('budgets'))
+            return redirect(url_for('main.budgets'))
         except Exception as e:
             db.session.rollback()
             flash("Error setting budget.", "danger")
@@ -448,11 +371,11 @@ def setbudget():
 
 
 
-@app.route('/goal/set', methods=["GET", "POST"])
+@main.route('/goal/set', methods=["GET", "POST"])
 def setgoal():
     if 'user_id' not in session:
         flash("You must be logged in to set a budget.", "warning")
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     
     form = GoalCreationForm()
 
@@ -462,11 +385,12 @@ def setgoal():
                          user_id=session['user_id'],
                          )
         db.session.add(new_goal)
+        data_changed(session['user_id'])
 
         try:
             db.session.commit()
             flash("Goal added.", "success")
-            return redirect(url_for('goals'))
+            return redirect(url_for('main.goals'))
         except Exception as e:
             db.session.rollback()
             flash("Error setting goal.", "danger")
@@ -477,113 +401,446 @@ def setgoal():
 
 #####goals, transactions, accounts, budgets page###################
 
-@app.route('/account')
+@main.route('/account')
+@etagged
 def accounts():
     if 'user_id' not in session:
         flash("You must be logged in to view accounts.", "warning")
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     
     user_id = session['user_id']
-    balance_chart_div = create_account_balance_chart(user_id)
     user_accounts = Accounts.query.filter_by(user_id=user_id).all()
 
-    return render_template('mainpages/accounts.html', accounts=user_accounts, balance_chart_div=balance_chart_div)
+    return render_template('mainpages/accounts.html', accounts=user_accounts)
 
 
 
-@app.route('/budget')
+@main.route('/budget')
+@etagged
 def budgets():
     if 'user_id' not in session:
         flash("You must be logged in to view accounts.", "warning")
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     
     user_id = session['user_id']
     budgets = Budgets.query.filter_by(user_id=user_id).all()
 
-    budget_chart_div = create_budget_vs_spent_chart(session['user_id'])
-    
-
-    return render_template('mainpages/budgets.html', budget_chart_div=budget_chart_div, budgets=budgets)
+    return render_template('mainpages/budgets.html', budgets=budgets)
 
-@app.route('/goal')
+@main.route('/goal')
+@etagged
 def goals():
     if 'user_id' not in session:
         flash("You must be logged in to view accounts.", "warning")
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     user_id = session['user_id']
     user_goals = Goals.query.filter_by(user_id=user_id).all()
 
     return render_template('mainpages/goals.html', goals=user_goals)
 
-@app.route('/transaction')
+def _transaction_json(transaction):
+    return {
+        'id': transaction.id,
+        'date': transaction.date.isoformat() if transaction.date else None,
+        'type': transaction.type,
+        'description': transaction.description,
+        'amount': str(transaction.amount),
+        'account_id': transaction.account_id,
+        'category_id': transaction.category_id,
+    }
+
+
+@main.route('/transaction')
+@etagged
 def transactions():
     if 'user_id' not in session:
         flash("You must be logged in to view accounts.", "warning")
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     user_id = session['user_id']
-    user_transactions = Transactions.query.filter_by(user_id=user_id).all()
+    try:
+        transaction_filter = TransactionFilter.from_args(request.args)
+    except ValueError as error:
+        flash(str(error), "warning")
+        transaction_filter = TransactionFilter()
+    show_totals = bool(request.args.get('totals'))
+
+    page = filtered_transactions(
+        user_id, transaction_filter,
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        per_page=parse_per_page(request.args.get('per_page')),
+        with_subtotals=show_totals
+    )
+    accounts = db.session.query(Accounts.id, Accounts.name).filter_by(user_id=user_id).order_by(Accounts.name).all()
+    filter_args = dict(transaction_filter.to_args(), **({'totals': '1'} if show_totals else {}))
+
+    return render_template('mainpages/transactions.html', transactions=page.items, page=page,
+                           transaction_filter=transaction_filter, filter_args=filter_args,
+                           accounts=accounts, categories=category_registry.choices(),
+                           types=TYPES, sorts=SORTS)
+
+
+@main.route('/api/transactions')
+@etagged
+def transactions_api():
+    """JSON listing: ?start=&end=&type=&account_id=&category_id=&min_amount=&max_amount=&sort=
+    &after=&before=&per_page=, plus count=1 and/or subtotals=1 for the aggregates"""
+
+    if 'user_id' not in session:
+        return jsonify(error="You must be logged in to view transactions."), 401
+    try:
+        transaction_filter = TransactionFilter.from_args(request.args)
+    except ValueError as error:
+        return jsonify(error=str(error)), 400
+
+    page = filtered_transactions(
+        session['user_id'], transaction_filter,
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        per_page=parse_per_page(request.args.get('per_page')),
+        with_count=bool(request.args.get('count')),
+        with_subtotals=bool(request.args.get('subtotals'))
+    )
+    result = dict(
+        transactions=[_transaction_json(transaction) for transaction in page.items],
+        next_cursor=page.next_cursor,
+        prev_cursor=page.prev_cursor,
+    )
+    if page.total is not None:
+        result['total'] = page.total
+    if page.subtotals is not None:
+        result['subtotals'] = [{
+            'category_id': subtotal.category_id,
+            'count': subtotal.count,
+            'income': str(subtotal.income),
+            'expenses': str(subtotal.expenses),
+        } for subtotal in page.subtotals]
+    return jsonify(result)
+
+
+def _search_args():
+    return dict(
+        terms=request.args.get('q', ''),
+        account_id=request.args.get('account_id', type=int),
+        category_id=request.args.get('category_id', type=int),
+        after=request.args.get('after'),
+        per_page=parse_per_page(request.args.get('per_page')),
+    )
+
+
+@main.route('/transaction/search')
+@etagged
+def search_transactions_page():
+    """Search the user's transactions by description"""
+    if 'user_id' not in session:
+        flash("You must be logged in to search transactions.", "warning")
+        return redirect(url_for('main.login'))
+
+    args = _search_args()
+    page = search_transactions(session['user_id'], **args) if args['terms'] else None
+    accounts = db.session.query(Accounts.id, Accounts.name).filter_by(user_id=session['user_id']).order_by(Accounts.name).all()
+
+    return render_template('mainpages/transaction-search.html', page=page, args=args,
+                           accounts=accounts, categories=category_registry.choices())
+
+
+@main.route('/api/transactions/search')
+@etagged
+def search_transactions_api():
+    """JSON search results: ?q=...&account_id=&category_id=&after=&per_page="""
 
-    return render_template('mainpages/transactions.html', transactions=user_transactions)
+    if 'user_id' not in session:
+        return jsonify(error="You must be logged in to search transactions."), 401
+
+    args = _search_args()
+    if not args['terms'].strip():
+        return jsonify(error="Give a search term as ?q=..."), 400
+
+    page = search_transactions(session['user_id'], **args)
+    return jsonify(
+        transactions=[_transaction_json(transaction) for transaction in page.items],
+        next_cursor=page.next_cursor,
+    )
+
+
+@main.route('/transaction/export')
+def export_transactions():
+    """Download the user's transactions as CSV or NDJSON, optionally filtered"""
+    if 'user_id' not in session:
+        flash("You must be logged in to export transactions.", "warning")
+        return redirect(url_for('main.login'))
+
+    format = request.args.get('format', 'csv')
+    if format not in EXPORT_FORMATS:
+        return f"Unknown export format '{format}'.", 400
+
+    try:
+        start = date.fromisoformat(request.args['start']) if request.args.get('start') else None
+        end = date.fromisoformat(request.args['end']) if request.args.get('end') else None
+    except ValueError:
+        return "Dates must be given as YYYY-MM-DD.", 400
+
+    rows = export_rows(session['user_id'], start=start, end=end,
+                       account_id=request.args.get('account_id', type=int))
+
+    return Response(
+        stream_with_context(export_chunks(rows, format)),
+        mimetype=EXPORT_FORMATS[format],
+        headers={'Content-Disposition': f'attachment; filename=transactions.{format}'}
+    )
 
 
 ######Deleting goals, transactions, acccounts and budgets##############
 
-@app.route('/account/delete/<int:account_id>', methods=['POST'])
+@main.route('/account/delete/<int:account_id>', methods=['POST'])
 def delete_account(account_id):
     if 'user_id' not in session:
         flash("You must be logged in to perform this action.", "warning")
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     
     account_to_delete = Accounts.query.get_or_404(account_id)
     if account_to_delete.user_id != session['user_id']:
         flash("You do not have permission to delete this account.", "danger")
-        return redirect(url_for('accounts'))
+        return redirect(url_for('main.accounts'))
 
     db.session.delete(account_to_delete)
+    data_changed(session['user_id'])
     db.session.commit()
     flash("Account deleted successfully.", "success")
-    return redirect(url_for('accounts'))
+    return redirect(url_for('main.accounts'))
 
-@app.route('/goal/delete/<int:goal_id>', methods=["POST"])
+@main.route('/goal/delete/<int:goal_id>', methods=["POST"])
 def delete_goal(goal_id):
     if 'user_id' not in session:
         flash("You must be logged in to perform this action.", "warning")
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     
     goal_to_delete = Goals.query.get_or_404(goal_id)
     if goal_to_delete.user_id != session['user_id']:
         flash("You do not have permission to delete this account.", "danger")
-        return redirect(url_for('goals'))
+        return redirect(url_for('main.goals'))
     db.session.delete(goal_to_delete)
+    data_changed(session['user_id'])
     db.session.commit()
     flash("Goal deleted successfully.", "success")
-    return redirect(url_for('goals'))
+    return redirect(url_for('main.goals'))
 
-@app.route('/budget/delete/<int:budget_id>', methods=["POST"])
+@main.route('/budget/delete/<int:budget_id>', methods=["POST"])
 def delete_budget(budget_id):
     if 'user_id' not in session:
         flash("You must be logged in to perform this action.", "warning")
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     
     budget_to_delete = Budgets.query.get_or_404(budget_id)
     if budget_to_delete.user_id != session['user_id']:
-        return redirect(url_for('budgets'))
+        return redirect(url_for('main.budgets'))
     db.session.delete(budget_to_delete)
+    data_changed(session['user_id'])
     db.session.commit()
     flash("budget deleted successfully.", "success")
-    return redirect(url_for('budgets'))
+    return redirect(url_for('main.budgets'))
 
-@app.route('/transaction/delete/<int:transaction_id>', methods=["POST"])
+@main.route('/transaction/delete/<int:transaction_id>', methods=["POST"])
 def delete_transaction(transaction_id):
     if 'user_id' not in session:
         flash("Yu must be logged in to perform this action.", "warning")
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     
     transaction_to_delete = Transactions.query.get_or_404(transaction_id)
     if transaction_to_delete.user_id != session['user_id']:
-        return redirect(url_for('transactions'))
+        return redirect(url_for('main.transactions'))
+    record_transaction(transaction_to_delete, sign=-1)
+    record_balance(transaction_to_delete, sign=-1)
     db.session.delete(transaction_to_delete)
+    data_changed(session['user_id'])
     db.session.commit()
     flash("Transaction deleted successfully.", "success")
-    return redirect(url_for('transactions'))
-    
+    return redirect(url_for('main.transactions'))
+
+
+#####chart data api###################
+
+@main.route('/api/charts/<name>')
+@etagged
+def chart_data(name):
+    """JSON series for one chart, drawn client-side by static/charts.js."""
+
+    if 'user_id' not in session:
+        return jsonify(error="You must be logged in to view charts."), 401
+    if name not in CHART_DATA:
+        return jsonify(error=f"Unknown chart '{name}'."), 404
+
+    return jsonify(CHART_DATA[name](session['user_id']))
+
+
+#####operational endpoints###################
+
+def internal_only(view):
+    """Serve a view only to requests bearing the METRICS_TOKEN.
+
+    Without a token configured the route answers 404, so worker counters
+    and cache internals are never public by default.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = current_app.config.get('METRICS_TOKEN')
+        if not token:
+            abort(404)
+        supplied = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(supplied.encode(), f'Bearer {token}'.encode()):
+            return Response("A valid bearer token is required.", 401, {'WWW-Authenticate': 'Bearer'})
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+@main.route('/cache/stats')
+@internal_only
+def cache_stats():
+    """Hit/miss counters of this worker's chart cache."""
+
+    return jsonify(chart_cache.stats())
+
+
+@main.route('/metrics')
+@internal_only
+def metrics_endpoint():
+    """Per-endpoint latency, SQL and chart-building metrics for Prometheus."""
+
+    if not current_app.config['METRICS_ENABLED']:
+        abort(404)
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+######command line##############
+
+@main.cli.command('rebuild-monthly-totals')
+@click.option('--user-id', type=int, default=None, help="Only rebuild this user's rollup.")
+def rebuild_monthly_totals_command(user_id):
+    """Rebuild the monthly_totals rollup from the transactions table."""
+
+    rows = rebuild_monthly_totals(user_id)
+    db.session.commit()
+    click.echo(f"Rebuilt monthly totals: {rows} rows.")
+
+
+@main.cli.command('rebuild-balance-snapshots')
+@click.option('--user-id', type=int, default=None, help="Only this user's accounts.")
+@click.option('--account-id', type=int, default=None, help="Only this account.")
+def rebuild_balance_snapshots_command(user_id, account_id):
+    """Rebuild the end-of-day account balance snapshots from the transactions table."""
+
+    rows = rebuild_balance_snapshots(user_id=user_id, account_id=account_id)
+    db.session.commit()
+    click.echo(f"Rebuilt balance snapshots: {rows} rows.")
+
+
+@main.cli.command('reconcile-balances')
+@click.option('--user-id', type=int, default=None, help="Only this user's accounts.")
+@click.option('--repair', is_flag=True, help="Write the ledger balance to drifted accounts.")
+@click.option('--batch-size', type=int, default=10000, show_default=True, help="Rows fetched per round trip.")
+def reconcile_balances_command(user_id, repair, batch_size):
+    """Report accounts whose stored balance differs from their ledger, optionally repairing them."""
+
+    drifted = 0
+    for drift in find_drift(user_id=user_id, batch_size=batch_size):
+        drifted += 1
+        click.echo(f"account {drift.account_id} (user {drift.user_id}): stored {drift.stored}, "
+                   f"ledger {drift.expected}")
+    click.echo(f"{drifted} accounts drifted from their ledger.")
+
+    if repair and drifted:
+        accounts, users = repair_drift(user_id=user_id)
+        db.session.commit()
+        click.echo(f"Repaired {accounts} accounts of {users} users.")
+
+
+@main.cli.command('recompute-budgets')
+@click.option('--user-id', type=int, default=None, help="Only this user's budgets.")
+@click.option('--budget-id', type=int, default=None, help="Only this budget.")
+def recompute_budgets_command(user_id, budget_id):
+    """Rebuild Budgets.spent from transactions in one set-based pass."""
+
+    changed = recompute_budget_spent(budget_id=budget_id, user_id=user_id)
+    db.session.commit()
+    click.echo(f"Recomputed budgets: {changed} changed.")
+
+
+@main.cli.command('export-transactions')
+@click.option('--user-id', type=int, required=True)
+@click.option('--format', 'format', type=click.Choice(sorted(EXPORT_FORMATS)), default='csv')
+@click.option('--start', type=click.DateTime(formats=['%Y-%m-%d']), default=None)
+@click.option('--end', type=click.DateTime(formats=['%Y-%m-%d']), default=None)
+@click.option('--account-id', type=int, default=None)
+@click.option('--output', type=click.File('w'), default='-', help="File to write to (default: stdout).")
+def export_transactions_command(user_id, format, start, end, account_id, output):
+    """Stream a user's transactions as CSV or NDJSON."""
+
+    rows = export_rows(user_id, start=start.date() if start else None,
+                       end=end.date() if end else None, account_id=account_id)
+    for chunk in export_chunks(rows, format):
+        output.write(chunk)
+
+
+@main.cli.command('import-transactions')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--account-id', type=int, required=True, help="Account to import into.")
+@click.option('--format', 'format', type=click.Choice(['auto', 'csv', 'ofx']), default='auto')
+@click.option('--batch-size', type=int, default=5000)
+def import_transactions_command(path, account_id, format, batch_size):
+    """Bulk import a CSV or OFX statement file into an account."""
+
+    account = db.session.get(Accounts, account_id)
+    if account is None:
+        raise click.ClickException(f"Account {account_id} not found.")
+    if format == 'auto':
+        format = guess_format(path)
+
+    def progress(result):
+        click.echo(f"  {result.rows_read} rows read, {result.imported} imported, {result.error_count} errors")
+
+    with open(path, encoding='utf-8-sig', errors='replace', newline='') as stream:
+        result = import_transactions(stream, account, format=format, batch_size=batch_size, progress=progress)
+    job_queue.defer(REFRESH_USER, account.user_id)
+    db.session.commit()
+
+    for line, message in result.errors:
+        click.echo(f"line {line}: {message}", err=True)
+    if result.error_count > len(result.errors):
+        click.echo(f"... and {result.error_count - len(result.errors)} more errors", err=True)
+    click.echo(f"Imported {result.imported} of {result.rows_read} rows into account {account_id}.")
+
+
+@main.cli.command('seed')
+@click.option('--users', type=int, default=10, show_default=True)
+@click.option('--accounts', type=int, default=3, show_default=True, help="Most accounts per user.")
+@click.option('--budgets', type=int, default=4, show_default=True, help="Budgets per user.")
+@click.option('--goals', type=int, default=2, show_default=True, help="Most goals per user.")
+@click.option('--years', type=int, default=3, show_default=True, help="Years of transaction history.")
+@click.option('--per-month', type=int, default=60, show_default=True, help="Average everyday expenses per user per month.")
+@click.option('--seed', 'random_seed', type=int, default=0, show_default=True)
+@click.option('--end-date', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help="Last day of history (default today).")
+@click.option('--chunk-size', type=int, default=50000, show_default=True, help="Transactions per COPY.")
+@click.option('--reset', is_flag=True, help="Drop and recreate all tables first.")
+def seed_command(users, accounts, budgets, goals, years, per_month, random_seed, end_date, chunk_size, reset):
+    """Generate synthetic users with accounts, budgets, goals and transactions."""
+
+    if reset:
+        db.drop_all()
+        db.create_all()
+
+    plan = SeedPlan(users=users, accounts=accounts, budgets=budgets, goals=goals, years=years,
+                    transactions_per_month=per_month, seed=random_seed,
+                    end_date=end_date.date() if end_date else None, chunk_size=chunk_size)
+
+    def progress(result):
+        click.echo(f"  {result.users} users, {result.transactions} transactions")
+
+    result = seed(plan, progress=progress)
+    db.session.commit()
+    click.echo(f"Seeded {result.users} users, {result.accounts} accounts, {result.budgets} budgets, "
+               f"{result.goals} goals and {result.transactions} transactions.")
+
+
+app = create_app(os.environ.get('WEALTHWATCHER_CONFIG', 'production'))
@@ -0,0 +1,128 @@
+"""Content-fingerprinted static assets.
+
+At startup every file under static/ is read and given a URL carrying a
+digest of its content, e.g. /assets/style.3f9a0c2b1d.css, which templates get
+from `asset_url('style.css')`. A changed file gets a new URL, so the old one
+can be cached by browsers and proxies for a year without revalidation.
+`url(...)` references inside stylesheets are rewritten to the fingerprinted
+names first, so the stylesheet's own digest covers the images it uses.
+
+Asset bodies are held in memory and compressed at most once per encoding,
+on first request; svg, css and js shrink by a factor of four or more. The
+manifest is built when the app is, so a changed file needs a restart.
+"""
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+import threading
+from collections import namedtuple
+
+from flask import Response, abort, request, url_for
+
+from compression import COMPRESSIBLE, compress, negotiate
+
+
+Asset = namedtuple('Asset', 'name fingerprinted digest body mimetype')
+
+CSS_URL = re.compile(r'''url\((['"]?)([^'")]+)\1\)''')
+# asset compression happens once per process, so spend more time on it;
+# brotli's top levels would hold the first request for plotly for seconds
+GZIP_LEVEL = 9
+BROTLI_LEVEL = 9
+
+
+def fingerprint(name, digest):
+    """'style.css' -> 'style.<digest>.css'."""
+
+    base, extension = posixpath.splitext(name)
+    return f"{base}.{digest}{extension}"
+
+
+class Assets:
+
+    def __init__(self):
+        self._by_name = {}
+        self._by_fingerprint = {}
+        self._compressed = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_age = app.config.setdefault('ASSETS_MAX_AGE', 365 * 24 * 3600)
+        self.load(app.static_folder)
+        app.add_url_rule(app.config.setdefault('ASSETS_URL_PATH', '/assets') + '/<path:filename>',
+                         'asset', self.send)
+        app.jinja_env.globals['asset_url'] = self.url
+
+    def load(self, folder):
+        names = []
+        for root, dirs, files in os.walk(folder):
+            dirs.sort()
+            names += [os.path.relpath(os.path.join(root, name), folder).replace(os.sep, '/') for name in sorted(files)]
+
+        by_name = {}
+        # stylesheets last, so the names they refer to are already fingerprinted
+        for name in sorted(names, key=lambda name: name.endswith('.css')):
+            with open(os.path.join(folder, name), 'rb') as file:
+                body = file.read()
+            if name.endswith('.css'):
+                body = self._rewrite_css(name, body, by_name)
+            mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+            digest = hashlib.sha256(body).hexdigest()[:10]
+            by_name[name] = Asset(name, fingerprint(name, digest), digest, body, mimetype)
+
+        with self._lock:
+            self._by_name = by_name
+            self._by_fingerprint = {asset.fingerprinted: asset for asset in by_name.values()}
+            self._compressed = {}
+
+    def _rewrite_css(self, name, body, by_name):
+        directory = posixpath.dirname(name)
+
+        def replace(match):
+            reference = match.group(2)
+            target = by_name.get(posixpath.normpath(posixpath.join(directory, reference)))
+            if target is None:
+                return match.group(0)
+            return f"url('{posixpath.relpath(target.fingerprinted, directory or '.')}')"
+
+        return CSS_URL.sub(replace, body.decode('utf-8')).encode('utf-8')
+
+    def url(self, name):
+        """URL of the static file `name` (relative to static/), fingerprinted."""
+
+        try:
+            asset = self._by_name[name]
+        except KeyError:
+            raise KeyError(f"No static asset named '{name}'") from None
+        return url_for('asset', filename=asset.fingerprinted)
+
+    def _body(self, asset, encoding):
+        if encoding is None or asset.mimetype not in COMPRESSIBLE:
+            return asset.body, None
+
+        key = (asset.fingerprinted, encoding)
+        body = self._compressed.get(key)
+        if body is None:
+            body = compress(asset.body, encoding, BROTLI_LEVEL if encoding == 'br' else GZIP_LEVEL)
+            with self._lock:
+                self._compressed[key] = body
+        return body, encoding
+
+    def send(self, filename):
+        asset = self._by_fingerprint.get(filename)
+        if asset is None:
+            abort(404)
+
+        body, encoding = self._body(asset, negotiate(request.accept_encodings))
+        response = Response(body, mimetype=asset.mimetype)
+        response.headers['Cache-Control'] = f'public, max-age={self.max_age}, immutable'
+        response.vary.add('Accept-Encoding')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.set_etag(asset.digest, weak=encoding is not None)
+        return response.make_conditional(request)
+
+
+assets = Assets()
@@ -0,0 +1,111 @@
+"""End-of-day account balances, so the balance on any date is one index lookup.
+
+account_balance_snapshots has a row for each account and day with
+transactions. The row holds the balance at the end of that day: the
+account's opening balance plus every transaction up to and including the
+day. The balance on date D is the latest row on or before D, or the opening
+balance when there is none.
+
+Writes keep the table current in their own transaction, through
+`record_balance`, which also moves Accounts.balance itself. A transaction
+shifts its day's row and every later one, so back-dated inserts and deletes
+need nothing special. `rebuild_balance_snapshots` recomputes it from the
+transactions table with one window query.
+"""
+from sqlalchemy import delete, func, insert, literal, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from models import db, Accounts, AccountBalanceSnapshot, Transactions
+
+
+snapshots = AccountBalanceSnapshot.__table__
+
+
+def balance_before(account_id, day, inclusive=False):
+    """SQL expression for the account's balance at the start (or end) of `day`."""
+
+    on_or_before = snapshots.c.date <= day if inclusive else snapshots.c.date < day
+    latest = select(snapshots.c.balance).where(
+        snapshots.c.account_id == account_id, on_or_before
+    ).order_by(snapshots.c.date.desc()).limit(1).scalar_subquery()
+    opening = select(Accounts.opening_balance).where(Accounts.id == account_id).scalar_subquery()
+    return func.coalesce(latest, opening, 0)
+
+
+def balance_as_of(account_id, day):
+    """The account's balance at the end of `day`."""
+
+    return db.session.execute(select(balance_before(account_id, day, inclusive=True))).scalar()
+
+
+def record_balance(transaction, sign=1):
+    """Apply a transaction to its account's balance and snapshots (sign=-1 takes it back out).
+
+    Runs in the caller's session so both commit together with the
+    transaction itself.
+    """
+
+    if transaction.date is None or transaction.type is None or transaction.amount is None:
+        return
+
+    apply_balance_delta(transaction.account_id, transaction.date, transaction.signed_amount * sign)
+
+
+def apply_balance_delta(account_id, day, delta):
+    """Add `delta` to the account's balance from the end of `day` onwards."""
+
+    # in SQL rather than on a loaded object, so concurrent writes cannot lose an update
+    db.session.execute(
+        update(Accounts).where(Accounts.id == account_id).values(balance=func.coalesce(Accounts.balance, 0) + delta)
+    )
+    # the day's row starts from the previous day's closing balance
+    db.session.execute(
+        pg_insert(snapshots).from_select(
+            ['account_id', 'date', 'balance'],
+            select(literal(account_id), literal(day, snapshots.c.date.type), balance_before(account_id, day))
+        ).on_conflict_do_nothing(index_elements=['account_id', 'date'])
+    )
+    db.session.execute(
+        update(snapshots)
+        .where(snapshots.c.account_id == account_id, snapshots.c.date >= day)
+        .values(balance=snapshots.c.balance + delta)
+    )
+
+
+def rebuild_balance_snapshots(user_id=None, account_id=None):
+    """Recompute the snapshots from the transactions table, for everyone, one user or one account."""
+
+    daily = select(
+        Transactions.account_id,
+        Transactions.date,
+        func.sum(Transactions.signed_amount).label('delta')
+    ).where(
+        Transactions.date.is_not(None),
+        Transactions.type.is_not(None),
+        Transactions.amount.is_not(None)
+    ).group_by(Transactions.account_id, Transactions.date)
+
+    accounts = select(Accounts.id)
+    if user_id is not None:
+        daily = daily.where(Transactions.user_id == user_id)
+        accounts = accounts.where(Accounts.user_id == user_id)
+    if account_id is not None:
+        daily = daily.where(Transactions.account_id == account_id)
+        accounts = accounts.where(Accounts.id == account_id)
+    daily = daily.subquery()
+
+    running = select(
+        daily.c.account_id,
+        daily.c.date,
+        Accounts.opening_balance + func.sum(daily.c.delta).over(
+            partition_by=daily.c.account_id, order_by=daily.c.date
+        )
+    ).join(Accounts, Accounts.id == daily.c.account_id)
+
+    clear = delete(snapshots)
+    if user_id is not None or account_id is not None:
+        clear = clear.where(snapshots.c.account_id.in_(accounts))
+
+    db.session.execute(clear)
+    result = db.session.execute(insert(snapshots).from_select(['account_id', 'date', 'balance'], running))
+    return result.rowcount
@@ -0,0 +1,85 @@
+"""Cold-start budget for the app factory.
+
+Each profile is started in a fresh interpreter, which reports how long
+importing the app module and building the app took, its peak RSS, and which
+heavy modules were imported along the way.
+
+    python bench_startup.py
+    python bench_startup.py --max-import-seconds 1.5 --max-rss-mb 150
+
+Exits non-zero when a profile goes over a budget, so CI catches regressions.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+
+CHILD = r'''
+import json, resource, sys, time
+
+start = time.perf_counter()
+import app as app_module
+imported = time.perf_counter()
+app_module.create_app(sys.argv[1])
+created = time.perf_counter()
+rss_after_start = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+heavy = sorted(name for name in ('plotly', 'pandas', 'flask_debugtoolbar') if name in sys.modules)
+
+print(json.dumps({
+    'import_seconds': imported - start,
+    'create_app_seconds': created - imported,
+    'rss_mb': rss_after_start / 1024,
+    'heavy_modules_at_start': heavy,
+}))
+'''
+
+
+def measure(profile):
+    env = dict(os.environ, WEALTHWATCHER_CONFIG=profile)
+    output = subprocess.run([sys.executable, '-c', CHILD, profile], env=env, check=True,
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profiles', nargs='+', default=['production', 'development', 'testing'])
+    parser.add_argument('--runs', type=int, default=3, help="Runs per profile; the fastest is reported.")
+    parser.add_argument('--max-import-seconds', type=float, default=None)
+    parser.add_argument('--max-rss-mb', type=float, default=None)
+    parser.add_argument('--json', dest='json_path', default=None, help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    results = {}
+    failures = []
+    print(f"{'profile':<12} {'import s':>9} {'create s':>9} {'rss MB':>8}  heavy modules at start")
+
+    for profile in args.profiles:
+        runs = [measure(profile) for _ in range(args.runs)]
+        best = min(runs, key=lambda run: run['import_seconds'])
+        best['rss_mb'] = min(run['rss_mb'] for run in runs)
+        results[profile] = best
+
+        print(f"{profile:<12} {best['import_seconds']:>9.3f} {best['create_app_seconds']:>9.3f} "
+              f"{best['rss_mb']:>8.1f}  "
+              f"{', '.join(best['heavy_modules_at_start']) or '-'}")
+
+        if args.max_import_seconds is not None and best['import_seconds'] > args.max_import_seconds:
+            failures.append(f"{profile}: import took {best['import_seconds']:.3f}s (budget {args.max_import_seconds}s)")
+        if args.max_rss_mb is not None and best['rss_mb'] > args.max_rss_mb:
+            failures.append(f"{profile}: RSS {best['rss_mb']:.1f}MB (budget {args.max_rss_mb}MB)")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    for failure in failures:
+        print(f"OVER BUDGET {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
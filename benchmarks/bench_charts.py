@@ -0,0 +1,12 @@
+import pytest
+
+from charts import CHART_DATA
+from datasets import USER_ID
+
+
+@pytest.mark.parametrize('name', CHART_DATA)
+def bench_chart(benchmark, app, dataset, name):
+    """Build a chart's series with the chart cache out of the way."""
+
+    with app.app_context():
+        benchmark(CHART_DATA[name].uncached, USER_ID)
@@ -0,0 +1,52 @@
+import time
+
+import pytest
+from sqlalchemy import event
+
+from charts import accounts_balance_data, financials_data
+from dashboard import DashboardSnapshot, dashboard_sections
+from datasets import USER_ID
+from models import db, Accounts, Budgets, Goals, Transactions
+
+# Simulated network round trip to the database, added to every statement.
+# A local socket hides what one statement instead of six is worth; a
+# database in another zone or region is 1-5 ms away.
+RTTS = [0, 1, 5]
+
+
+def separate_queries(user_id):
+    """What /main-page used to cost: the page's four queries, then one per chart request."""
+
+    Accounts.query.filter_by(user_id=user_id).all()
+    Transactions.query.filter_by(user_id=user_id) \
+        .order_by(Transactions.date.desc(), Transactions.id.desc()).limit(5).all()
+    Budgets.query.filter_by(user_id=user_id).all()
+    Goals.query.filter_by(user_id=user_id).all()
+    accounts_balance_data.uncached(user_id)
+    financials_data.uncached(user_id)
+
+
+def snapshot(user_id):
+    DashboardSnapshot.from_sections(dashboard_sections.uncached(user_id)).charts()
+
+
+@pytest.fixture(params=RTTS, ids=lambda rtt: f'rtt={rtt}ms')
+def rtt(request, app):
+    delay = request.param / 1000
+
+    def round_trip(*args):
+        time.sleep(delay)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', round_trip)
+    yield request.param
+    event.remove(engine, 'before_cursor_execute', round_trip)
+
+
+@pytest.mark.parametrize('fetch', [separate_queries, snapshot], ids=lambda fetch: fetch.__name__)
+def bench_main_page_data(benchmark, app, dataset, rtt, fetch):
+    """Everything /main-page shows, with the chart cache out of the way."""
+
+    with app.app_context():
+        benchmark(fetch, USER_ID)
@@ -0,0 +1,20 @@
+import pytest
+
+from datasets import USER_ID
+
+PAGES = ['/account', '/budget', '/transaction', '/main-page']
+
+
+@pytest.mark.parametrize('path', PAGES)
+@pytest.mark.parametrize('revalidate', [False, True], ids=['full', 'not-modified'])
+def bench_page_view(benchmark, app, dataset, path, revalidate):
+    """A logged-in view of a page, rendered in full or answered 304 from its ETag."""
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = USER_ID
+    etag = client.get(path).headers['ETag']
+    headers = {'If-None-Match': etag} if revalidate else {}
+
+    response = benchmark(client.get, path, headers=headers)
+    assert response.status_code == (304 if revalidate else 200)
@@ -0,0 +1,50 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import func, select
+
+from datasets import USER_ID
+from models import db, Accounts
+from transaction_filters import TransactionFilter, filtered_transactions
+
+FILTERS = {
+    'all': TransactionFilter(),
+    'month': TransactionFilter(start=date(2024, 6, 1), end=date(2024, 6, 30)),
+    'income': TransactionFilter(type='income'),
+    # Datasets differ in their account count; dataset_filter picks the first one
+    'account': TransactionFilter(account_id='first'),
+    'category-month': TransactionFilter(category_id=3, start=date(2024, 6, 1), end=date(2024, 6, 30)),
+    'amount-range': TransactionFilter(min_amount=Decimal('50'), max_amount=Decimal('51')),
+    'largest': TransactionFilter(sort='largest'),
+    'largest-expense': TransactionFilter(sort='largest', type='expense'),
+}
+
+
+def dataset_filter(name):
+    """FILTERS[name], with the 'first' account resolved against the loaded dataset."""
+
+    transaction_filter = FILTERS[name]
+    if transaction_filter.account_id == 'first':
+        first_account = db.session.scalar(
+            select(func.min(Accounts.id)).where(Accounts.user_id == USER_ID))
+        transaction_filter = transaction_filter._replace(account_id=first_account)
+    return transaction_filter
+
+
+@pytest.mark.parametrize('name', FILTERS)
+def bench_filter_page(benchmark, app, dataset, name):
+    """First page of a filtered listing."""
+
+    with app.app_context():
+        page = benchmark(filtered_transactions, USER_ID, dataset_filter(name))
+        assert page.items
+
+
+@pytest.mark.parametrize('name', ['all', 'month', 'category-month'])
+def bench_filter_page_with_subtotals(benchmark, app, dataset, name):
+    """First page plus the total and per-category subtotals of every match, in one statement."""
+
+    with app.app_context():
+        page = benchmark(filtered_transactions, USER_ID, dataset_filter(name), with_subtotals=True)
+        assert page.total
@@ -0,0 +1,74 @@
+"""Bytes a browser downloads from us per page view, before and after compression.
+
+'identity' is what every response used to cost: no Content-Encoding. A
+first visit fetches the page and every asset it links to (stylesheet urls
+included); a repeat visit finds the fingerprinted assets in the browser
+cache and revalidates the page with its ETag. The byte counts are printed
+after the run and kept in each benchmark's extra_info.
+
+    pytest benchmarks/bench_page_bytes.py --datasets 100k
+"""
+import posixpath
+import re
+
+import pytest
+
+from assets import CSS_URL
+from datasets import USER_ID
+
+PAGES = ['/main-page', '/account', '/budget', '/transaction']
+ENCODINGS = {'identity': {}, 'compressed': {'Accept-Encoding': 'gzip, br'}}
+ASSET_URL = re.compile(r'(?:href|src)="(/assets/[^"]+)"')
+
+_bytes = {}
+
+
+@pytest.fixture(scope='module', autouse=True)
+def report(request):
+    """Print the byte counts once the module's benchmarks have run."""
+
+    yield
+    with request.config.pluginmanager.get_plugin('capturemanager').global_and_fixture_disabled():
+        report_bytes()
+
+
+def report_bytes():
+    print()
+    print(f"{'page':<14}{'encoding':<12}{'html':>10}{'assets':>12}{'first visit':>14}{'repeat visit':>14}")
+    for (path, encoding), row in sorted(_bytes.items()):
+        print(f"{path:<14}{encoding:<12}{row['html']:>10,}{row['assets']:>12,}"
+              f"{row['html'] + row['assets']:>14,}{row['repeat']:>14,}")
+
+
+def asset_urls(client, path):
+    """Every asset URL a view of `path` loads, including those its stylesheets refer to."""
+
+    urls = ASSET_URL.findall(client.get(path).get_data(as_text=True))
+    for url in [url for url in urls if url.endswith('.css')]:
+        css = client.get(url).get_data(as_text=True)
+        urls += [posixpath.normpath(posixpath.join(posixpath.dirname(url), reference))
+                 for _, reference in CSS_URL.findall(css) if not re.match(r'\w+:', reference)]
+    return urls
+
+
+@pytest.mark.parametrize('path', PAGES)
+@pytest.mark.parametrize('encoding', ENCODINGS)
+def bench_page_bytes(benchmark, app, dataset, path, encoding):
+    """A first view of the page: the document plus every asset it links to."""
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = USER_ID
+    headers = ENCODINGS[encoding]
+    urls = asset_urls(client, path)
+
+    def first_visit():
+        return [len(client.get(url, headers=headers).data) for url in [path] + urls]
+
+    sizes = benchmark(first_visit)
+    page = client.get(path, headers=headers)
+    repeat = client.get(path, headers=dict(headers, **{'If-None-Match': page.headers.get('ETag', '')}))
+
+    row = {'html': sizes[0], 'assets': sum(sizes[1:]), 'repeat': len(repeat.data)}
+    benchmark.extra_info.update(row)
+    _bytes[path, encoding] = row
@@ -0,0 +1,46 @@
+"""Cost of the password hash methods, to pick PASSWORD_HASH_METHOD.
+
+Aim for the most expensive method whose verify time a login can afford
+(roughly 100-300 ms on the production CPU). Login throughput per process is
+about PASSWORD_HASH_WORKERS / verify time.
+
+    pytest benchmarks/bench_passwords.py
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from passwords import PasswordHasher
+
+METHODS = [
+    'scrypt:32768:8:1',         # werkzeug's default
+    'scrypt:16384:8:1',
+    'pbkdf2:sha256:600000',     # werkzeug's pbkdf2 default
+    'bcrypt:12',                # Flask-Bcrypt's default
+    'bcrypt:10',
+]
+
+BURST = 32
+
+
+@pytest.mark.parametrize('method', METHODS)
+def bench_verify(benchmark, method):
+    hasher = PasswordHasher(method, workers=0, max_pending=0)
+    stored = hasher.hash('correct horse battery staple')
+
+    assert benchmark(hasher.verify, stored, 'correct horse battery staple')
+
+
+@pytest.mark.parametrize('workers', [1, 2, 4])
+def bench_login_burst(benchmark, workers):
+    """BURST simultaneous logins through a pool of `workers` hashing threads."""
+
+    hasher = PasswordHasher('scrypt:32768:8:1', workers=workers, max_pending=BURST)
+    stored = hasher.hash('correct horse battery staple')
+
+    def burst():
+        with ThreadPoolExecutor(BURST) as requests:
+            results = list(requests.map(lambda _: hasher.verify(stored, 'correct horse battery staple'), range(BURST)))
+        assert all(results)
+
+    benchmark.pedantic(burst, rounds=3)
@@ -0,0 +1,23 @@
+import pytest
+
+from datasets import USER_ID
+from search import search_transactions
+
+# Every benchmark description is 'Transaction <n>': one word shared by all
+# rows, and a number shared by few (as a prefix, '500' also finds 5000-5009).
+# The number comes from the middle of the dataset, so every size has it.
+QUERIES = {
+    'number': '{rare}',
+    'word-and-number': 'transaction {rare}',
+    'word': 'transaction',
+}
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def bench_search(benchmark, app, dataset, query):
+    """First page of search results."""
+
+    terms = QUERIES[query].format(rare=dataset.transactions // 2)
+    with app.app_context():
+        page = benchmark(search_transactions, USER_ID, terms)
+        assert page.items
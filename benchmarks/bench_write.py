@@ -0,0 +1,34 @@
+from sqlalchemy import delete
+
+from datasets import USER_ID, derive
+from models import db, Transactions
+
+FORM = {
+    'type': 'expense',
+    'category': '1',
+    'description': 'benchmark write',
+    'amount': '12.34',
+    'date': '2025-06-15',
+    'account_id': '1',
+}
+
+
+def bench_addtransaction(benchmark, app, dataset):
+    """POST /transaction/add: the insert plus balance, budget and monthly total upkeep."""
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = USER_ID
+
+    def add_transaction():
+        response = client.post('/transaction/add', data=FORM)
+        assert response.status_code == 302
+
+    try:
+        benchmark(add_transaction)
+    finally:
+        # Leave the dataset as loaded for the benchmarks that share it
+        with app.app_context():
+            db.session.execute(delete(Transactions).where(Transactions.description == FORM['description']))
+            derive()
+            db.session.commit()
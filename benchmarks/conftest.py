@@ -0,0 +1,58 @@
+import os
+from collections import defaultdict
+
+import pytest
+
+from app import create_app
+from config import TestingConfig
+from datasets import DATASETS, load
+
+
+class BenchmarkConfig(TestingConfig):
+    SQLALCHEMY_DATABASE_URI = os.environ.get('BENCH_DATABASE_URL', 'postgresql:///wealthwatcher_bench')
+
+
+def pytest_addoption(parser):
+    parser.addoption('--datasets', default='1k,100k',
+                     help=f"Comma-separated datasets to run against ({', '.join(DATASETS)}).")
+
+
+def pytest_generate_tests(metafunc):
+    if 'dataset' in metafunc.fixturenames:
+        names = metafunc.config.getoption('datasets').split(',')
+        metafunc.parametrize('dataset', names, indirect=True, scope='session')
+
+
+def pytest_benchmark_group_stats(config, benchmarks, group_by):
+    """Group results by function, and by dataset for the benchmarks that load one.
+
+    An explicit --benchmark-group-by falls through to pytest-benchmark.
+    """
+
+    if group_by != 'group':
+        return None
+
+    groups = defaultdict(list)
+    for bench in benchmarks:
+        key = bench['name'].split('[')[0]
+        if 'dataset' in (bench['params'] or {}):
+            key += f" dataset={bench['params']['dataset']}"
+        groups[key].append(bench)
+
+    for grouped_benchmarks in groups.values():
+        grouped_benchmarks.sort(key=lambda bench: bench['name'])
+    return sorted(groups.items())
+
+
+@pytest.fixture(scope='session')
+def app():
+    return create_app(BenchmarkConfig)
+
+
+@pytest.fixture(scope='session')
+def dataset(request, app):
+    """Load a dataset once; pytest groups the benchmarks that use it."""
+
+    with app.app_context():
+        load(DATASETS[request.param])
+    return DATASETS[request.param]
@@ -0,0 +1,92 @@
+"""Synthetic datasets for the benchmarks.
+
+A dataset is one user with a number of accounts and transactions spread evenly
+over three years, one budget per category and the derived balances, monthly
+totals and budget spending. Rows are generated inside Postgres with
+generate_series and every value derives from the row number, so each run
+benchmarks identical data.
+"""
+from collections import namedtuple
+
+from sqlalchemy import text
+
+from balance_snapshots import rebuild_balance_snapshots
+from budget_spent import recompute_budget_spent
+from models import db, Category, User
+from monthly_totals import rebuild_monthly_totals
+
+
+Dataset = namedtuple('Dataset', 'name transactions accounts')
+
+DATASETS = {
+    '1k': Dataset('1k', 1_000, 1),
+    '100k': Dataset('100k', 100_000, 10),
+    '1m': Dataset('1m', 1_000_000, 50),
+}
+
+USER_ID = 1
+CATEGORIES = ['Groceries', 'Rent', 'Utilities', 'Transport', 'Dining', 'Health', 'Entertainment', 'Travel']
+
+
+def load(dataset):
+    """Replace the database contents with `dataset`."""
+
+    db.drop_all()
+    db.create_all()
+
+    # A bulk load, not a web request: lift the app's statement timeout
+    db.session.execute(text('SET LOCAL statement_timeout = 0'))
+    db.session.add_all([Category(name=name) for name in CATEGORIES])
+    db.session.add(User(id=USER_ID, first_name="Bench", last_name="Mark", username="benchmark",
+                        email="bench@example.com", password="not-a-real-hash"))
+    db.session.flush()
+
+    db.session.execute(text("""
+        INSERT INTO accounts (name, account_type, balance, created_at, user_id)
+        SELECT 'Account ' || n, (ARRAY['checking', 'savings', 'credit'])[1 + n % 3], 0, now(), :user_id
+        FROM generate_series(1, :accounts) AS n
+    """), {'accounts': dataset.accounts, 'user_id': USER_ID})
+
+    db.session.execute(text("""
+        INSERT INTO budgets (category_name, amount, spent, start_date, end_date, created_at, category_id, user_id)
+        SELECT name, 500 + id * 100, 0, DATE '2025-01-01', DATE '2025-12-31', now(), id, :user_id
+        FROM categories
+    """), {'user_id': USER_ID})
+
+    # Every tenth transaction is income; dates advance evenly from 2023-01-01
+    db.session.execute(text("""
+        INSERT INTO transactions (type, description, amount, date, account_id, user_id, category_id)
+        SELECT
+            CASE WHEN n % 10 = 0 THEN 'income' ELSE 'expense' END,
+            'Transaction ' || n,
+            CASE WHEN n % 10 = 0 THEN 1500 + (n * 37) % 1000 ELSE 1 + ((n * 7919) % 20000) / 100.0 END,
+            DATE '2023-01-01' + (n * 1095 / :transactions)::int,
+            1 + n % :accounts,
+            :user_id,
+            CASE WHEN n % 10 = 0 THEN NULL ELSE 1 + (n * 31) % :categories END
+        FROM generate_series(1::bigint, :transactions) AS n
+    """), {'transactions': dataset.transactions, 'accounts': dataset.accounts,
+           'categories': len(CATEGORIES), 'user_id': USER_ID})
+
+    derive()
+    db.session.commit()
+
+    with db.engine.connect() as connection:
+        connection.execution_options(isolation_level='AUTOCOMMIT').execute(text('ANALYZE'))
+
+
+def derive():
+    """Recompute balances, balance snapshots, monthly totals and budget spending from the transactions."""
+
+    db.session.execute(text('SET LOCAL statement_timeout = 0'))
+    db.session.execute(text("""
+        UPDATE accounts SET balance = totals.balance
+        FROM (
+            SELECT account_id, SUM(CASE WHEN type = 'income' THEN amount ELSE -amount END) AS balance
+            FROM transactions GROUP BY account_id
+        ) AS totals
+        WHERE accounts.id = totals.account_id
+    """))
+    rebuild_balance_snapshots()
+    rebuild_monthly_totals()
+    recompute_budget_spent()
@@ -0,0 +1,54 @@
+from sqlalchemy import and_, func, select, update
+
+from models import db, Budgets, Transactions
+
+
+def budget_spent_totals(budget_id=None, user_id=None, category_id=None):
+    """SELECT of (budget_id, spent) for the matching budgets.
+
+    Every budget is summed over the user's expenses in its category whose date
+    falls inside the budget's range. Budgets without any expenses get 0.
+    """
+
+    query = select(
+        Budgets.id.label('budget_id'),
+        func.coalesce(func.sum(Transactions.amount), 0).label('spent')
+    ).select_from(Budgets).outerjoin(
+        Transactions,
+        and_(
+            Transactions.user_id == Budgets.user_id,
+            Transactions.category_id == Budgets.category_id,
+            Transactions.date >= Budgets.start_date,
+            Transactions.date <= Budgets.end_date,
+            Transactions.type == 'expense',
+        )
+    ).group_by(Budgets.id)
+
+    if budget_id is not None:
+        query = query.where(Budgets.id == budget_id)
+    if user_id is not None:
+        query = query.where(Budgets.user_id == user_id)
+    if category_id is not None:
+        query = query.where(Budgets.category_id == category_id)
+
+    return query
+
+
+def recompute_budget_spent(budget_id=None, user_id=None, category_id=None):
+    """Rebuild Budgets.spent with one grouped join written back by one UPDATE ... FROM.
+
+    With no arguments every budget is recomputed in the same single pass.
+    Rows whose value is already right are not rewritten. Returns the number of
+    budgets changed; the caller commits.
+    """
+
+    totals = budget_spent_totals(budget_id, user_id, category_id).subquery()
+
+    result = db.session.execute(
+        update(Budgets)
+        .where(Budgets.id == totals.c.budget_id)
+        .where(Budgets.spent.is_distinct_from(totals.c.spent))
+        .values(spent=totals.c.spent)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
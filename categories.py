@@ -0,0 +1,103 @@
+"""Process-local registry of the Category reference data.
+
+Categories are read on nearly every page and written almost never, so they
+are loaded once per process. The registry re-checks a version stamp, a
+digest of every id and name, at most every `check_interval` seconds and
+reloads only when that stamp has moved, so additions, deletions and renames
+are all picked up. The table is a few dozen rows, so the check stays cheap.
+"""
+import threading
+import time
+
+from flask import current_app, has_app_context
+from sqlalchemy import Text, cast, func, literal
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+from models import db, Category
+
+
+class CategoryRegistry:
+
+    def __init__(self, check_interval=60):
+        self.check_interval = check_interval
+        self._names = {}
+        self._choices = []
+        self._ids_by_name = {}
+        self._version = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.extensions['category_registry'] = CategoryRegistry(
+            check_interval=app.config.setdefault('CATEGORY_REGISTRY_CHECK_INTERVAL', 60))
+
+    def _for_app(self):
+        """The registry init_app set up for the current app, or this one."""
+
+        if has_app_context():
+            return current_app.extensions.get('category_registry', self)
+        return self
+
+    def _current_version(self):
+        row = cast(Category.id, Text) + ':' + Category.name
+        digest = func.md5(func.coalesce(func.string_agg(row, aggregate_order_by(literal('\n'), Category.id)), ''))
+        return db.session.query(digest).scalar()
+
+    def _load(self, version):
+        categories = db.session.query(Category.id, Category.name).order_by(Category.name).all()
+        self._names = {category_id: name for category_id, name in categories}
+        self._choices = [(str(category_id), name) for category_id, name in categories]
+        self._ids_by_name = {name.lower(): category_id for category_id, name in categories}
+        self._version = version
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return
+
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.check_interval:
+                return
+            version = self._current_version()
+            if version != self._version:
+                self._load(version)
+            self._checked_at = now
+
+    def name(self, category_id):
+        """Category name for an id, or None."""
+
+        registry = self._for_app()
+        registry._refresh()
+        return registry._names.get(category_id)
+
+    def id_for_name(self, name):
+        """Category id for a name (case-insensitive), or None."""
+
+        registry = self._for_app()
+        registry._refresh()
+        return registry._ids_by_name.get((name or '').strip().lower())
+
+    def choices(self):
+        """(id, name) pairs sorted by name, ready for a SelectField."""
+
+        registry = self._for_app()
+        registry._refresh()
+        return list(registry._choices)
+
+    def version(self):
+        """The version stamp of the loaded categories; changes when they do."""
+
+        registry = self._for_app()
+        registry._refresh()
+        return registry._version
+
+    def invalidate(self):
+        """Force a version check on the next lookup."""
+
+        registry = self._for_app()
+        with registry._lock:
+            registry._checked_at = None
+            registry._version = None
+
+
+category_registry = CategoryRegistry()
@@ -0,0 +1,216 @@
+"""Cache for rendered charts, keyed by user and the user's data version.
+
+Entries are never invalidated explicitly: a write bumps the user's
+data_version (see data_version.py), which changes the key, and the stale
+entry ages out of the LRU. Because the version lives in the database, every
+gunicorn worker notices a write at once, whichever backend is used.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict, defaultdict
+from functools import wraps
+
+from flask import current_app, has_app_context
+
+from data_version import get_data_version
+
+
+class MemoryBackend:
+    """In-process LRU bounded by entry count and total size."""
+
+    def __init__(self, max_entries=512, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key, payload):
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            self._entries[key] = payload
+            self._bytes += len(payload)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class FileSystemBackend:
+    """LRU in a directory shared by all workers on the host (or a shared volume).
+
+    Reads touch the file's mtime, so eviction removes the least recently used
+    files once the directory grows past its bounds.
+    """
+
+    def __init__(self, directory, max_entries=4096, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                payload = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return payload
+
+    def set(self, key, payload):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        if len(entries) <= self.max_entries and total <= self.max_bytes:
+            return
+
+        entries.sort()
+        count = len(entries)
+        for _, size, path in entries:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            count -= 1
+            total -= size
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json'):
+                os.remove(entry.path)
+
+    def __len__(self):
+        return sum(1 for entry in os.scandir(self.directory) if entry.name.endswith('.json'))
+
+
+class ChartCache:
+    """Memoizes per-user chart builders, see `cached`."""
+
+    def __init__(self, app=None):
+        self.backend = MemoryBackend()
+        self.enabled = True
+        self._hits = defaultdict(int)
+        self._misses = defaultdict(int)
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('CHART_CACHE_ENABLED', True)
+        app.config.setdefault('CHART_CACHE_BACKEND', os.environ.get('CHART_CACHE_BACKEND', 'memory'))
+        app.config.setdefault('CHART_CACHE_DIR', os.environ.get(
+            'CHART_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'wealthwatcher-charts')))
+        app.config.setdefault('CHART_CACHE_MAX_ENTRIES', 512)
+        app.config.setdefault('CHART_CACHE_MAX_BYTES', 64 * 1024 * 1024)
+
+        cache = ChartCache()
+        cache.enabled = app.config['CHART_CACHE_ENABLED']
+        if app.config['CHART_CACHE_BACKEND'] == 'filesystem':
+            cache.backend = FileSystemBackend(app.config['CHART_CACHE_DIR'],
+                                              max_entries=app.config['CHART_CACHE_MAX_ENTRIES'],
+                                              max_bytes=app.config['CHART_CACHE_MAX_BYTES'])
+        elif app.config['CHART_CACHE_BACKEND'] == 'memory':
+            cache.backend = MemoryBackend(max_entries=app.config['CHART_CACHE_MAX_ENTRIES'],
+                                          max_bytes=app.config['CHART_CACHE_MAX_BYTES'])
+        else:
+            raise ValueError(f"Unknown CHART_CACHE_BACKEND {app.config['CHART_CACHE_BACKEND']!r}")
+        app.extensions['chart_cache'] = cache
+
+    def _for_app(self):
+        """The cache init_app set up for the current app, or this one."""
+
+        if has_app_context():
+            return current_app.extensions.get('chart_cache', self)
+        return self
+
+    def cached(self, name):
+        """Decorator for chart functions taking user_id as their only argument.
+
+        The undecorated function stays available as `.uncached`.
+        """
+
+        def decorator(func):
+            @wraps(func)
+            def wrapper(user_id):
+                cache = self._for_app()
+                if not cache.enabled:
+                    return func(user_id)
+
+                key = f"{name}:{user_id}:{get_data_version(user_id)}"
+                payload = cache.backend.get(key)
+                if payload is not None:
+                    cache._count(cache._hits, name)
+                    return json.loads(payload)
+
+                cache._count(cache._misses, name)
+                value = func(user_id)
+                cache.backend.set(key, json.dumps(value).encode('utf-8'))
+                return value
+
+            wrapper.uncached = func
+            return wrapper
+
+        return decorator
+
+    def _count(self, counter, name):
+        with self._lock:
+            counter[name] += 1
+
+    def stats(self):
+        cache = self._for_app()
+        with cache._lock:
+            names = sorted(set(cache._hits) | set(cache._misses))
+            return {
+                'backend': type(cache.backend).__name__,
+                'entries': len(cache.backend),
+                'charts': {name: {'hits': cache._hits[name], 'misses': cache._misses[name]} for name in names},
+            }
+
+    def clear(self):
+        cache = self._for_app()
+        cache.backend.clear()
+        with cache._lock:
+            cache._hits.clear()
+            cache._misses.clear()
+
+
+chart_cache = ChartCache()
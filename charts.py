@@ -0,0 +1,127 @@
+"""Chart data for the dashboard pages.
+
+Each chart has a `*_data` function returning compact JSON-ready series, served
+by /api/charts/<name> and drawn in the browser by static/charts.js. The data
+functions read from the replica when it is configured and current.
+"""
+from collections import defaultdict
+from itertools import groupby
+
+from sqlalchemy import func, select
+
+from categories import category_registry
+from chart_cache import chart_cache
+from data_version import replica_reads
+from metrics import timed_chart
+from models import db, Accounts, AccountBalanceSnapshot, Budgets
+from monthly_totals import monthly_totals_by_type
+
+
+##### chart data
+
+@chart_cache.cached('budget_remaining_data')
+@timed_chart
+@replica_reads
+def budget_remaining_data(user_id):
+    user_budgets = Budgets.query.filter_by(user_id=user_id).all()
+
+    categories = [category_registry.name(budget.category_id) for budget in user_budgets]
+    budgeted_amounts = [budget.amount for budget in user_budgets]
+    spent_amounts = [budget.spent if budget.spent else 0 for budget in user_budgets]
+    remaining_budget = [float(max(0, b - s)) for b, s in zip(budgeted_amounts, spent_amounts)]
+
+    return {'categories': categories, 'remaining': remaining_budget}
+
+
+@chart_cache.cached('account_balance_data')
+@timed_chart
+@replica_reads
+def account_balance_data(user_id):
+    rows = db.session.execute(account_balance_statement(user_id).execution_options(yield_per=1000))
+
+    accounts = []
+    for (account_id, account_name), account_rows in groupby(rows, key=lambda row: (row.id, row.name)):
+        dates = []
+        balances = []
+        for row in account_rows:
+            dates.append(row.date.isoformat())
+            balances.append(float(row.balance))
+
+        accounts.append({'name': account_name, 'dates': dates, 'balances': balances})
+
+    return {'accounts': accounts}
+
+
+@chart_cache.cached('accounts_balance_data')
+@timed_chart
+@replica_reads
+def accounts_balance_data(user_id):
+    return accounts_balance_series(db.session.execute(accounts_balance_statement(user_id)).all())
+
+
+@chart_cache.cached('financials_data')
+@timed_chart
+@replica_reads
+def financials_data(user_id):
+    return financials_series(monthly_totals_by_type(user_id))
+
+
+def account_balance_statement(user_id):
+    """Every end-of-day balance snapshot of the user's accounts, by account and date."""
+
+    return select(Accounts.id, Accounts.name, AccountBalanceSnapshot.date, AccountBalanceSnapshot.balance) \
+        .join(AccountBalanceSnapshot, AccountBalanceSnapshot.account_id == Accounts.id) \
+        .where(Accounts.user_id == user_id) \
+        .order_by(Accounts.id, AccountBalanceSnapshot.date)
+
+
+def accounts_balance_statement(user_id):
+    """Total balance of the user's accounts by account type."""
+
+    return select(
+        Accounts.account_type,
+        # balance is nullable; a type whose balances are all NULL totals 0
+        func.coalesce(func.sum(Accounts.balance), 0).label('total_balance')
+    ).where(Accounts.user_id == user_id).group_by(Accounts.account_type)
+
+
+def accounts_balance_series(account_types_balances):
+    """Pie series from (account_type, total_balance) rows."""
+
+    return {
+        'account_types': [result.account_type for result in account_types_balances],
+        'balances': [float(result.total_balance) for result in account_types_balances],
+    }
+
+
+def financials_series(monthly_financials):
+    """Monthly income/spending bars from (year, month, type, total) rows."""
+
+    income_by_month = defaultdict(float)
+    expenses_by_month = defaultdict(float)
+
+    for financial in monthly_financials:
+        month = int(financial.month)
+        year = int(financial.year)
+        month_year_key = f"{year}-{month:02d}"
+        if financial.type == 'income':
+            income_by_month[month_year_key] += float(financial.total)
+        elif financial.type == 'expense':
+            expenses_by_month[month_year_key] += abs(float(financial.total))
+
+    all_months = sorted(set(income_by_month.keys()) | set(expenses_by_month.keys()))
+
+    return {
+        'months': all_months,
+        'income': [income_by_month[month] for month in all_months],
+        'spending': [expenses_by_month[month] for month in all_months],
+    }
+
+
+CHART_DATA = {
+    'budget-remaining': budget_remaining_data,
+    'account-balance': account_balance_data,
+    'accounts-balance': accounts_balance_data,
+    'financials': financials_data,
+}
+
@@ -0,0 +1,82 @@
+"""Compressed responses.
+
+HTML and JSON pages are mostly markup and embedded chart series, which
+shrink five to ten times. `Compression` compresses every eligible response
+after the view has built it: brotli when the client accepts it and the
+optional `brotli` package is installed, gzip otherwise. Streamed and
+file-passthrough responses (exports, send_file) are left alone, and static
+assets are compressed once and kept by assets.py instead.
+"""
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESSIBLE = {
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript',
+    'application/javascript', 'application/json', 'application/x-ndjson', 'image/svg+xml',
+}
+# below this the encoding overhead outweighs the saving
+MIN_SIZE = 500
+
+
+def encodings():
+    """Encodings this process can produce, best first."""
+
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate(accept_encodings):
+    """The best encoding the request accepts, or None to send the body as is."""
+
+    for encoding in encodings():
+        if accept_encodings[encoding]:
+            return encoding
+    return None
+
+
+def compress(data, encoding, level):
+    """`data` compressed with `encoding` at `level` (gzip 1-9, brotli 0-11)."""
+
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+class Compression:
+
+    def init_app(self, app):
+        self.gzip_level = app.config.setdefault('COMPRESSION_GZIP_LEVEL', 6)
+        self.brotli_level = app.config.setdefault('COMPRESSION_BROTLI_LEVEL', 5)
+        if app.config.setdefault('COMPRESSION_ENABLED', True):
+            app.after_request(self.compress_response)
+
+    def compress_response(self, response):
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate(request.accept_encodings)
+        data = response.get_data()
+        if encoding is None or len(data) < MIN_SIZE:
+            return response
+
+        level = self.brotli_level if encoding == 'br' else self.gzip_level
+        response.set_data(compress(data, encoding, level))
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            # the compressed body is not byte-for-byte the one the tag was made for
+            response.set_etag(etag, weak=True)
+        return response
+
+
+compression = Compression()
@@ -0,0 +1,106 @@
+import os
+
+
+def engine_options(url, statement_timeout_ms):
+    """Pool settings for a database URL.
+
+    Postgres connections get a bounded pool, pre-ping, a recycle age and a
+    server-side statement timeout; other drivers (SQLite in tests) keep their
+    defaults apart from pre-ping.
+    """
+
+    if not url.startswith('postgresql'):
+        return {'pool_pre_ping': True}
+
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True,
+        'connect_args': {'options': f'-c statement_timeout={statement_timeout_ms}'},
+    }
+
+
+def configure_database(config):
+    """Fill in primary and replica engine options from the other settings,
+    keeping anything a profile or the caller set explicitly."""
+
+    config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(
+        config['SQLALCHEMY_DATABASE_URI'], config['STATEMENT_TIMEOUT_MS']))
+
+    if config.get('REPLICA_DATABASE_URL'):
+        config.setdefault('REPLICA_ENGINE_OPTIONS', engine_options(
+            config['REPLICA_DATABASE_URL'], config['REPLICA_STATEMENT_TIMEOUT_MS']))
+
+
+class Config:
+    """Settings shared by every profile."""
+
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'postgresql:///financemanager')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ECHO = False
+
+    # Chart and report queries go here when set; see routing.py
+    REPLICA_DATABASE_URL = os.environ.get('REPLICA_DATABASE_URL')
+    STATEMENT_TIMEOUT_MS = int(os.environ.get('STATEMENT_TIMEOUT_MS', 15000))
+    REPLICA_STATEMENT_TIMEOUT_MS = int(os.environ.get('REPLICA_STATEMENT_TIMEOUT_MS', 60000))
+
+    SECRET_KEY = os.environ.get('SECRET_KEY', "it's a secret")
+    DEBUG = False
+    TESTING = False
+
+    # flask-debugtoolbar is only imported when this is on
+    DEBUG_TB_ENABLED = False
+    DEBUG_TB_INTERCEPT_REDIRECTS = False
+
+    # part of every page's ETag; a digest of the code and templates when unset (see etags.py)
+    RELEASE = os.environ.get('RELEASE')
+
+    # bearer token Prometheus (or an operator) sends to /metrics and /cache/stats; both 404 when unset
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    CHART_CACHE_BACKEND = os.environ.get('CHART_CACHE_BACKEND', 'memory')
+    IDENTITY_CACHE_TTL = 30
+    CATEGORY_REGISTRY_CHECK_INTERVAL = 60
+
+    # 'thread', 'postgres' (durable) or 'inline'; see jobs.py
+    JOBS_BACKEND = os.environ.get('JOBS_BACKEND', 'thread')
+    JOBS_WORKERS = int(os.environ.get('JOBS_WORKERS', 2))
+
+    # werkzeug method string or 'bcrypt:<rounds>'; see passwords.py and benchmarks/bench_passwords.py.
+    # Under gunicorn, gunicorn.conf.py sets the workers per process.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 4))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 64))
+
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+    SQLALCHEMY_ECHO = True
+    DEBUG_TB_ENABLED = True
+
+
+class ProductionConfig(Config):
+    pass
+
+
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL', 'postgresql:///wealthwatcher_test')
+    REPLICA_DATABASE_URL = os.environ.get('TEST_REPLICA_DATABASE_URL')
+    WTF_CSRF_ENABLED = False
+    CHART_CACHE_ENABLED = False
+    IDENTITY_CACHE_TTL = 0
+    CATEGORY_REGISTRY_CHECK_INTERVAL = 0
+    JOBS_BACKEND = 'inline'
+    # a fast hash keeps signup and login tests quick
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+    PASSWORD_HASH_WORKERS = 0
+
+
+CONFIGS = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'testing': TestingConfig,
+}
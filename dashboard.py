@@ -0,0 +1,115 @@
+"""Everything /main-page shows, fetched in one round trip.
+
+The dashboard used to cost four ORM queries while rendering and then two
+more HTTP requests (one query each) for its charts. `dashboard_snapshot`
+runs a single statement instead: each section is a CTE aggregated to a JSON
+array, so the whole page comes back as one row. The result is an immutable
+`DashboardSnapshot` that the template renders and that carries the series
+for the page's charts, which are embedded rather than fetched.
+
+Amounts travel as text so they come back as exact Decimals.
+"""
+from collections import namedtuple
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import Text, cast, func, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+from chart_cache import chart_cache
+from charts import accounts_balance_series, financials_series
+from data_version import replica_reads
+from models import db, Accounts, MonthlyTotals, Transactions
+
+
+RECENT_TRANSACTIONS = 5
+
+
+AccountTotal = namedtuple('AccountTotal', 'account_type total_balance')
+MonthTotal = namedtuple('MonthTotal', 'year month type total')
+RecentTransaction = namedtuple('RecentTransaction', 'id date type description amount')
+
+
+class DashboardSnapshot(namedtuple('DashboardSnapshot', 'account_totals monthly_totals recent_transactions')):
+    """The main page's data as tuples of typed rows."""
+
+    __slots__ = ()
+
+    @classmethod
+    def from_sections(cls, sections):
+        return cls(
+            account_totals=tuple(AccountTotal(account_type, Decimal(balance))
+                                 for account_type, balance in sections['account_totals']),
+            monthly_totals=tuple(MonthTotal(year, month, type, Decimal(total))
+                                 for year, month, type, total in sections['monthly_totals']),
+            recent_transactions=tuple(
+                RecentTransaction(id, date.fromisoformat(day) if day else None, type, description,
+                                  Decimal(amount) if amount is not None else None)
+                for id, day, type, description, amount in sections['recent_transactions']
+            ),
+        )
+
+    def charts(self):
+        """Series for the charts on the page, the same as /api/charts returns."""
+
+        return {
+            'accounts-balance': accounts_balance_series(self.account_totals),
+            'financials': financials_series(self.monthly_totals),
+        }
+
+
+def _section(cte, *columns, order_by):
+    """A scalar subquery aggregating the CTE's rows into one JSON array."""
+
+    rows = func.json_agg(aggregate_order_by(func.json_build_array(*columns), *order_by))
+    return select(func.coalesce(rows, func.json_build_array())).select_from(cte).scalar_subquery()
+
+
+def dashboard_statement(user_id, recent=RECENT_TRANSACTIONS):
+    account_totals = select(
+        Accounts.account_type,
+        # balance is nullable; a type whose balances are all NULL totals 0
+        func.coalesce(func.sum(Accounts.balance), 0).label('total_balance')
+    ).where(Accounts.user_id == user_id).group_by(Accounts.account_type).cte('account_totals')
+
+    monthly_totals = select(
+        MonthlyTotals.year,
+        MonthlyTotals.month,
+        MonthlyTotals.type,
+        func.sum(MonthlyTotals.total).label('total')
+    ).where(MonthlyTotals.user_id == user_id).group_by(
+        MonthlyTotals.year, MonthlyTotals.month, MonthlyTotals.type
+    ).cte('monthly_totals')
+
+    recent_transactions = select(
+        Transactions.id, Transactions.date, Transactions.type, Transactions.description, Transactions.amount
+    ).where(Transactions.user_id == user_id).order_by(
+        Transactions.date.desc(), Transactions.id.desc()
+    ).limit(recent).cte('recent_transactions')
+
+    return select(
+        _section(account_totals,
+                 account_totals.c.account_type, cast(account_totals.c.total_balance, Text),
+                 order_by=[account_totals.c.account_type]).label('account_totals'),
+        _section(monthly_totals,
+                 monthly_totals.c.year, monthly_totals.c.month, monthly_totals.c.type,
+                 cast(monthly_totals.c.total, Text),
+                 order_by=[monthly_totals.c.year, monthly_totals.c.month, monthly_totals.c.type]
+                 ).label('monthly_totals'),
+        _section(recent_transactions,
+                 recent_transactions.c.id, recent_transactions.c.date, recent_transactions.c.type,
+                 recent_transactions.c.description, cast(recent_transactions.c.amount, Text),
+                 order_by=[recent_transactions.c.date.desc(), recent_transactions.c.id.desc()]
+                 ).label('recent_transactions'),
+    )
+
+
+@chart_cache.cached('dashboard_sections')
+@replica_reads
+def dashboard_sections(user_id):
+    row = db.session.execute(dashboard_statement(user_id)).one()
+    return dict(row._mapping)
+
+
+def dashboard_snapshot(user_id):
+    return DashboardSnapshot.from_sections(dashboard_sections(user_id))
@@ -0,0 +1,58 @@
+from functools import wraps
+
+from flask import g, has_app_context
+from sqlalchemy import select, update
+
+from models import db, User
+from routing import reading_from_replica, replica_engine
+
+
+def get_data_version(user_id):
+    """Current data version for a user, looked up at most once per request."""
+
+    versions = g.setdefault('data_versions', {}) if has_app_context() else {}
+    if user_id not in versions:
+        versions[user_id] = db.session.query(User.data_version).filter_by(id=user_id).scalar() or 0
+    return versions[user_id]
+
+
+def bump_data_version(user_id):
+    """Mark the user's data as changed.
+
+    Runs in the caller's session, so the new version becomes visible to every
+    worker at the same moment as the write itself.
+    """
+
+    db.session.execute(
+        update(User).where(User.id == user_id).values(data_version=User.data_version + 1)
+    )
+    if has_app_context():
+        g.setdefault('data_versions', {}).pop(user_id, None)
+
+
+def replica_is_current(user_id):
+    """True when a replica is configured and has replayed the user's latest write."""
+
+    engine = replica_engine()
+    if engine is None:
+        return False
+
+    replica_version = db.session.execute(
+        select(User.data_version).where(User.id == user_id), bind_arguments={'bind': engine}
+    ).scalar()
+    return replica_version is not None and replica_version >= get_data_version(user_id)
+
+
+def replica_reads(func):
+    """Run a read-only function taking user_id first on the replica, falling
+    back to the primary when there is no replica or it is lagging behind."""
+
+    @wraps(func)
+    def wrapper(user_id, *args, **kwargs):
+        if not replica_is_current(user_id):
+            return func(user_id, *args, **kwargs)
+
+        with reading_from_replica():
+            return func(user_id, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,103 @@
+"""Conditional GETs for the per-user pages and data endpoints.
+
+Everything /account, /budget, /goal, /transaction and the JSON endpoints
+show is a function of the user's rows, and users.data_version changes
+whenever those do: every write route bumps it through data_changed, and so
+do the importer and the background refresh when they change derived data.
+A page's ETag is therefore a digest of the data version, the category
+reference data, the request's path and query, and the release serving it.
+`etagged` compares it with If-None-Match before the view runs and answers
+304 on a match, so a refresh of an unchanged page costs one primary-key
+lookup instead of the listing queries, chart builders and template.
+
+Responses carrying flashed messages are neither tagged nor answered with a
+304: the message is shown once, and the next view of the page differs.
+"""
+import hashlib
+import os
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from flask.globals import request_ctx
+
+from categories import category_registry
+from data_version import get_data_version
+
+
+def release_id(app):
+    """Identifies the code and templates serving a response.
+
+    The RELEASE setting when the deploy provides one; otherwise a digest of
+    the app's modules, templates and static files, the same in every worker
+    of a release. Either way a deploy changes every ETag, so no browser
+    keeps HTML from the previous release.
+    """
+
+    if app.config.get('RELEASE'):
+        return app.config['RELEASE']
+
+    digest = hashlib.sha1()
+    for path in _release_files(app.root_path):
+        digest.update(os.path.relpath(path, app.root_path).encode())
+        with open(path, 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()[:12]
+
+
+def _release_files(root_path):
+    for name in sorted(os.listdir(root_path)):
+        if name.endswith('.py'):
+            yield os.path.join(root_path, name)
+    for folder in ('templates', 'static'):
+        for root, dirs, files in os.walk(os.path.join(root_path, folder)):
+            dirs.sort()
+            for name in sorted(files):
+                yield os.path.join(root, name)
+
+
+def _flashed():
+    """True when the request has flashed messages, whether or not a template has read them yet."""
+
+    return '_flashes' in session or bool(request_ctx.flashes)
+
+
+def page_etag(user_id):
+    """The ETag for the current request as seen by `user_id`."""
+
+    extensions = current_app.extensions
+    if 'etag_release' not in extensions:
+        extensions['etag_release'] = release_id(current_app)
+
+    key = '\0'.join(str(part) for part in (
+        extensions['etag_release'], user_id, get_data_version(user_id),
+        category_registry.version(), request.full_path,
+    ))
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def etagged(view):
+    """Answer a logged-in GET with 304 when the page has not changed since the client's copy.
+
+    The tag is weak: a compressed and an uncompressed body carry the same one.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        user_id = session.get('user_id')
+        if request.method not in ('GET', 'HEAD') or user_id is None or _flashed():
+            return view(*args, **kwargs)
+
+        etag = page_etag(user_id)
+        if request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or _flashed():
+                return response
+
+        response.set_etag(etag, weak=True)
+        # the browser may keep the page but must ask before showing it again
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+    return wrapper
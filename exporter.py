@@ -0,0 +1,93 @@
+"""Streaming export of a user's transactions as CSV or NDJSON.
+
+Rows come from a server-side cursor (yield_per) and are written out in small
+chunks, so memory stays flat however long the history is.
+"""
+import csv
+import io
+import json
+
+from sqlalchemy import select
+
+from models import db, Accounts, Category, Transactions
+
+
+EXPORT_COLUMNS = ['id', 'date', 'type', 'description', 'amount', 'account', 'category']
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def export_rows(user_id, start=None, end=None, account_id=None, yield_per=1000):
+    """Yield the user's transactions joined with account and category names, oldest first."""
+
+    stmt = select(
+        Transactions.id,
+        Transactions.date,
+        Transactions.type,
+        Transactions.description,
+        Transactions.amount,
+        Accounts.name.label('account'),
+        Category.name.label('category')
+    ).join(
+        Accounts, Transactions.account_id == Accounts.id
+    ).outerjoin(
+        Category, Transactions.category_id == Category.id
+    ).where(
+        Transactions.user_id == user_id
+    ).order_by(Transactions.date, Transactions.id)
+
+    if start:
+        stmt = stmt.where(Transactions.date >= start)
+    if end:
+        stmt = stmt.where(Transactions.date <= end)
+    if account_id:
+        stmt = stmt.where(Transactions.account_id == account_id)
+
+    yield from db.session.execute(stmt.execution_options(yield_per=yield_per))
+
+
+def _serialize(row):
+    return {
+        'id': row.id,
+        'date': row.date.isoformat() if row.date else None,
+        'type': row.type,
+        'description': row.description,
+        'amount': str(row.amount) if row.amount is not None else None,
+        'account': row.account,
+        'category': row.category,
+    }
+
+
+def csv_chunks(rows, chunk_rows=500):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+
+    for count, row in enumerate(rows, 1):
+        writer.writerow(_serialize(row))
+        if count % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def ndjson_chunks(rows, chunk_rows=500):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(_serialize(row)))
+        if len(lines) >= chunk_rows:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def export_chunks(rows, format='csv'):
+    if format == 'ndjson':
+        return ndjson_chunks(rows)
+    return csv_chunks(rows)
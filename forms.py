@@ -1,4 +1,5 @@
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileRequired, FileAllowed
 from wtforms import StringField, PasswordField, SelectField, DecimalField, DateField, validators, ValidationError
 from wtforms.validators import DataRequired, Email, Length, Optional, InputRequired, NumberRange
 
@@ -48,3 +49,8 @@ class TransactionForm(FlaskForm):
 class GoalCreationForm(FlaskForm):
     name = StringField('Name', validators=[DataRequired()])
     target_amount = DecimalField('Target Amount', validators=[DataRequired(), NumberRange(min=0, message="Target amount cannot be negative.")])
+
+class ImportTransactionsForm(FlaskForm):
+    account_id = SelectField('Account', coerce=int, validators=[InputRequired()], choices=[])
+    format = SelectField('Format', choices=[('auto', 'Detect from file name'), ('csv', 'CSV'), ('ofx', 'OFX / QFX')])
+    file = FileField('Statement', validators=[FileRequired(), FileAllowed(['csv', 'ofx', 'qfx', 'txt'], 'CSV or OFX files only.')])
@@ -0,0 +1,26 @@
+"""gunicorn settings, read from the working directory by `gunicorn app:app`.
+
+Workers are threaded (gthread): each process serves GUNICORN_THREADS requests
+at once, so a request waiting on a password hash or the database leaves the
+process free for others. passwords.py relies on this. Its pool is what
+bounds the cores key derivation can take, and under the default sync
+workers a process only ever has one request, hence one hash, in flight.
+
+The pool is per process, so PASSWORD_HASH_WORKERS is set here to split
+PASSWORD_HASH_CORES (half the host's cores unless set) between the worker
+processes. A burst of logins then holds at most that many cores host-wide,
+and the remaining ones keep serving every other route.
+"""
+import multiprocessing
+import os
+
+
+cores = multiprocessing.cpu_count()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', max(2, cores)))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+hash_cores = int(os.environ.get('PASSWORD_HASH_CORES', max(1, cores // 2)))
+raw_env = [f"PASSWORD_HASH_WORKERS={os.environ.get('PASSWORD_HASH_WORKERS', max(1, hash_cores // workers))}"]
@@ -0,0 +1,108 @@
+"""Lazy current-user resolution for g.user.
+
+Most requests only need the logged-in user's id, which is already in the
+session, and base.html only needs to know whether someone is logged in.
+CurrentUser answers both without touching the database. The handful of
+columns templates display come from a short-TTL per-process identity cache,
+and the full User row is only loaded if a view asks for something else.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+
+from models import db, User
+
+
+Identity = namedtuple('Identity', ['id', 'first_name', 'last_name', 'username', 'email'])
+
+
+class IdentityCache:
+    """user_id -> Identity, each entry trusted for `ttl` seconds."""
+
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.extensions['identity_cache'] = IdentityCache(ttl=app.config.setdefault('IDENTITY_CACHE_TTL', 30))
+
+    def _for_app(self):
+        """The cache init_app set up for the current app, or this one."""
+
+        if has_app_context():
+            return current_app.extensions.get('identity_cache', self)
+        return self
+
+    def get(self, user_id):
+        cache = self._for_app()
+        now = time.monotonic()
+        with cache._lock:
+            entry = cache._entries.get(user_id)
+        if entry and entry[0] > now:
+            return entry[1]
+
+        row = db.session.query(
+            User.id, User.first_name, User.last_name, User.username, User.email
+        ).filter(User.id == user_id).first()
+        identity = Identity(*row) if row else None
+
+        with cache._lock:
+            cache._entries[user_id] = (now + cache.ttl, identity)
+        return identity
+
+    def invalidate(self, user_id):
+        cache = self._for_app()
+        with cache._lock:
+            cache._entries.pop(user_id, None)
+
+    def clear(self):
+        cache = self._for_app()
+        with cache._lock:
+            cache._entries.clear()
+
+
+identity_cache = IdentityCache()
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_changed_user(mapper, connection, target):
+    """Profile changes made through this process are visible immediately;
+    other workers pick them up when their entry expires."""
+
+    identity_cache.invalidate(target.id)
+
+
+class CurrentUser:
+    """Stand-in for the logged-in User that only queries when it has to."""
+
+    def __init__(self, user_id):
+        self.id = user_id
+        self._user = None
+
+    @property
+    def identity(self):
+        return identity_cache.get(self.id)
+
+    def __bool__(self):
+        return self.identity is not None
+
+    def __getattr__(self, name):
+        # protocol probes (jinja's __html__, copy, pickle) must not load the user
+        if name.startswith('__'):
+            raise AttributeError(name)
+
+        if name in Identity._fields:
+            identity = self.identity
+            return getattr(identity, name) if identity else None
+
+        if self._user is None:
+            self._user = db.session.get(User, self.id)
+        return getattr(self._user, name)
+
+    def __repr__(self):
+        return f"<CurrentUser id={self.id}>"
@@ -0,0 +1,270 @@
+"""Bulk import of bank statements (CSV or OFX) into a user's account.
+
+Files are parsed as a stream and rows are validated and inserted in batches,
+so memory use does not depend on the file size. Derived data is adjusted
+per batch or per account, never per row:
+
+* transactions go in with one multi-row INSERT per batch,
+* Budgets.spent gets one UPDATE ... FROM per batch covering every budget the
+  batch touches,
+* the monthly_totals rollup gets one delta per (month, type, category),
+* Accounts.balance gets a single UPDATE when the import finishes, and the
+  account's balance snapshots are rebuilt in one pass.
+
+The whole import commits as one transaction: a file either goes in completely
+or not at all.
+"""
+import csv
+import io
+import re
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import func, insert, select, update
+
+from balance_snapshots import rebuild_balance_snapshots
+from categories import category_registry
+from data_version import bump_data_version
+from models import db, Accounts, Budgets, Transactions
+from monthly_totals import apply_monthly_delta
+
+
+BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%Y', '%d.%m.%Y')
+MAX_AMOUNT = Decimal('99999999.99')
+
+
+class ImportResult:
+    """Running totals for an import, handed to the progress callback after each batch."""
+
+    def __init__(self):
+        self.rows_read = 0
+        self.imported = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def __repr__(self):
+        return f"<ImportResult rows_read={self.rows_read}, imported={self.imported}, errors={self.error_count}>"
+
+
+##### parsing
+
+def parse_date(value):
+    value = (value or '').strip()
+    # OFX dates: YYYYMMDD, optionally followed by time and timezone
+    if value[:8].isdigit():
+        value = f"{value[:4]}-{value[4:6]}-{value[6:8]}"
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"unrecognised date '{value}'")
+
+
+def read_csv(stream):
+    """Yield (line number, raw row dict) from a CSV file with a header row.
+
+    Expected columns are date and amount, plus the optional type, description
+    and category. Column names are matched case-insensitively.
+    """
+
+    reader = csv.DictReader(stream)
+    if reader.fieldnames is None:
+        return
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+
+    for row in reader:
+        yield reader.line_num, row
+
+
+OFX_TRANSACTION = re.compile(r'<STMTTRN>(.*?)</STMTTRN>', re.S | re.I)
+OFX_FIELD = re.compile(r'<(\w+)>([^<\r\n]*)')
+
+
+def read_ofx(stream, chunk_size=64 * 1024):
+    """Yield (transaction number, raw row dict) from an OFX/QFX statement.
+
+    Reads fixed-size chunks and only keeps the unfinished tail between them,
+    so even single-line OFX files are parsed in constant memory.
+    """
+
+    buffer = ''
+    number = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        buffer += chunk
+        last_end = 0
+        for match in OFX_TRANSACTION.finditer(buffer):
+            number += 1
+            fields = {tag.upper(): value.strip() for tag, value in OFX_FIELD.findall(match.group(1))}
+            amount = fields.get('TRNAMT', '')
+            yield number, {
+                'date': fields.get('DTPOSTED', ''),
+                'amount': amount,
+                'type': 'expense' if amount.startswith('-') else 'income',
+                'description': fields.get('NAME') or fields.get('MEMO') or '',
+            }
+            last_end = match.end()
+        buffer = buffer[last_end:]
+        if not chunk:
+            break
+        # an opening tag without its close yet: keep it, drop anything before it
+        start = buffer.upper().rfind('<STMTTRN>')
+        buffer = buffer[start:] if start != -1 else buffer[-len('<STMTTRN>'):]
+
+
+def read_statement(stream, format):
+    if format == 'ofx':
+        return read_ofx(stream)
+    return read_csv(stream)
+
+
+def guess_format(filename):
+    return 'ofx' if filename and filename.lower().endswith(('.ofx', '.qfx')) else 'csv'
+
+
+def validate_row(raw):
+    """Turn a raw row into column values for Transactions. Raises ValueError."""
+
+    transaction_date = parse_date(raw.get('date'))
+
+    try:
+        amount = Decimal((raw.get('amount') or '').replace(',', '').replace('$', '').strip())
+    except InvalidOperation:
+        raise ValueError(f"invalid amount '{raw.get('amount')}'")
+
+    type = (raw.get('type') or '').strip().lower()
+    if not type:
+        type = 'expense' if amount < 0 else 'income'
+    if type not in ('income', 'expense'):
+        raise ValueError(f"type must be income or expense, got '{type}'")
+
+    amount = abs(amount).quantize(Decimal('0.01'))
+    if amount == 0:
+        raise ValueError("amount must not be zero")
+    if amount > MAX_AMOUNT:
+        raise ValueError(f"amount {amount} is too large")
+
+    category_id = None
+    category_name = (raw.get('category') or '').strip()
+    if category_name and type == 'expense':
+        category_id = category_registry.id_for_name(category_name)
+        if category_id is None:
+            raise ValueError(f"unknown category '{category_name}'")
+
+    return {
+        'type': type,
+        'description': (raw.get('description') or '').strip() or None,
+        'amount': amount,
+        'date': transaction_date,
+        'category_id': category_id,
+    }
+
+
+##### writing
+
+def _apply_budget_spent(user_id, transaction_ids):
+    """Add this batch's expenses to every budget they fall into, in one statement."""
+
+    spent = select(
+        Budgets.id.label('budget_id'),
+        func.sum(Transactions.amount).label('total')
+    ).join(
+        Transactions,
+        (Transactions.user_id == Budgets.user_id)
+        & (Transactions.category_id == Budgets.category_id)
+        & (Transactions.date >= Budgets.start_date)
+        & (Transactions.date <= Budgets.end_date)
+    ).where(
+        Budgets.user_id == user_id,
+        Transactions.type == 'expense',
+        Transactions.id.in_(transaction_ids)
+    ).group_by(Budgets.id).subquery()
+
+    db.session.execute(
+        update(Budgets)
+        .where(Budgets.id == spent.c.budget_id)
+        .values(spent=func.coalesce(Budgets.spent, 0) + spent.c.total)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _write_batch(batch, account, monthly, result):
+    table = Transactions.__table__
+    ids = db.session.connection().execute(
+        insert(table).returning(table.c.id),
+        [dict(row, account_id=account.id, user_id=account.user_id) for row in batch]
+    ).scalars().all()
+
+    _apply_budget_spent(account.user_id, ids)
+
+    for row in batch:
+        key = (row['date'].year, row['date'].month, row['type'], row['category_id'])
+        monthly[key][0] += row['amount']
+        monthly[key][1] += 1
+
+    result.imported += len(ids)
+
+
+def import_transactions(stream, account, format='csv', batch_size=BATCH_SIZE, progress=None):
+    """Import a text stream of statement rows into `account`. Returns an ImportResult.
+
+    Rows that fail validation are reported in the result and skipped. The
+    caller commits.
+    """
+
+    result = ImportResult()
+    monthly = defaultdict(lambda: [Decimal('0'), 0])
+    balance_delta = Decimal('0')
+    batch = []
+
+    for line, raw in read_statement(stream, format):
+        result.rows_read += 1
+        try:
+            row = validate_row(raw)
+        except ValueError as e:
+            result.add_error(line, str(e))
+            continue
+
+        balance_delta += row['amount'] if row['type'] == 'income' else -row['amount']
+        batch.append(row)
+
+        if len(batch) >= batch_size:
+            _write_batch(batch, account, monthly, result)
+            batch = []
+            if progress:
+                progress(result)
+
+    if batch:
+        _write_batch(batch, account, monthly, result)
+        if progress:
+            progress(result)
+
+    if result.imported:
+        for (year, month, type, category_id), (total, count) in monthly.items():
+            apply_monthly_delta(account.user_id, year, month, type, category_id, total, count)
+
+        rebuild_balance_snapshots(account_id=account.id)
+        db.session.execute(
+            update(Accounts)
+            .where(Accounts.id == account.id)
+            .values(balance=func.coalesce(Accounts.balance, 0) + balance_delta)
+            .execution_options(synchronize_session=False)
+        )
+        bump_data_version(account.user_id)
+
+    return result
+
+
+def open_text(binary_stream):
+    """Wrap an uploaded (binary) file for the parsers, tolerating a UTF-8 BOM."""
+
+    return io.TextIOWrapper(binary_stream, encoding='utf-8-sig', errors='replace', newline='')
@@ -0,0 +1,351 @@
+"""Background jobs for work that can wait until after a write has committed.
+
+Code in a write path calls `job_queue.defer(name, user_id)`. The job runs
+once the session commits, and never if it rolls back. Jobs are deduplicated
+per (name, user): deferring one that is already waiting is a no-op.
+JOBS_BACKEND selects where jobs wait:
+
+* 'thread': a bounded in-process queue served by JOBS_WORKERS threads. When
+  the queue is full the job runs in the caller's thread instead, so a burst
+  of writes slows down rather than piling up work.
+* 'postgres': jobs are rows in the `jobs` table, inserted in the same
+  transaction as the write. They survive restarts and are shared by every
+  worker process. Threads claim them with FOR UPDATE SKIP LOCKED; the
+  one-pending-row-per-(name, user) index bounds the backlog.
+* 'inline': run right after commit in the caller's thread (tests, scripts).
+
+Failed jobs are retried with exponential backoff up to JOBS_MAX_ATTEMPTS
+times. `drain()`, registered with atexit, stops taking new work and waits
+for the queue to empty; jobs deferred after that run inline.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app, has_app_context
+from sqlalchemy import delete, event, exists, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from models import db, Job
+from routing import RoutingSession
+
+
+log = logging.getLogger(__name__)
+
+
+class JobQueue:
+
+    def __init__(self):
+        self.handlers = {}
+        self.app = None
+        self.backend = 'inline'
+        self.workers = 2
+        self.max_pending = 1000
+        self.max_attempts = 3
+        self.retry_delay = 0.5
+        self.poll_interval = 1.0
+        self.stale_after = 600
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._threads = []
+        self._pid = None
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._counts = defaultdict(int)
+        self._drain_registered = False
+
+    def init_app(self, app):
+        """Give the app its own queue, running the handlers registered here."""
+
+        job_queue = JobQueue()
+        job_queue.handlers = self.handlers
+        job_queue.configure(app)
+        app.extensions['job_queue'] = job_queue
+
+    def _for_app(self):
+        """The queue init_app set up for the current app; a queue made for an app is used as is."""
+
+        if self.app is None and has_app_context():
+            return current_app.extensions.get('job_queue', self)
+        return self
+
+    def configure(self, app):
+        self.app = app
+        self.backend = app.config.setdefault('JOBS_BACKEND', 'thread')
+        self.workers = app.config.setdefault('JOBS_WORKERS', 2)
+        self.max_pending = app.config.setdefault('JOBS_MAX_PENDING', 1000)
+        self.max_attempts = app.config.setdefault('JOBS_MAX_ATTEMPTS', 3)
+        self.retry_delay = app.config.setdefault('JOBS_RETRY_DELAY', 0.5)
+        self.poll_interval = app.config.setdefault('JOBS_POLL_INTERVAL', 1.0)
+        self.stale_after = app.config.setdefault('JOBS_STALE_AFTER', 600)
+        self._queue = queue.Queue(self.max_pending)
+        self._pending = set()
+        self._stopping = False
+
+        if self.backend == 'postgres':
+            # pick up jobs left by earlier processes without waiting for a write
+            app.before_request(self._start_workers)
+
+        if not self._drain_registered:
+            atexit.register(self.drain)
+            self._drain_registered = True
+
+    def handler(self, name):
+        """Register a function taking user_id as the job called `name`."""
+
+        def decorator(func):
+            self.handlers[name] = func
+            return func
+
+        return decorator
+
+    def defer(self, name, user_id):
+        """Run job `name` for the user once the current transaction commits."""
+
+        job_queue = self._for_app()
+        if name not in job_queue.handlers:
+            raise KeyError(f"Unknown job '{name}'.")
+
+        deferred = db.session.info.setdefault('deferred_jobs', [])
+        if (job_queue, name, user_id) in deferred:
+            return
+
+        if job_queue.backend == 'postgres':
+            db.session.execute(
+                pg_insert(Job.__table__)
+                .values(name=name, user_id=user_id, status='pending', attempts=0,
+                        run_after=datetime.utcnow(), created_at=datetime.utcnow())
+                .on_conflict_do_nothing(index_elements=['name', 'user_id'], index_where=Job.status == 'pending')
+            )
+
+        deferred.append((job_queue, name, user_id))
+
+    def _dispatch(self, name, user_id):
+        """Hand a committed job to the backend."""
+
+        if self.backend == 'postgres':
+            self._start_workers()
+            self._wakeup.set()
+            return
+
+        if self.backend == 'inline' or self._stopping:
+            self._run_with_retries(name, user_id)
+            return
+
+        self._start_workers()
+        key = (name, user_id)
+        with self._lock:
+            if key in self._pending:
+                self._counts['deduplicated'] += 1
+                return
+            try:
+                self._queue.put_nowait(key)
+                self._pending.add(key)
+                return
+            except queue.Full:
+                self._counts['ran_in_caller'] += 1
+
+        self._run_with_retries(name, user_id)
+
+    ##### running jobs
+
+    def _app(self):
+        return current_app._get_current_object() if has_app_context() else self.app
+
+    def _run(self, name, user_id, app):
+        # A fresh app context gets its own session, apart from the caller's
+        with app.app_context():
+            try:
+                self.handlers[name](user_id)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+    def _run_with_retries(self, name, user_id, app=None):
+        app = app or self._app()
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self._run(name, user_id, app)
+                self._count('succeeded')
+                return True
+            except Exception:
+                if attempt == self.max_attempts:
+                    log.exception("Job %s for user %s failed after %s attempts", name, user_id, attempt)
+                    self._count('failed')
+                    return False
+                self._count('retried')
+                time.sleep(self.retry_delay * 2 ** (attempt - 1))
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    ##### worker threads
+
+    def _start_workers(self):
+        if self._pid == os.getpid() or self._stopping:
+            return
+
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # forked: the parent's queue and threads are not ours
+                self._queue = queue.Queue(self.max_pending)
+                self._pending = set()
+            self._pid = os.getpid()
+
+            target = self._work_durable if self.backend == 'postgres' else self._work
+            self._threads = [threading.Thread(target=target, name=f'jobs-{n}', daemon=True)
+                             for n in range(self.workers)]
+            for thread in self._threads:
+                thread.start()
+
+    def _work(self):
+        app = self.app
+        while True:
+            key = self._queue.get()
+            try:
+                if key is None:
+                    return
+                with self._lock:
+                    self._pending.discard(key)
+                self._run_with_retries(*key, app=app)
+            finally:
+                self._queue.task_done()
+
+    def _work_durable(self):
+        app = self.app
+        with app.app_context():
+            self._requeue_stale()
+
+        while not self._stopping:
+            with app.app_context():
+                job = self._claim()
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            error = None
+            try:
+                if job.name not in self.handlers:
+                    raise KeyError(f"Unknown job '{job.name}'.")
+                self._run(job.name, job.user_id, app)
+            except Exception as e:
+                log.exception("Job %s for user %s failed (attempt %s)", job.name, job.user_id, job.attempts)
+                error = repr(e)
+
+            with app.app_context():
+                self._finish(job, error)
+
+    def _claim(self):
+        """Mark the oldest due pending job running and return it, or None."""
+
+        due = select(Job.id).where(
+            Job.status == 'pending', Job.run_after <= datetime.utcnow()
+        ).order_by(Job.run_after, Job.id).limit(1).with_for_update(skip_locked=True).scalar_subquery()
+
+        job = db.session.execute(
+            update(Job.__table__).where(Job.id == due)
+            .values(status='running', attempts=Job.attempts + 1, started_at=datetime.utcnow())
+            .returning(Job.id, Job.name, Job.user_id, Job.attempts)
+        ).first()
+        db.session.commit()
+        return job
+
+    def _finish(self, job, error):
+        if error is None:
+            db.session.execute(delete(Job.__table__).where(Job.id == job.id))
+            self._count('succeeded')
+
+        elif job.attempts >= self.max_attempts:
+            db.session.execute(update(Job.__table__).where(Job.id == job.id).values(status='failed', last_error=error))
+            self._count('failed')
+
+        else:
+            self._retry_later(job.id, job.name, job.user_id,
+                              datetime.utcnow() + timedelta(seconds=self.retry_delay * 2 ** (job.attempts - 1)),
+                              error)
+            self._count('retried')
+
+        db.session.commit()
+
+    def _retry_later(self, job_id, name, user_id, run_after, error=None):
+        """Put a job back to pending, unless a newer pending twin will do its work."""
+
+        twin = exists().where(Job.name == name, Job.user_id == user_id, Job.status == 'pending')
+        if db.session.query(twin).scalar():
+            db.session.execute(delete(Job.__table__).where(Job.id == job_id))
+        else:
+            db.session.execute(update(Job.__table__).where(Job.id == job_id)
+                               .values(status='pending', run_after=run_after, last_error=error))
+
+    def _requeue_stale(self):
+        """Jobs left running by a process that died go back to pending."""
+
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+        stale = db.session.execute(
+            select(Job.id, Job.name, Job.user_id).where(Job.status == 'running', Job.started_at < cutoff)
+            .with_for_update(skip_locked=True)
+        ).all()
+        for job in stale:
+            self._retry_later(job.id, job.name, job.user_id, datetime.utcnow())
+        db.session.commit()
+
+    ##### shutdown and stats
+
+    def drain(self, timeout=30):
+        """Stop taking new work and wait up to `timeout` seconds for queued jobs.
+
+        Returns True when every worker finished in time. Durable jobs still
+        pending stay in the table for the next process.
+        """
+
+        self._stopping = True
+        deadline = time.monotonic() + timeout
+        threads = self._threads if self._pid == os.getpid() else []
+
+        if self.backend == 'thread':
+            for _ in threads:
+                try:
+                    self._queue.put(None, timeout=max(0, deadline - time.monotonic()))
+                except queue.Full:
+                    break
+        self._wakeup.set()
+
+        for thread in threads:
+            thread.join(max(0, deadline - time.monotonic()))
+        return not any(thread.is_alive() for thread in threads)
+
+    def stats(self):
+        job_queue = self._for_app()
+        with job_queue._lock:
+            return {
+                'backend': job_queue.backend,
+                'queued': job_queue._queue.qsize() if job_queue.backend == 'thread' else None,
+                'workers': sum(thread.is_alive() for thread in job_queue._threads),
+                **{name: job_queue._counts[name]
+                   for name in ('succeeded', 'retried', 'failed', 'deduplicated', 'ran_in_caller')},
+            }
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _dispatch_deferred(session):
+    for job_queue, name, user_id in session.info.pop('deferred_jobs', []):
+        job_queue._dispatch(name, user_id)
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _discard_deferred(session):
+    session.info.pop('deferred_jobs', None)
+
+
+job_queue = JobQueue()
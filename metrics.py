@@ -0,0 +1,209 @@
+"""Per-endpoint request metrics in the Prometheus text format.
+
+Flask request signals time each request. SQLAlchemy cursor events count the
+statements it runs and the time they take, and `timed_chart` adds the time
+spent building the chart series served by /api/charts. Everything is
+aggregated per endpoint in this process and served from /metrics to
+scrapers that send the METRICS_TOKEN bearer token. Under gunicorn each worker
+reports its own numbers; Prometheus sums them across scrape targets.
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from functools import wraps
+
+from flask import g, has_app_context, request, request_finished, request_started, request_tearing_down
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from chart_cache import chart_cache
+from jobs import job_queue
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(float(bound))
+            yield f"{name}_bucket{_labels(**labels, le=le)} {cumulative}"
+        yield f"{name}_sum{_labels(**labels)} {self.sum}"
+        yield f"{name}_count{_labels(**labels)} {cumulative}"
+
+
+def _labels(**labels):
+    pairs = ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+    return f"{{{pairs}}}"
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._requests = defaultdict(int)
+            self._latency = {}
+            self._statements_per_request = {}
+            self._sql_statements = defaultdict(int)
+            self._sql_seconds = defaultdict(float)
+            self._chart_seconds = defaultdict(float)
+
+    def init_app(self, app):
+        if not app.config.setdefault('METRICS_ENABLED', True):
+            return
+
+        request_started.connect(self._request_started, app)
+        request_finished.connect(self._request_finished, app)
+        request_tearing_down.connect(self._request_tearing_down, app)
+        _listen_for_sql()
+
+    ##### per-request state, kept on g
+
+    def _request_started(self, sender, **extra):
+        g.request_metrics = {'started': time.perf_counter(), 'status': 500,
+                             'sql_statements': 0, 'sql_seconds': 0.0, 'chart_seconds': 0.0}
+
+    def _request_finished(self, sender, response, **extra):
+        state = g.get('request_metrics')
+        if state is not None:
+            state['status'] = response.status_code
+
+    def _request_tearing_down(self, sender, **extra):
+        state = g.pop('request_metrics', None)
+        if state is None:
+            return
+
+        elapsed = time.perf_counter() - state['started']
+        endpoint = request.endpoint or 'unmatched'
+
+        with self._lock:
+            self._requests[(endpoint, request.method, state['status'])] += 1
+            self._latency.setdefault(endpoint, Histogram(LATENCY_BUCKETS)).observe(elapsed)
+            self._statements_per_request.setdefault(
+                endpoint, Histogram(SQL_STATEMENT_BUCKETS)).observe(state['sql_statements'])
+            self._sql_statements[endpoint] += state['sql_statements']
+            self._sql_seconds[endpoint] += state['sql_seconds']
+            self._chart_seconds[endpoint] += state['chart_seconds']
+
+    ##### exposition
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+
+        with self._lock:
+            lines = [
+                '# HELP wealthwatcher_requests_total Requests handled, by endpoint, method and status.',
+                '# TYPE wealthwatcher_requests_total counter',
+            ]
+            for (endpoint, method, status), count in sorted(self._requests.items()):
+                lines.append(f"wealthwatcher_requests_total"
+                             f"{_labels(endpoint=endpoint, method=method, status=status)} {count}")
+
+            lines += [
+                '# HELP wealthwatcher_request_duration_seconds Request latency by endpoint.',
+                '# TYPE wealthwatcher_request_duration_seconds histogram',
+            ]
+            for endpoint, histogram in sorted(self._latency.items()):
+                lines += histogram.samples('wealthwatcher_request_duration_seconds', {'endpoint': endpoint})
+
+            lines += [
+                '# HELP wealthwatcher_sql_statements_per_request SQL statements run per request, by endpoint.',
+                '# TYPE wealthwatcher_sql_statements_per_request histogram',
+            ]
+            for endpoint, histogram in sorted(self._statements_per_request.items()):
+                lines += histogram.samples('wealthwatcher_sql_statements_per_request', {'endpoint': endpoint})
+
+            for name, help_text, values in (
+                ('wealthwatcher_sql_statements_total', 'SQL statements run, by endpoint.', self._sql_statements),
+                ('wealthwatcher_sql_seconds_total', 'Time spent executing SQL, by endpoint.', self._sql_seconds),
+                ('wealthwatcher_chart_seconds_total', 'Time spent building chart series, by endpoint.',
+                 self._chart_seconds),
+            ):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+                for endpoint, value in sorted(values.items()):
+                    lines.append(f"{name}{_labels(endpoint=endpoint)} {value}")
+
+        charts = chart_cache.stats()['charts']
+        for result in ('hits', 'misses'):
+            name = f'wealthwatcher_chart_cache_{result}_total'
+            lines += [f'# HELP {name} Chart cache {result}, by chart.', f'# TYPE {name} counter']
+            for chart, counts in sorted(charts.items()):
+                lines.append(f"{name}{_labels(chart=chart)} {counts[result]}")
+
+        jobs = job_queue.stats()
+        lines += ['# HELP wealthwatcher_jobs_total Background jobs by outcome.', '# TYPE wealthwatcher_jobs_total counter']
+        for outcome in ('succeeded', 'retried', 'failed', 'deduplicated', 'ran_in_caller'):
+            lines.append(f"wealthwatcher_jobs_total{_labels(outcome=outcome)} {jobs[outcome]}")
+        if jobs['queued'] is not None:
+            lines += ['# HELP wealthwatcher_jobs_queued Jobs waiting in this worker\'s queue.',
+                      '# TYPE wealthwatcher_jobs_queued gauge', f"wealthwatcher_jobs_queued {jobs['queued']}"]
+
+        return '\n'.join(lines) + '\n'
+
+
+def _request_state():
+    return g.get('request_metrics') if has_app_context() else None
+
+
+_sql_listening = False
+
+
+def _listen_for_sql():
+    """Time every cursor execution on every engine, primary and replica alike."""
+
+    global _sql_listening
+    if _sql_listening:
+        return
+    _sql_listening = True
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context.metrics_started = time.perf_counter()
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        state = _request_state()
+        if state is not None:
+            state['sql_statements'] += 1
+            state['sql_seconds'] += time.perf_counter() - context.metrics_started
+
+
+def timed_chart(func):
+    """Add the time spent in a chart data builder to the current request's metrics."""
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            state = _request_state()
+            if state is not None:
+                state['chart_seconds'] += time.perf_counter() - started
+
+    return wrapper
+
+
+metrics = Metrics()
@@ -0,0 +1,56 @@
+"""Add monthly_totals rollup
+
+Revision ID: 7b2e4c1f9a60
+Revises: a3f1c9d27e44
+Create Date: 2026-10-18 10:03:17.552904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b2e4c1f9a60'
+down_revision = 'a3f1c9d27e44'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('monthly_totals',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Integer(), nullable=False),
+    sa.Column('type', sa.Text(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=True),
+    sa.Column('total', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('monthly_totals', schema=None) as batch_op:
+        batch_op.create_index('ix_monthly_totals_user_id_year_month', ['user_id', 'year', 'month'], unique=False)
+
+    # backfill from existing history
+    op.execute("""
+        INSERT INTO monthly_totals (user_id, year, month, type, category_id, total, count)
+        SELECT user_id,
+               CAST(EXTRACT(year FROM date) AS INTEGER),
+               CAST(EXTRACT(month FROM date) AS INTEGER),
+               type,
+               category_id,
+               SUM(amount),
+               COUNT(id)
+        FROM transactions
+        WHERE date IS NOT NULL AND type IS NOT NULL
+        GROUP BY user_id, EXTRACT(year FROM date), EXTRACT(month FROM date), type, category_id
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('monthly_totals', schema=None) as batch_op:
+        batch_op.drop_index('ix_monthly_totals_user_id_year_month')
+
+    op.drop_table('monthly_totals')
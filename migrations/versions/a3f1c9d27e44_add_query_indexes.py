@@ -0,0 +1,47 @@
+"""Add indexes for per-user lookups
+
+Revision ID: a3f1c9d27e44
+Revises: 5ca8cbb465e3
+Create Date: 2026-10-18 09:12:41.218734
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f1c9d27e44'
+down_revision = '5ca8cbb465e3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.create_index('ix_transactions_user_id_date', ['user_id', 'date'], unique=False)
+        batch_op.create_index('ix_transactions_account_id_date', ['account_id', 'date'], unique=False)
+        batch_op.create_index('ix_transactions_user_id_type_date', ['user_id', 'type', 'date'], unique=False)
+
+    with op.batch_alter_table('budgets', schema=None) as batch_op:
+        batch_op.create_index('ix_budgets_user_id_category_id_dates', ['user_id', 'category_id', 'start_date', 'end_date'], unique=False)
+
+    with op.batch_alter_table('accounts', schema=None) as batch_op:
+        batch_op.create_index('ix_accounts_user_id', ['user_id'], unique=False)
+
+    with op.batch_alter_table('goals', schema=None) as batch_op:
+        batch_op.create_index('ix_goals_user_id', ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('goals', schema=None) as batch_op:
+        batch_op.drop_index('ix_goals_user_id')
+
+    with op.batch_alter_table('accounts', schema=None) as batch_op:
+        batch_op.drop_index('ix_accounts_user_id')
+
+    with op.batch_alter_table('budgets', schema=None) as batch_op:
+        batch_op.drop_index('ix_budgets_user_id_category_id_dates')
+
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.drop_index('ix_transactions_user_id_type_date')
+        batch_op.drop_index('ix_transactions_account_id_date')
+        batch_op.drop_index('ix_transactions_user_id_date')
@@ -0,0 +1,61 @@
+"""Add account opening balances and end-of-day balance snapshots
+
+Revision ID: b8e2f4a6c913
+Revises: f3c6d1a8b924
+Create Date: 2026-10-18 17:41:09.284615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e2f4a6c913'
+down_revision = 'f3c6d1a8b924'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('accounts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('opening_balance', sa.Numeric(precision=10, scale=2), server_default='0', nullable=False))
+
+    # existing accounts: whatever their stored balance is not explained by their transactions
+    op.execute("""
+        UPDATE accounts SET opening_balance = COALESCE(accounts.balance, 0) - COALESCE(totals.total, 0)
+        FROM accounts AS a
+        LEFT JOIN (
+            SELECT account_id, SUM(CASE WHEN type = 'income' THEN amount ELSE -amount END) AS total
+            FROM transactions GROUP BY account_id
+        ) AS totals ON totals.account_id = a.id
+        WHERE accounts.id = a.id
+    """)
+
+    op.create_table('account_balance_snapshots',
+    sa.Column('account_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('balance', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.ForeignKeyConstraint(['account_id'], ['accounts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('account_id', 'date')
+    )
+
+    # backfill from existing history
+    op.execute("""
+        INSERT INTO account_balance_snapshots (account_id, date, balance)
+        SELECT daily.account_id, daily.date,
+               accounts.opening_balance + SUM(daily.delta) OVER (PARTITION BY daily.account_id ORDER BY daily.date)
+        FROM (
+            SELECT account_id, date, SUM(CASE WHEN type = 'income' THEN amount ELSE -amount END) AS delta
+            FROM transactions
+            WHERE date IS NOT NULL AND type IS NOT NULL AND amount IS NOT NULL
+            GROUP BY account_id, date
+        ) AS daily
+        JOIN accounts ON accounts.id = daily.account_id
+    """)
+
+
+def downgrade():
+    op.drop_table('account_balance_snapshots')
+
+    with op.batch_alter_table('accounts', schema=None) as batch_op:
+        batch_op.drop_column('opening_balance')
@@ -0,0 +1,26 @@
+"""Add data_version to users
+
+Revision ID: c48d0e6b2f15
+Revises: 7b2e4c1f9a60
+Create Date: 2026-10-18 11:26:50.904311
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c48d0e6b2f15'
+down_revision = '7b2e4c1f9a60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('data_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('data_version')
@@ -0,0 +1,56 @@
+"""Add full-text search vector and trigram index on transaction descriptions
+
+Revision ID: c7d1e9a3f284
+Revises: b8e2f4a6c913
+Create Date: 2026-10-18 18:26:51.903417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d1e9a3f284'
+down_revision = 'b8e2f4a6c913'
+branch_labels = None
+depends_on = None
+
+
+def trigram_available():
+    return op.get_bind().exec_driver_sql(
+        "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+    ).first() is not None
+
+
+def upgrade():
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+
+    op.execute("""
+        CREATE TRIGGER transactions_search_vector_update
+        BEFORE INSERT OR UPDATE OF description ON transactions FOR EACH ROW
+        EXECUTE FUNCTION tsvector_update_trigger(search_vector, 'pg_catalog.english', description)
+    """)
+    # backfill from existing descriptions
+    op.execute("UPDATE transactions SET search_vector = to_tsvector('pg_catalog.english', COALESCE(description, ''))")
+
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.create_index('ix_transactions_search_vector', ['search_vector'], unique=False, postgresql_using='gin')
+
+    # fuzzy matching is optional: search.py only uses it when the extension is installed
+    if trigram_available():
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE INDEX ix_transactions_description_trgm ON transactions USING gin (description gin_trgm_ops)")
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_transactions_description_trgm")
+
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.drop_index('ix_transactions_search_vector', postgresql_using='gin')
+
+    op.execute("DROP TRIGGER transactions_search_vector_update ON transactions")
+
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.drop_column('search_vector')
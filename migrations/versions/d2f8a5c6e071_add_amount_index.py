@@ -0,0 +1,25 @@
+"""Add (user_id, amount) index to transactions
+
+Revision ID: d2f8a5c6e071
+Revises: c7d1e9a3f284
+Create Date: 2026-10-18 17:52:36.408113
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f8a5c6e071'
+down_revision = 'c7d1e9a3f284'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.create_index('ix_transactions_user_id_amount', ['user_id', 'amount'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.drop_index('ix_transactions_user_id_amount')
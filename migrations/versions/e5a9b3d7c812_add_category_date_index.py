@@ -0,0 +1,42 @@
+"""Add (user_id, category_id, date) index to transactions
+
+Revision ID: e5a9b3d7c812
+Revises: c48d0e6b2f15
+Create Date: 2026-10-18 13:41:02.117385
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a9b3d7c812'
+down_revision = 'c48d0e6b2f15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.create_index('ix_transactions_user_id_category_id_date', ['user_id', 'category_id', 'date'], unique=False)
+
+    # budgets created after their expenses started out empty; fill them in
+    op.execute("""
+        UPDATE budgets SET spent = totals.spent
+        FROM (
+            SELECT budgets.id AS budget_id, COALESCE(SUM(transactions.amount), 0) AS spent
+            FROM budgets
+            LEFT OUTER JOIN transactions
+              ON transactions.user_id = budgets.user_id
+             AND transactions.category_id = budgets.category_id
+             AND transactions.date >= budgets.start_date
+             AND transactions.date <= budgets.end_date
+             AND transactions.type = 'expense'
+            GROUP BY budgets.id
+        ) AS totals
+        WHERE budgets.id = totals.budget_id
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.drop_index('ix_transactions_user_id_category_id_date')
@@ -3,13 +3,21 @@ from datetime import datetime
 
 from flask_bcrypt import Bcrypt
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import check_password_hash, generate_password_hash
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import relationship
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy import DDL, case, event
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+from passwords import password_hasher
+from routing import RoutingSession
 
 
 bcrypt = Bcrypt()
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# text search configuration of Transactions.search_vector
+SEARCH_CONFIG = 'english'
 
 
 def connect_db(app):
@@ -65,6 +73,8 @@ class User(db.Model):
     email = db.Column(db.Text, nullable=False)
     password = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    #bumped on every write to the user's data, used to key cached charts
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     #define one-to-many relationship with accounts
     accounts = db.relationship('Accounts', backref='user', lazy=True)
@@ -76,7 +86,11 @@ class User(db.Model):
     @classmethod
     def authentication(cls, email, password):
         user = cls.query.filter_by(email=email).first()
-        if user and check_password_hash(user.password, password):
+        if user and password_hasher.verify(user.password, password):
+            # upgrade hashes made with an older method or cost while we have the password
+            if password_hasher.needs_rehash(user.password):
+                user.password = password_hasher.hash(password)
+                db.session.commit()
             return user
         else:
             return None
@@ -84,7 +98,7 @@ class User(db.Model):
 
     @classmethod
     def signup(cls, first_name, last_name, username, email, password):
-        hashed_pwd = generate_password_hash(password)
+        hashed_pwd = password_hasher.hash(password)
         user = cls(first_name=first_name, last_name=last_name, username=username, email=email, password=hashed_pwd)
         db.session.add(user)
         try:
@@ -104,6 +118,8 @@ class Accounts(db.Model):
     name = db.Column(db.Text)
     account_type = db.Column(db.Text)
     balance = db.Column(db.Numeric(10,2))
+    # balance when the account was added, before any of its transactions
+    opening_balance = db.Column(db.Numeric(10,2), nullable=False, default=0, server_default='0')
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
 
     #define many-to-one relationship with users
@@ -111,6 +127,10 @@ class Accounts(db.Model):
     #define one-to-many relationship with transactions
     transactions = db.relationship('Transactions', backref='account', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_accounts_user_id', 'user_id'),
+    )
+
 
 
 class Budgets(db.Model):
@@ -131,6 +151,11 @@ class Budgets(db.Model):
     category = db.relationship('Category', backref='budgets')
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
 
+    __table_args__ = (
+        # budget matching in addtransaction: user + category, then date range
+        db.Index('ix_budgets_user_id_category_id_dates', 'user_id', 'category_id', 'start_date', 'end_date'),
+    )
+
     def __repr__(self):
         return f"<Budget id={self.id}, category_name={self.category_name}, amount={self.amount}, start_date={self.start_date}, end_date={self.end_date}, created_at={self.created_at}>"
 
@@ -152,6 +177,52 @@ class Transactions(db.Model):
     account_id = db.Column(db.Integer, db.ForeignKey('accounts.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)  
     user = db.relationship('User', backref='transactions')
+    #full-text index of the description, kept current by a trigger on Postgres (see search.py)
+    search_vector = db.deferred(db.Column(TSVECTOR().with_variant(db.Text(), 'sqlite'), nullable=True))
+
+    @hybrid_property
+    def signed_amount(self):
+        """Amount as it affects the account balance: income adds, expenses subtract."""
+        return self.amount if self.type == 'income' else -self.amount
+
+    @signed_amount.expression
+    def signed_amount(cls):
+        return case((cls.type == 'income', cls.amount), else_=-cls.amount)
+
+    __table_args__ = (
+        # per-user listings and monthly aggregates
+        db.Index('ix_transactions_user_id_date', 'user_id', 'date'),
+        # per-account history ordered by date (balance chart)
+        db.Index('ix_transactions_account_id_date', 'account_id', 'date'),
+        # income/expense split per user
+        db.Index('ix_transactions_user_id_type_date', 'user_id', 'type', 'date'),
+        # per-category sums over a date range (budget spent)
+        db.Index('ix_transactions_user_id_category_id_date', 'user_id', 'category_id', 'date'),
+        # listings sorted by amount (see transaction_filters.py)
+        db.Index('ix_transactions_user_id_amount', 'user_id', 'amount'),
+        # full-text search; the trigram index for fuzzy matching is created below when pg_trgm exists
+        db.Index('ix_transactions_search_vector', 'search_vector', postgresql_using='gin'),
+    )
+
+
+def _trigram_available(ddl, target, bind, **kw):
+    return bind.dialect.name == 'postgresql' and bind.exec_driver_sql(
+        "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+    ).first() is not None
+
+
+event.listen(Transactions.__table__, 'after_create', DDL(
+    "CREATE TRIGGER transactions_search_vector_update "
+    "BEFORE INSERT OR UPDATE OF description ON transactions FOR EACH ROW "
+    f"EXECUTE FUNCTION tsvector_update_trigger(search_vector, 'pg_catalog.{SEARCH_CONFIG}', description)"
+).execute_if(dialect='postgresql'))
+event.listen(Transactions.__table__, 'after_create', DDL(
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm"
+).execute_if(callable_=_trigram_available))
+event.listen(Transactions.__table__, 'after_create', DDL(
+    "CREATE INDEX ix_transactions_description_trgm ON transactions USING gin (description gin_trgm_ops)"
+).execute_if(callable_=_trigram_available))
+
 
 class Goals(db.Model):
     """Goals model"""
@@ -164,4 +235,69 @@ class Goals(db.Model):
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
 
     #define many-to-one relationship with users
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
\ No newline at end of file
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_goals_user_id', 'user_id'),
+    )
+
+
+class MonthlyTotals(db.Model):
+    """Per-user monthly income/spending rollup, kept in step with transactions"""
+
+    __tablename__ = 'monthly_totals'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    type = db.Column(db.Text, nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=True)
+    total = db.Column(db.Numeric(12,2), nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_monthly_totals_user_id_year_month', 'user_id', 'year', 'month'),
+    )
+
+    def __repr__(self):
+        return f"<MonthlyTotals user_id={self.user_id}, {self.year}-{self.month:02d}, type={self.type}, category_id={self.category_id}, total={self.total}, count={self.count}>"
+
+
+class AccountBalanceSnapshot(db.Model):
+    """End-of-day balance of an account on each day it has transactions (see balance_snapshots.py)"""
+
+    __tablename__ = 'account_balance_snapshots'
+
+    account_id = db.Column(db.Integer, db.ForeignKey('accounts.id', ondelete='CASCADE'), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    balance = db.Column(db.Numeric(12,2), nullable=False)
+
+    def __repr__(self):
+        return f"<AccountBalanceSnapshot account_id={self.account_id}, date={self.date}, balance={self.balance}>"
+
+
+class Job(db.Model):
+    """Durable background job, used when JOBS_BACKEND is 'postgres' (see jobs.py)"""
+
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.Text, nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.Text, nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        # at most one pending job per (name, user): enqueueing again is a no-op
+        db.Index('ix_jobs_name_user_id_pending', 'name', 'user_id', unique=True,
+                 postgresql_where=db.text("status = 'pending'")),
+        db.Index('ix_jobs_status_run_after', 'status', 'run_after'),
+    )
+
+    def __repr__(self):
+        return f"<Job id={self.id}, name={self.name}, user_id={self.user_id}, status={self.status}, attempts={self.attempts}>"
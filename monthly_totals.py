@@ -0,0 +1,104 @@
+from sqlalchemy import Integer, cast, delete, extract, func, insert, select, update
+
+from models import db, MonthlyTotals, Transactions
+
+
+def _rollup_row(user_id, year, month, type, category_id):
+    return (
+        (MonthlyTotals.user_id == user_id)
+        & (MonthlyTotals.year == year)
+        & (MonthlyTotals.month == month)
+        & (MonthlyTotals.type == type)
+        & MonthlyTotals.category_id.is_not_distinct_from(category_id)
+    )
+
+
+def record_transaction(transaction, sign=1):
+    """Add a transaction to its month's rollup row (sign=-1 takes it back out).
+
+    Runs in the caller's session so the rollup commits together with the
+    transaction itself.
+    """
+
+    if transaction.date is None or transaction.type is None:
+        return
+
+    apply_monthly_delta(transaction.user_id, transaction.date.year, transaction.date.month,
+                        transaction.type, transaction.category_id,
+                        transaction.amount * sign, sign)
+
+
+def apply_monthly_delta(user_id, year, month, type, category_id, total, count):
+    """Add `total` and `count` to one rollup row, creating it if needed."""
+
+    match = _rollup_row(user_id, year, month, type, category_id)
+
+    row_id = select(MonthlyTotals.id).where(match).limit(1).scalar_subquery()
+    result = db.session.execute(
+        update(MonthlyTotals)
+        .where(MonthlyTotals.id == row_id)
+        .values(total=MonthlyTotals.total + total, count=MonthlyTotals.count + count)
+    )
+
+    if result.rowcount == 0:
+        db.session.add(MonthlyTotals(
+            user_id=user_id,
+            year=year,
+            month=month,
+            type=type,
+            category_id=category_id,
+            total=total,
+            count=count,
+        ))
+
+
+def rebuild_monthly_totals(user_id=None):
+    """Recompute the rollup from the transactions table, for one user or everyone."""
+
+    year = cast(extract('year', Transactions.date), Integer)
+    month = cast(extract('month', Transactions.date), Integer)
+
+    source = select(
+        Transactions.user_id, year, month, Transactions.type, Transactions.category_id,
+        func.sum(Transactions.amount), func.count(Transactions.id)
+    ).where(
+        Transactions.date.is_not(None),
+        Transactions.type.is_not(None)
+    ).group_by(
+        Transactions.user_id, year, month, Transactions.type, Transactions.category_id
+    )
+
+    clear = delete(MonthlyTotals)
+    if user_id is not None:
+        source = source.where(Transactions.user_id == user_id)
+        clear = clear.where(MonthlyTotals.user_id == user_id)
+
+    db.session.execute(clear)
+    result = db.session.execute(insert(MonthlyTotals).from_select(
+        ['user_id', 'year', 'month', 'type', 'category_id', 'total', 'count'], source
+    ))
+    return result.rowcount
+
+
+def monthly_totals_statement(user_id, year=None):
+    """SELECT of (year, month, type, total) for a user, optionally for one year."""
+
+    statement = select(
+        MonthlyTotals.year,
+        MonthlyTotals.month,
+        MonthlyTotals.type,
+        func.sum(MonthlyTotals.total).label('total')
+    ).where(MonthlyTotals.user_id == user_id)
+
+    if year is not None:
+        statement = statement.where(MonthlyTotals.year == year)
+
+    return statement.group_by(
+        MonthlyTotals.year, MonthlyTotals.month, MonthlyTotals.type
+    ).order_by(MonthlyTotals.year, MonthlyTotals.month)
+
+
+def monthly_totals_by_type(user_id, year=None):
+    """Rows of (year, month, type, total) for a user, optionally for one year."""
+
+    return db.session.execute(monthly_totals_statement(user_id, year)).all()
@@ -0,0 +1,35 @@
+from datetime import date
+
+
+DEFAULT_PER_PAGE = 25
+MAX_PER_PAGE = 100
+
+
+def encode_cursor(key, row_id):
+    """Cursor for a (key, id) position, e.g. '2024-03-05.17' or '12.50.17'."""
+
+    return f"{key}.{row_id}"
+
+
+def decode_cursor(value, parse=date.fromisoformat):
+    """Turn a cursor back into (key, id), reading the key with `parse`.
+
+    Returns None for missing or malformed cursors.
+    """
+
+    if not value:
+        return None
+    try:
+        key, row_id = value.rsplit('.', 1)
+        return parse(key), int(row_id)
+    except (ValueError, ArithmeticError):
+        return None
+
+
+def parse_per_page(value):
+    try:
+        per_page = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_PER_PAGE
+    return max(1, min(per_page, MAX_PER_PAGE))
+
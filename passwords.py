@@ -0,0 +1,133 @@
+"""Password hashing and verification for signup and login.
+
+New hashes use PASSWORD_HASH_METHOD: a werkzeug method string such as
+'scrypt:32768:8:1' or 'pbkdf2:sha256:600000', or 'bcrypt:<rounds>'.
+Verification accepts werkzeug hashes and bcrypt hashes ($2a$/$2b$/$2y$, as
+written by Flask-Bcrypt), whatever their cost. A hash in any other method
+than the configured one reports `needs_rehash`, and User.authentication
+replaces it on the next successful login. So changing the method or cost
+upgrades users as they sign in. `benchmarks/bench_passwords.py` times the
+candidates.
+
+Key derivation is deliberately slow and holds a CPU core for its whole
+duration (scrypt, pbkdf2 and bcrypt all release the GIL while they run). It
+runs on a pool of PASSWORD_HASH_WORKERS threads, so a burst of logins can
+use at most that many cores per process and every other route keeps the
+rest. At most PASSWORD_HASH_MAX_PENDING more wait for a thread; beyond that
+`PasswordHasherBusy` is raised, and the login view answers 503 instead of
+queueing indefinitely. With PASSWORD_HASH_WORKERS = 0 hashing runs in the
+caller's thread.
+
+The bound only holds for a server that runs several requests per process:
+under gunicorn's sync workers each process has a single request in flight,
+so its pool never holds more than one hash and nothing limits the total.
+gunicorn.conf.py therefore runs threaded workers and divides the hashing
+cores between the worker processes.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+from flask import current_app, has_app_context
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+BCRYPT_PREFIXES = ('$2a$', '$2b$', '$2y$')
+
+
+class PasswordHasherBusy(Exception):
+    """Too many password hashes are already running or waiting."""
+
+
+def hash_method(stored):
+    """The method string a stored hash was made with, e.g. 'scrypt:32768:8:1' or 'bcrypt:12'."""
+
+    if stored.startswith(BCRYPT_PREFIXES):
+        return f"bcrypt:{int(stored[4:6])}"
+    return stored.split('$', 1)[0]
+
+
+class PasswordHasher:
+
+    def __init__(self, method='scrypt:32768:8:1', workers=4, max_pending=64):
+        self._lock = threading.Lock()
+        self.configure(method, workers, max_pending)
+
+    def init_app(self, app):
+        app.extensions['password_hasher'] = PasswordHasher(
+            method=app.config.setdefault('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1'),
+            workers=app.config.setdefault('PASSWORD_HASH_WORKERS', 4),
+            max_pending=app.config.setdefault('PASSWORD_HASH_MAX_PENDING', 64),
+        )
+
+    def _for_app(self):
+        """The hasher init_app configured for the current app, or this one."""
+
+        if has_app_context():
+            return current_app.extensions.get('password_hasher', self)
+        return self
+
+    def configure(self, method, workers, max_pending):
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._executor = None
+        self._pid = None
+
+    def hash(self, password):
+        hasher = self._for_app()
+        return hasher._call(_hash, password, hasher.method)
+
+    def verify(self, stored, password):
+        """True when `password` matches the werkzeug or bcrypt hash `stored`."""
+
+        if not stored:
+            return False
+        return self._for_app()._call(_verify, stored, password)
+
+    def needs_rehash(self, stored):
+        return hash_method(stored) != self._for_app().method
+
+    ##### thread pool
+
+    def _call(self, func, *args):
+        if not self.workers:
+            return func(*args)
+
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        try:
+            return self._pool().submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    def _pool(self):
+        # threads do not survive a fork; each worker process starts its own pool
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='passwords')
+                    self._pid = os.getpid()
+        return self._executor
+
+
+def _hash(password, method):
+    if method.startswith('bcrypt:'):
+        rounds = int(method.split(':', 1)[1])
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('ascii')
+    return generate_password_hash(password, method=method)
+
+
+def _verify(stored, password):
+    if stored.startswith(BCRYPT_PREFIXES):
+        try:
+            return bcrypt.checkpw(password.encode('utf-8'), stored.encode('ascii'))
+        except ValueError:
+            # malformed hash, or a password longer than bcrypt's 72 bytes
+            return False
+    return check_password_hash(stored, password)
+
+
+password_hasher = PasswordHasher()
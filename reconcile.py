@@ -0,0 +1,94 @@
+"""Reconciliation of stored account balances against the ledger.
+
+Accounts.balance is kept up to date by every write, but a bug or a manual
+edit can leave it drifting from what the transactions say. The ledger
+balance of an account is its opening balance plus the signed sum of its
+transactions. Both functions here compute it for every matching account in
+one grouped pass over transactions, without loading any ORM objects:
+
+* `find_drift` streams the accounts whose stored balance differs,
+* `repair_drift` writes the ledger balance back with one UPDATE ... FROM and
+  bumps the data version of the users it touched.
+
+`flask reconcile-balances` runs them.
+"""
+from collections import namedtuple
+
+from flask import g, has_app_context
+from sqlalchemy import func, select, update
+
+from models import db, Accounts, Transactions, User
+
+
+BATCH_SIZE = 10_000
+
+
+Drift = namedtuple('Drift', 'account_id user_id stored expected')
+
+
+def ledger_balances(user_id=None):
+    """SELECT of (account_id, user_id, stored, expected) for the matching accounts."""
+
+    totals = select(
+        Transactions.account_id,
+        func.sum(Transactions.signed_amount).label('total')
+    ).group_by(Transactions.account_id)
+
+    query = select(Accounts.id.label('account_id'), Accounts.user_id, Accounts.balance.label('stored'))
+
+    if user_id is not None:
+        totals = totals.where(Transactions.user_id == user_id)
+        query = query.where(Accounts.user_id == user_id)
+
+    totals = totals.subquery()
+    expected = (Accounts.opening_balance + func.coalesce(totals.c.total, 0)).label('expected')
+    return query.add_columns(expected).outerjoin(totals, totals.c.account_id == Accounts.id)
+
+
+def find_drift(user_id=None, batch_size=BATCH_SIZE):
+    """Yield a Drift for every account whose stored balance is not its ledger balance.
+
+    Rows are streamed from a server-side cursor `batch_size` at a time, so
+    memory use does not grow with the number of accounts.
+    """
+
+    ledger = ledger_balances(user_id).subquery()
+    rows = db.session.execute(
+        select(ledger)
+        .where(ledger.c.stored.is_distinct_from(ledger.c.expected))
+        .order_by(ledger.c.account_id)
+        .execution_options(yield_per=batch_size)
+    )
+    for row in rows:
+        yield Drift(*row)
+
+
+def repair_drift(user_id=None):
+    """Set every drifted balance to its ledger balance. Returns (accounts, users) changed; the caller commits."""
+
+    ledger = ledger_balances(user_id).subquery()
+
+    repaired = (
+        update(Accounts)
+        .where(Accounts.id == ledger.c.account_id)
+        .where(Accounts.balance.is_distinct_from(ledger.c.expected))
+        .values(balance=ledger.c.expected)
+        .returning(Accounts.user_id)
+        .cte('repaired')
+    )
+    bumped = (
+        update(User)
+        .where(User.id.in_(select(repaired.c.user_id)))
+        .values(data_version=User.data_version + 1)
+        .returning(User.id)
+        .cte('bumped')
+    )
+
+    accounts, users = db.session.execute(select(
+        select(func.count()).select_from(repaired).scalar_subquery(),
+        select(func.count()).select_from(bumped).scalar_subquery(),
+    )).one()
+
+    if users and has_app_context():
+        g.pop('data_versions', None)
+    return accounts, users
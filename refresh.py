@@ -0,0 +1,30 @@
+"""Off-request refresh of a user's derived data, run by the job queue.
+
+Writes keep their small, exact updates (the account balance, the monthly
+delta, the matching budget's spent) inside the request transaction. What is
+left runs here after commit: reconciling every Budgets.spent of the user and
+rebuilding the chart data and dashboard snapshot for the new data version,
+so the next dashboard view finds the chart cache warm. With the memory cache backend only the
+worker process that handled the write is warmed; the filesystem backend is
+shared by all of them.
+"""
+from budget_spent import recompute_budget_spent
+from charts import CHART_DATA
+from dashboard import dashboard_sections
+from data_version import bump_data_version
+from jobs import job_queue
+from models import db
+
+
+REFRESH_USER = 'refresh-user'
+
+
+@job_queue.handler(REFRESH_USER)
+def refresh_user(user_id):
+    if recompute_budget_spent(user_id=user_id):
+        bump_data_version(user_id)
+        db.session.commit()
+
+    for chart in CHART_DATA.values():
+        chart(user_id)
+    dashboard_sections(user_id)
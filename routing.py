@@ -0,0 +1,75 @@
+"""Send read-only analytics queries to a replica when one is configured.
+
+The replica engine is built from REPLICA_DATABASE_URL by `init_replica` and
+kept out of SQLALCHEMY_BINDS, so create_all and migrations never touch it.
+Code opts in with `reading_from_replica()`; everything else, and anything
+inside the block that writes, keeps using the primary. Without a replica the
+block is a no-op.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from flask import current_app
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.sql.dml import UpdateBase
+
+
+_use_replica = contextvars.ContextVar('use_replica', default=False)
+
+
+@contextmanager
+def reading_from_replica():
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def init_replica(app):
+    """Create the replica engine for an app, if REPLICA_DATABASE_URL is set."""
+
+    url = app.config.get('REPLICA_DATABASE_URL')
+    app.extensions['replica_engine'] = (
+        create_engine(url, **app.config.get('REPLICA_ENGINE_OPTIONS', {})) if url else None
+    )
+
+
+def replica_engine():
+    """The replica engine for the current app, or None."""
+
+    return current_app.extensions.get('replica_engine')
+
+
+class RoutingSession(Session):
+    """Session that reads from the replica inside `reading_from_replica()`.
+
+    Once the current transaction has written, its reads stay on the primary
+    until commit or rollback so they see their own changes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if isinstance(clause, UpdateBase):
+            self.info['wrote'] = True
+
+        elif bind is None and _use_replica.get() and not self._flushing and not self._has_written():
+            engine = replica_engine()
+            if engine is not None:
+                return engine
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _has_written(self):
+        return bool(self.info.get('wrote') or self.new or self.dirty or self.deleted)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_written(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+@event.listens_for(RoutingSession, 'after_soft_rollback')
+def _clear_written(session, *args):
+    session.info.pop('wrote', None)
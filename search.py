@@ -0,0 +1,164 @@
+"""Search over a user's transaction descriptions.
+
+Every word of the query is matched as a prefix against
+Transactions.search_vector (a tsvector kept current by a trigger and served
+by a GIN index), so 'groc' finds 'Groceries'. When the pg_trgm extension is
+installed, descriptions that merely resemble the query are found too,
+through the trigram index, which catches typos such as 'walmrat'.
+
+Results are ranked by ts_rank_cd, plus the trigram word similarity when
+fuzzy matching is on. For a word that appears all over the history (a
+merchant paid every week) the first pages rank only the MAX_RANKED newest
+matches, so they cost about the same as a rare word's. Paging past those
+goes on to the older matches, ranked among themselves, so every match can
+be reached. Pages are keyed on (rank, date, id), so every page costs the
+same however deep into the results it is. Undated transactions sort after
+dated ones of equal rank.
+"""
+import re
+from collections import namedtuple
+from datetime import date
+
+from flask import current_app
+from sqlalchemy import cast, func, literal, or_, select, text, tuple_
+from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION, REGCONFIG
+from sqlalchemy.orm import aliased
+
+from models import db, Transactions, SEARCH_CONFIG
+from pagination import DEFAULT_PER_PAGE
+
+
+# A word that matches MAX_RANKED of the newest RECENT_WINDOW transactions
+# is common enough that only those newest matches are ranked
+MAX_RANKED = 1000
+RECENT_WINDOW = 10000
+
+# undated transactions page as if dated on the first day there is
+NO_DATE = date.min
+
+SearchPage = namedtuple('SearchPage', ['items', 'next_cursor', 'per_page'])
+SearchCursor = namedtuple('SearchCursor', ['older', 'rank', 'date', 'id'])
+
+
+def trigram_enabled():
+    """True when pg_trgm is installed in the app's database; checked once per app."""
+
+    extensions = current_app.extensions
+    if 'search_trigram' not in extensions:
+        extensions['search_trigram'] = db.engine.dialect.name == 'postgresql' and db.session.execute(
+            text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        ).first() is not None
+    return extensions['search_trigram']
+
+
+def prefix_query(terms):
+    """tsquery source matching every word of `terms` as a prefix, e.g. 'groc:* & mark:*'."""
+
+    words = re.findall(r'\w+', terms.lower())
+    return ' & '.join(f"{word}:*" for word in words)
+
+
+def encode_cursor(rank, day, row_id, older=False):
+    """Cursor for a (rank, date, id) position; `older` marks one past the newest matches of a common word."""
+
+    key = f"{rank!r}_{(day or NO_DATE).isoformat()}_{row_id}"
+    return f"older_{key}" if older else key
+
+
+def decode_cursor(value):
+    """Turn a cursor back into a SearchCursor. Returns None for missing or malformed cursors."""
+
+    if not value:
+        return None
+    try:
+        parts = value.split('_')
+        older = parts[0] == 'older'
+        rank, day, row_id = parts[1:] if older else parts
+        return SearchCursor(older, float(rank), date.fromisoformat(day), int(row_id))
+    except ValueError:
+        return None
+
+
+def _matches(model, terms, query):
+    """The search condition against `model`, Transactions or an alias of it."""
+
+    match = model.search_vector.op('@@')(query)
+    if trigram_enabled():
+        match = or_(match, literal(terms).op('<%')(model.description))
+    return match
+
+
+def _recent_matches(scope, terms, query):
+    """Ids of up to MAX_RANKED matches among the RECENT_WINDOW newest transactions in scope.
+
+    The window is walked newest first on (user_id, date) and stops as soon as
+    MAX_RANKED matches turn up, so it is cheap for common words, which are
+    the ones it is used for.
+    """
+
+    window = aliased(Transactions, (
+        select(Transactions)
+        .where(*scope)
+        .order_by(Transactions.date.desc(), Transactions.id.desc())
+        .limit(RECENT_WINDOW)
+        .subquery()
+    ))
+    return select(window.id).where(_matches(window, terms, query)) \
+        .order_by(window.date.desc(), window.id.desc()).limit(MAX_RANKED)
+
+
+def search_transactions(user_id, terms, account_id=None, category_id=None, after=None, per_page=DEFAULT_PER_PAGE):
+    """One page of the user's transactions matching `terms`, best match first."""
+
+    source = prefix_query(terms)
+    if not source:
+        return SearchPage([], None, per_page)
+
+    query = func.to_tsquery(cast(SEARCH_CONFIG, REGCONFIG), source)
+    rank = func.ts_rank_cd(Transactions.search_vector, query)
+    if trigram_enabled():
+        rank = rank + func.word_similarity(terms, Transactions.description)
+    # double precision, so the rank in a cursor compares equal to the row it came from
+    rank = cast(rank, DOUBLE_PRECISION)
+
+    scope = [Transactions.user_id == user_id]
+    if account_id is not None:
+        scope.append(Transactions.account_id == account_id)
+    if category_id is not None:
+        scope.append(Transactions.category_id == category_id)
+
+    day = func.coalesce(Transactions.date, NO_DATE)
+    statement = select(Transactions, rank.label('rank')).where(*scope)
+    after_key = decode_cursor(after)
+
+    def page(statement, older, cursor, limit):
+        if cursor:
+            statement = statement.where(tuple_(rank, day, Transactions.id) < tuple_(cursor.rank, cursor.date, cursor.id))
+        rows = db.session.execute(
+            statement.order_by(rank.desc(), day.desc(), Transactions.id.desc()).limit(limit)
+        ).all()
+        return [(transaction, transaction_rank, older) for transaction, transaction_rank in rows]
+
+    # The planner cannot tell how many rows a prefix query matches, so the
+    # choice between ranking every match (through the GIN index) and ranking
+    # only the newest ones is made here, from a bounded look at recent rows.
+    recent = _recent_matches(scope, terms, query)
+    if db.session.scalar(select(func.count()).select_from(recent.subquery())) < MAX_RANKED:
+        rows = page(statement.where(_matches(Transactions, terms, query)), False, after_key, per_page + 1)
+    else:
+        rows = []
+        recent_ids = recent.scalar_subquery()
+        if not (after_key and after_key.older):
+            rows = page(statement.where(Transactions.id.in_(recent_ids)), False, after_key, per_page + 1)
+        if len(rows) <= per_page:
+            # the newest matches are used up; carry on with the older ones
+            rows += page(statement.where(_matches(Transactions, terms, query), Transactions.id.not_in(recent_ids)),
+                         True, after_key if after_key and after_key.older else None, per_page + 1 - len(rows))
+
+    items = rows[:per_page]
+    next_cursor = None
+    if len(rows) > per_page:
+        last, last_rank, older = items[-1]
+        next_cursor = encode_cursor(last_rank, last.date, last.id, older)
+
+    return SearchPage([transaction for transaction, _, _ in items], next_cursor, per_page)
@@ -0,0 +1,70 @@
+// Draws the dashboard charts from /api/charts/<name>.
+// Any element with data-chart="<name>" and data-chart-url="..." is filled in
+// once the page has loaded. Pages that already have the series embed them in
+// data-chart-data and skip the request.
+(function () {
+    var transparent = { paper_bgcolor: 'rgba(0,0,0,0)', plot_bgcolor: 'rgba(0,0,0,0)' };
+
+    var charts = {
+        'financials': function (data) {
+            return {
+                traces: [
+                    { type: 'bar', name: 'Income', x: data.months, y: data.income },
+                    { type: 'bar', name: 'Spending', x: data.months, y: data.spending }
+                ],
+                layout: { barmode: 'group', title: 'Monthly Spending and Income' }
+            };
+        },
+        'accounts-balance': function (data) {
+            return {
+                traces: [{
+                    type: 'pie', labels: data.account_types, values: data.balances, hole: 0.3,
+                    textinfo: 'label+value', texttemplate: '%{label}: $%{value:,}',
+                    insidetextorientation: 'radial'
+                }],
+                layout: { title: 'Accounts Balance Overview' }
+            };
+        },
+        'account-balance': function (data) {
+            if (!data.accounts.length) {
+                return null;
+            }
+            return {
+                traces: data.accounts.map(function (account) {
+                    return { type: 'scatter', mode: 'lines+markers', name: account.name, x: account.dates, y: account.balances };
+                }),
+                layout: { title: 'Account Balance Over Time', xaxis: { title: 'Date' }, yaxis: { title: 'Balance' } }
+            };
+        },
+        'budget-remaining': function (data) {
+            return {
+                traces: [{ type: 'pie', labels: data.categories, values: data.remaining, hole: 0.3, sort: false }],
+                layout: { title: 'Remaining Budget by Category' }
+            };
+        }
+    };
+
+    function draw(element, data) {
+        var chart = charts[element.dataset.chart](data);
+        if (!chart) {
+            return;
+        }
+        Plotly.newPlot(element, chart.traces, Object.assign({}, transparent, chart.layout), { responsive: true });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('[data-chart]').forEach(function (element) {
+            if (element.dataset.chartData) {
+                draw(element, JSON.parse(element.dataset.chartData));
+                return;
+            }
+            fetch(element.dataset.chartUrl, { credentials: 'same-origin' })
+                .then(function (response) { return response.ok ? response.json() : null; })
+                .then(function (data) {
+                    if (data) {
+                        draw(element, data);
+                    }
+                });
+        });
+    });
+})();
@@ -0,0 +1,338 @@
+"""Synthetic users, accounts, budgets, goals and transactions for load testing.
+
+Used by `flask seed`. Each user draws from its own random generator seeded
+with (seed, user number), so the same seed and end date always produce the
+same data whatever the chunk size. The shape roughly follows a household
+budget: salary once or twice a month, rent on the first days of the month,
+and a Poisson-like number of everyday expenses per month with log-normal
+amounts and category weights.
+
+Users, accounts, budgets and goals go in with multi-row INSERTs. Transactions
+are streamed in chunks through COPY on Postgres, or executemany elsewhere,
+and when the table starts empty its foreign keys and indexes are only built
+once the rows are in. Derived data is then computed set-based:
+
+* Accounts.balance is the opening balance plus the account's transactions,
+* the end-of-day balance snapshots are rebuilt,
+* the monthly_totals rollup is rebuilt,
+* Budgets.spent is recomputed.
+"""
+import io
+import math
+import random
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from sqlalchemy import func, insert, select, text, update
+
+from balance_snapshots import rebuild_balance_snapshots
+from budget_spent import recompute_budget_spent
+from models import db, Accounts, Budgets, Category, Goals, Transactions, User
+from passwords import password_hasher
+from monthly_totals import rebuild_monthly_totals
+
+
+USER_CHUNK = 500
+CHUNK_SIZE = 50_000
+PASSWORD = 'password'
+
+# name: (weight among everyday expenses, median amount, log-normal sigma, merchants)
+CATEGORY_PROFILES = {
+    'Home and Utilities': (4, 85, 0.5, ['Electric Co', 'Water Utility', 'Internet Provider', 'Hardware Store']),
+    'Transportation': (10, 35, 0.6, ['Gas Station', 'Transit Pass', 'Rideshare', 'Parking']),
+    'Groceries': (22, 55, 0.6, ['Supermarket', 'Corner Shop', 'Farmers Market', 'Bakery']),
+    'Health': (3, 40, 0.8, ['Pharmacy', 'Dentist', 'Clinic Copay']),
+    'Restaurants and Dining': (18, 28, 0.6, ['Cafe', 'Pizza Place', 'Sushi Bar', 'Food Delivery']),
+    'Shopping and Entertainment': (14, 45, 0.9, ['Online Store', 'Cinema', 'Bookshop', 'Streaming Service']),
+    'Cash and Checks': (3, 60, 0.5, ['ATM Withdrawal', 'Check']),
+    'Business Expenses': (2, 120, 0.8, ['Office Supplies', 'Software Subscription']),
+    'Education': (2, 90, 0.9, ['Online Course', 'Textbooks', 'Tuition']),
+    'Finance': (3, 25, 0.7, ['Bank Fee', 'Card Interest', 'Insurance']),
+}
+RENT_CATEGORY = 'Home and Utilities'
+
+SeedPlan = namedtuple('SeedPlan', 'users accounts budgets goals years transactions_per_month seed end_date chunk_size')
+SeedPlan.__new__.__defaults__ = (3, 4, 2, 3, 60, 0, None, CHUNK_SIZE)
+
+SeedResult = namedtuple('SeedResult', 'users accounts budgets goals transactions')
+
+
+def seed(plan, progress=None):
+    """Generate `plan.users` users and everything that belongs to them.
+
+    Runs as one transaction; the caller commits. `progress`, if given, is
+    called with the running SeedResult after each chunk of users.
+    """
+
+    end_date = plan.end_date or date.today()
+    start_date = date(end_date.year - plan.years, end_date.month, 1)
+    months = _months(start_date, end_date)
+
+    _without_statement_timeout()
+    categories = _ensure_categories()
+    password = password_hasher.hash(PASSWORD)
+    first_number = (db.session.query(func.max(User.id)).scalar() or 0) + 1
+    totals = dict(users=0, accounts=0, budgets=0, goals=0, transactions=0)
+
+    with _bulk_load():
+        for chunk_start in range(0, plan.users, USER_CHUNK):
+            numbers = range(first_number + chunk_start, first_number + min(chunk_start + USER_CHUNK, plan.users))
+
+            generators = {number: random.Random(f"{plan.seed}:{number - first_number}") for number in numbers}
+            user_ids = db.session.execute(
+                insert(User.__table__).returning(User.id, sort_by_parameter_order=True),
+                [_user_row(number, password) for number in numbers]
+            ).scalars().all()
+            users = list(zip(user_ids, (generators[number] for number in numbers)))
+
+            account_rows = []
+            for user_id, rng in users:
+                account_rows += _account_rows(user_id, rng, plan.accounts)
+            account_ids = db.session.execute(
+                insert(Accounts.__table__).returning(Accounts.id, sort_by_parameter_order=True), account_rows
+            ).scalars().all()
+
+            accounts_by_user = {}
+            for account_id, row in zip(account_ids, account_rows):
+                accounts_by_user.setdefault(row['user_id'], []).append(account_id)
+
+            budget_rows = []
+            goal_rows = []
+            for user_id, rng in users:
+                budget_rows += _budget_rows(user_id, rng, plan.budgets, categories, end_date)
+                goal_rows += _goal_rows(user_id, rng, plan.goals)
+            if budget_rows:
+                db.session.execute(insert(Budgets.__table__), budget_rows)
+            if goal_rows:
+                db.session.execute(insert(Goals.__table__), goal_rows)
+
+            rows = (row for user_id, rng in users
+                    for row in _transaction_rows(user_id, rng, accounts_by_user[user_id], categories, months,
+                                                 plan.transactions_per_month, end_date))
+            transactions = _write_transactions(rows, plan.chunk_size)
+
+            totals['users'] += len(user_ids)
+            totals['accounts'] += len(account_ids)
+            totals['budgets'] += len(budget_rows)
+            totals['goals'] += len(goal_rows)
+            totals['transactions'] += transactions
+            if progress:
+                progress(SeedResult(**totals))
+
+    _add_transactions_to_balances(first_number)
+    rebuild_balance_snapshots()
+    rebuild_monthly_totals()
+    recompute_budget_spent()
+
+    return SeedResult(**totals)
+
+
+##### database helpers
+
+def _without_statement_timeout():
+    """Seeding is a bulk job: lift the app's statement timeout for this transaction."""
+
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(text('SET LOCAL statement_timeout = 0'))
+
+
+@contextmanager
+def _bulk_load():
+    """Load into an empty transactions table without its foreign keys and
+    secondary indexes, then put them back.
+
+    Recreating them afterwards is one set-based validation and one sort per
+    index instead of three foreign key lookups and five index insertions per
+    row. All of it happens inside the seed transaction, so a failed seed
+    rolls the DDL back too. Other databases, or a table that already has
+    rows, load as they are.
+    """
+
+    if db.engine.dialect.name != 'postgresql' or db.session.query(Transactions.id).first() is not None:
+        yield
+        return
+
+    constraints = db.session.execute(text("""
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = 'transactions'::regclass AND contype = 'f'
+    """)).all()
+    indexes = db.session.execute(text("""
+        SELECT i.relname, pg_get_indexdef(i.oid) FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid
+        WHERE x.indrelid = 'transactions'::regclass AND NOT x.indisprimary AND NOT x.indisunique
+    """)).all()
+
+    for name, definition in constraints:
+        db.session.execute(text(f'ALTER TABLE transactions DROP CONSTRAINT "{name}"'))
+    for name, definition in indexes:
+        db.session.execute(text(f'DROP INDEX "{name}"'))
+
+    yield
+
+    for name, definition in indexes:
+        db.session.execute(text(definition))
+    for name, definition in constraints:
+        db.session.execute(text(f'ALTER TABLE transactions ADD CONSTRAINT "{name}" {definition}'))
+    db.session.execute(text('ANALYZE transactions'))
+
+
+def _ensure_categories():
+    """Id for every profiled category, adding the missing ones."""
+
+    existing = dict(db.session.query(Category.name, Category.id).all())
+    missing = [{'name': name} for name in CATEGORY_PROFILES if name not in existing]
+    if missing:
+        db.session.execute(insert(Category.__table__), missing)
+        existing = dict(db.session.query(Category.name, Category.id).all())
+    return {name: existing[name] for name in CATEGORY_PROFILES}
+
+
+COPY_NULL = '\\N'
+TRANSACTION_COLUMNS = ('type', 'description', 'amount', 'date', 'account_id', 'user_id', 'category_id')
+
+
+def _write_transactions(rows, chunk_size):
+    """Insert transaction tuples in chunks; returns how many were written."""
+
+    written = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            written += _write_chunk(chunk)
+            chunk = []
+    if chunk:
+        written += _write_chunk(chunk)
+    return written
+
+
+def _write_chunk(chunk):
+    if db.engine.dialect.name != 'postgresql':
+        db.session.execute(insert(Transactions.__table__), [dict(zip(TRANSACTION_COLUMNS, row)) for row in chunk])
+        return len(chunk)
+
+    buffer = io.StringIO()
+    for type, description, amount, day, account_id, user_id, category_id in chunk:
+        category = COPY_NULL if category_id is None else category_id
+        buffer.write(f"{type}\t{description}\t{amount}\t{day.isoformat()}\t{account_id}\t{user_id}\t{category}\n")
+    buffer.seek(0)
+
+    cursor = db.session.connection().connection.cursor()
+    cursor.copy_expert(f"COPY transactions ({', '.join(TRANSACTION_COLUMNS)}) FROM STDIN", buffer)
+    return len(chunk)
+
+
+def _add_transactions_to_balances(first_user_id):
+    """Move each new account from its opening balance by its transactions."""
+
+    totals = select(
+        Transactions.account_id, func.sum(Transactions.signed_amount).label('total')
+    ).where(
+        Transactions.user_id >= first_user_id
+    ).group_by(Transactions.account_id).subquery()
+
+    db.session.execute(
+        update(Accounts)
+        .where(Accounts.id == totals.c.account_id)
+        .values(balance=Accounts.balance + totals.c.total)
+        .execution_options(synchronize_session=False)
+    )
+
+
+##### row generators
+
+def _months(start_date, end_date):
+    months = []
+    day = start_date
+    while day <= end_date:
+        months.append(day)
+        day = date(day.year + day.month // 12, day.month % 12 + 1, 1)
+    return months
+
+
+def _user_row(number, password):
+    return {
+        'first_name': 'Seed',
+        'last_name': f'User {number}',
+        'username': f'seed{number}',
+        'email': f'seed{number}@example.com',
+        'password': password,
+    }
+
+
+def _account_rows(user_id, rng, max_accounts):
+    count = rng.randint(1, max(1, max_accounts))
+    rows = []
+    for n in range(count):
+        account_type = 'checking' if n == 0 else rng.choice(['savings', 'credit', 'checking'])
+        opening_balance = round(rng.lognormvariate(math.log(2000), 1.0), 2)
+        rows.append({
+            'name': f'{account_type.title()} {n + 1}',
+            'account_type': account_type,
+            'balance': opening_balance,
+            'opening_balance': opening_balance,
+            'user_id': user_id,
+        })
+    return rows
+
+
+def _budget_rows(user_id, rng, count, categories, end_date):
+    names = rng.sample(list(CATEGORY_PROFILES), min(count, len(CATEGORY_PROFILES)))
+    start_of_year = date(end_date.year, 1, 1)
+    return [{
+        'category_name': name,
+        'category_id': categories[name],
+        'amount': round(rng.uniform(100, 1500), -1),
+        'spent': 0,
+        'start_date': start_of_year,
+        'end_date': date(end_date.year, 12, 31),
+        'user_id': user_id,
+    } for name in names]
+
+
+def _goal_rows(user_id, rng, max_goals):
+    names = ['Emergency Fund', 'Vacation', 'New Car', 'House Deposit', 'Retirement', 'Laptop']
+    return [{
+        'name': name,
+        'target_amount': round(rng.lognormvariate(math.log(5000), 1.0), -2) or 100,
+        'user_id': user_id,
+    } for name in rng.sample(names, rng.randint(0, min(max_goals, len(names))))]
+
+
+EVERYDAY = [name for name in CATEGORY_PROFILES if name != RENT_CATEGORY] + [RENT_CATEGORY]
+EVERYDAY_WEIGHTS = [CATEGORY_PROFILES[name][0] for name in EVERYDAY]
+
+
+def _transaction_rows(user_id, rng, account_ids, categories, months, per_month, end_date):
+    """Yield (type, description, amount, date, account_id, user_id, category_id) tuples."""
+
+    checking = account_ids[0]
+    salary = rng.lognormvariate(math.log(4200), 0.4)
+    paydays = (1, 15) if rng.random() < 0.4 else (1,)
+    rent = rng.lognormvariate(math.log(1300), 0.35)
+    rent_id = categories[RENT_CATEGORY]
+
+    for month_start in months:
+        days_in_month = (date(month_start.year + month_start.month // 12, month_start.month % 12 + 1, 1)
+                         - month_start).days
+
+        for payday in paydays:
+            day = month_start.replace(day=payday)
+            if day <= end_date:
+                yield ('income', 'Salary', f"{salary / len(paydays):.2f}", day, checking, user_id, None)
+
+        day = month_start + timedelta(days=rng.randint(0, 4))
+        if day <= end_date:
+            yield ('expense', 'Rent', f"{rent:.2f}", day, checking, user_id, rent_id)
+
+        # Roughly Poisson: a normal with variance equal to the mean, rounded
+        count = max(0, round(rng.gauss(per_month, math.sqrt(per_month))))
+        names = rng.choices(EVERYDAY, weights=EVERYDAY_WEIGHTS, k=count)
+        for name in names:
+            weight, median, sigma, merchants = CATEGORY_PROFILES[name]
+            day = month_start + timedelta(days=rng.randrange(days_in_month))
+            if day > end_date:
+                continue
+            amount = min(rng.lognormvariate(math.log(median), sigma), 99999.0)
+            yield ('expense', rng.choice(merchants), f"{amount:.2f}", day,
+                   rng.choice(account_ids), user_id, categories[name])
@@ -1 +1,164 @@
+import io
+import threading
+import unittest
+from unittest import mock
+from config import TestingConfig
+from models import db, User, Accounts
+from app import create_app, BUSY_MESSAGE
+from metrics import metrics
 
+class AppTestConfig(TestingConfig):
+    # one hashing thread and no queue, so a single slow hash saturates the pool
+    PASSWORD_HASH_WORKERS = 1
+    PASSWORD_HASH_MAX_PENDING = 0
+
+app = create_app(AppTestConfig)
+
+class LoginTestCase(unittest.TestCase):
+    def setUp(self):
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            User.signup(first_name="Jane", last_name="Doe", username="janedoe", email="jane@example.com", password="secret")
+
+        self.client = app.test_client()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def login(self):
+        return self.client.post('/login', data={'email': 'jane@example.com', 'password': 'secret'})
+
+    def test_login(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 302)
+        with self.client.session_transaction() as session:
+            self.assertIn('user_id', session)
+
+    def test_login_is_turned_away_while_hashing_is_saturated(self):
+        """With every hashing slot taken, login answers 503 at once instead of queueing."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+
+        caller = threading.Thread(target=app.extensions['password_hasher']._call, args=(slow,))
+        caller.start()
+        started.wait(5)
+        try:
+            response = self.login()
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.headers['Retry-After'], '5')
+            with self.client.session_transaction() as session:
+                self.assertNotIn('user_id', session)
+                self.assertIn(('warning', BUSY_MESSAGE), session['_flashes'])
+        finally:
+            release.set()
+            caller.join(5)
+
+        self.assertEqual(self.login().status_code, 302)
+
+    def test_chart_data_time_is_recorded(self):
+        """Building a chart series on /api/charts shows up in the chart time metric."""
+        metrics.reset()
+        self.login()
+        self.assertEqual(self.client.get('/api/charts/financials').status_code, 200)
+
+        samples = [line for line in metrics.render().splitlines()
+                   if line.startswith('wealthwatcher_chart_seconds_total{endpoint="main.chart_data"}')]
+        self.assertEqual(len(samples), 1)
+        self.assertGreater(float(samples[0].split()[-1]), 0)
+
+class InternalEndpointsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_hidden_without_a_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+        self.assertEqual(self.client.get('/cache/stats').status_code, 404)
+
+    def test_served_with_the_token(self):
+        with mock.patch.dict(app.config, METRICS_TOKEN='scrape-me'):
+            for path in ('/metrics', '/cache/stats'):
+                self.assertEqual(self.client.get(path).status_code, 401)
+                self.assertEqual(self.client.get(path, headers={'Authorization': 'Bearer wrong'}).status_code, 401)
+                self.assertEqual(self.client.get(path, headers={'Authorization': 'Bearer scrape-me'}).status_code, 200)
+
+            with mock.patch.dict(app.config, METRICS_ENABLED=False):
+                response = self.client.get('/metrics', headers={'Authorization': 'Bearer scrape-me'})
+                self.assertEqual(response.status_code, 404)
+
+class ChartDataTestCase(unittest.TestCase):
+    def setUp(self):
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            user = User.signup(first_name="Jane", last_name="Doe", username="janedoe", email="jane@example.com", password="secret")
+            db.session.add_all([
+                Accounts(name="Checking", account_type="checking", balance=250, opening_balance=250, user_id=user.id),
+                Accounts(name="Savings", account_type="savings", balance=1000, opening_balance=1000, user_id=user.id),
+            ])
+            db.session.commit()
+
+        self.client = app.test_client()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_chart_data_requires_login(self):
+        self.assertEqual(self.client.get('/api/charts/accounts-balance').status_code, 401)
+
+    def test_chart_data(self):
+        self.client.post('/login', data={'email': 'jane@example.com', 'password': 'secret'})
+
+        response = self.client.get('/api/charts/accounts-balance')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/json')
+        series = response.get_json()
+        self.assertEqual(dict(zip(series['account_types'], series['balances'])),
+                         {'checking': 250.0, 'savings': 1000.0})
+
+        self.assertEqual(self.client.get('/api/charts/unknown').status_code, 404)
+
+class ImportTransactionsTestCase(unittest.TestCase):
+    def setUp(self):
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            user = User.signup(first_name="Jane", last_name="Doe", username="janedoe", email="jane@example.com", password="secret")
+            account = Accounts(name="Checking", account_type="checking", balance=0, opening_balance=0, user_id=user.id)
+            db.session.add(account)
+            db.session.commit()
+            self.account_id = account.id
+
+        self.client = app.test_client()
+        self.client.post('/login', data={'email': 'jane@example.com', 'password': 'secret'})
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_failed_import_is_logged_and_shown(self):
+        statement = (io.BytesIO(b"Date,Description,Amount\n2024-03-01,Salary,2000.00\n"), 'statement.csv')
+
+        with mock.patch('app.import_transactions', side_effect=ValueError("unreadable statement")), \
+                self.assertLogs(app.logger, 'ERROR') as logs:
+            response = self.client.post('/transaction/import', data={
+                'account_id': self.account_id, 'format': 'auto', 'file': statement,
+            }, content_type='multipart/form-data')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f"Importing a statement into account {self.account_id} failed", logs.output[0])
+        self.assertIn("ValueError: unreadable statement", logs.output[0])
+        self.assertIn("Error importing statement: unreadable statement. Nothing was imported.",
+                      response.get_data(as_text=True))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from flask import Flask, render_template_string
+from assets import Assets
+
+class AssetsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.static = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.static, 'img'))
+        with open(os.path.join(self.static, 'img', 'bg.svg'), 'w') as file:
+            file.write('<svg xmlns="http://www.w3.org/2000/svg">' + '<rect/>' * 200 + '</svg>')
+        with open(os.path.join(self.static, 'style.css'), 'w') as file:
+            file.write("body { background: url('img/bg.svg'); }\n.x { background: url(https://example.com/a.png); }\n")
+
+        self.app = Flask(__name__, static_folder=self.static)
+        self.assets = Assets()
+        self.assets.init_app(self.app)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.static)
+
+    def test_fingerprinted_urls(self):
+        """Templates get content-addressed URLs; stylesheets point at fingerprinted images."""
+        with self.app.test_request_context():
+            css_url = render_template_string("{{ asset_url('style.css') }}")
+            svg_url = self.assets.url('img/bg.svg')
+            with self.assertRaises(KeyError):
+                self.assets.url('missing.js')
+
+        self.assertRegex(css_url, r'^/assets/style\.[0-9a-f]{10}\.css$')
+        css = self.client.get(css_url)
+        self.assertEqual(css.headers['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertIn(f"url('{svg_url.removeprefix('/assets/')}')", css.text)
+        self.assertIn("url(https://example.com/a.png)", css.text)
+        self.assertEqual(self.client.get('/assets/style.0123456789.css').status_code, 404)
+
+        with open(os.path.join(self.static, 'img', 'bg.svg'), 'a') as file:
+            file.write('<!-- changed -->')
+        self.assets.load(self.static)
+        with self.app.test_request_context():
+            self.assertNotEqual(self.assets.url('img/bg.svg'), svg_url)
+            self.assertNotEqual(self.assets.url('style.css'), css_url)
+
+    def test_compressed_once_and_conditional(self):
+        with self.app.test_request_context():
+            svg_url = self.assets.url('img/bg.svg')
+
+        plain = self.client.get(svg_url)
+        self.assertNotIn('Content-Encoding', plain.headers)
+        packed = self.client.get(svg_url, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(packed.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(packed.data), plain.data)
+        self.assertLess(len(packed.data), len(plain.data))
+        self.assertIn('Accept-Encoding', packed.headers['Vary'])
+        self.assertEqual(len(self.assets._compressed), 1)
+
+        again = self.client.get(svg_url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': packed.headers['ETag']})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(len(self.assets._compressed), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+from datetime import date
+from decimal import Decimal
+from flask import Flask
+from models import db, connect_db, User, Accounts, Transactions, AccountBalanceSnapshot
+from balance_snapshots import record_balance, rebuild_balance_snapshots, balance_as_of
+
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql:///wealthwatcher_test'
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['TESTING'] = True
+
+with app.app_context():
+    connect_db(app)
+    db.create_all()
+
+def snapshots():
+    return [(row.date, row.balance) for row in
+            AccountBalanceSnapshot.query.order_by(AccountBalanceSnapshot.account_id, AccountBalanceSnapshot.date)]
+
+class BalanceSnapshotsTestCase(unittest.TestCase):
+    def setUp(self):
+        """Create a user with an account opened at 100."""
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+
+            user = User(first_name="Jane", last_name="Doe", username="janedoe", email="jane@example.com", password="password")
+            db.session.add(user)
+            db.session.commit()
+
+            account = Accounts(name="Checking", account_type="checking", balance=100, opening_balance=100, user_id=user.id)
+            db.session.add(account)
+            db.session.commit()
+
+            self.user_id = user.id
+            self.account_id = account.id
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def add_transaction(self, type, amount, day):
+        transaction = Transactions(type=type, amount=Decimal(amount), date=day, description="test",
+                                   account_id=self.account_id, user_id=self.user_id)
+        db.session.add(transaction)
+        record_balance(transaction)
+        db.session.commit()
+        return transaction
+
+    def test_back_dated_writes_shift_later_days(self):
+        """Inserting or deleting before existing days moves every later end-of-day balance."""
+        with app.app_context():
+            self.add_transaction('income', '50.00', date(2024, 3, 10))
+            self.add_transaction('expense', '20.00', date(2024, 3, 20))
+            early = self.add_transaction('expense', '30.00', date(2024, 3, 1))
+            self.add_transaction('income', '5.00', date(2024, 3, 10))
+
+            self.assertEqual(snapshots(), [
+                (date(2024, 3, 1), Decimal('70.00')),
+                (date(2024, 3, 10), Decimal('125.00')),
+                (date(2024, 3, 20), Decimal('105.00')),
+            ])
+
+            record_balance(early, sign=-1)
+            db.session.delete(early)
+            db.session.commit()
+
+            self.assertEqual(snapshots()[1:], [
+                (date(2024, 3, 10), Decimal('155.00')),
+                (date(2024, 3, 20), Decimal('135.00')),
+            ])
+
+    def test_balance_as_of(self):
+        with app.app_context():
+            self.add_transaction('income', '50.00', date(2024, 3, 10))
+            self.add_transaction('expense', '20.00', date(2024, 3, 20))
+
+            self.assertEqual(balance_as_of(self.account_id, date(2024, 3, 9)), Decimal('100.00'))
+            self.assertEqual(balance_as_of(self.account_id, date(2024, 3, 10)), Decimal('150.00'))
+            self.assertEqual(balance_as_of(self.account_id, date(2024, 3, 15)), Decimal('150.00'))
+            self.assertEqual(balance_as_of(self.account_id, date(2025, 1, 1)), Decimal('130.00'))
+
+    def test_rebuild_matches_incremental(self):
+        with app.app_context():
+            for amount, day in [('10.00', date(2024, 1, 5)), ('7.25', date(2023, 12, 31)), ('3.00', date(2024, 1, 5))]:
+                self.add_transaction('expense', amount, day)
+            self.add_transaction('income', '40.00', date(2024, 1, 2))
+            incremental = snapshots()
+
+            self.assertEqual(rebuild_balance_snapshots(user_id=self.user_id), 3)
+            db.session.commit()
+            self.assertEqual(snapshots(), incremental)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+from datetime import date
+from decimal import Decimal
+from flask import Flask
+from models import db, connect_db, User, Accounts, Budgets, Category, Transactions
+from budget_spent import recompute_budget_spent
+
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql:///wealthwatcher_test'
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['TESTING'] = True
+
+with app.app_context():
+    connect_db(app)
+    db.create_all()
+
+class BudgetSpentTestCase(unittest.TestCase):
+    def setUp(self):
+        """Two users, each with a March groceries budget and some expenses."""
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+
+            groceries = Category(name="Groceries")
+            rent = Category(name="Rent")
+            db.session.add_all([groceries, rent])
+            self.user_ids = []
+            self.budget_ids = []
+
+            for name in ("alice", "bobby"):
+                user = User(first_name=name, last_name="Test", username=name, email=f"{name}@example.com", password="password")
+                db.session.add(user)
+                db.session.commit()
+
+                account = Accounts(name="Checking", account_type="checking", balance=1000, user_id=user.id)
+                budget = Budgets(category_name="Groceries", amount=300, start_date=date(2024, 3, 1),
+                                 end_date=date(2024, 3, 31), category_id=groceries.id, user_id=user.id)
+                db.session.add_all([account, budget])
+                db.session.commit()
+
+                for amount, day, category, type in [('20.00', date(2024, 3, 3), groceries, 'expense'),
+                                                    ('30.00', date(2024, 3, 31), groceries, 'expense'),
+                                                    ('99.00', date(2024, 4, 1), groceries, 'expense'),
+                                                    ('500.00', date(2024, 3, 5), rent, 'expense'),
+                                                    ('70.00', date(2024, 3, 6), None, 'income')]:
+                    db.session.add(Transactions(type=type, amount=Decimal(amount), date=day, category_id=category.id if category else None,
+                                                account_id=account.id, user_id=user.id))
+                db.session.commit()
+
+                self.user_ids.append(user.id)
+                self.budget_ids.append(budget.id)
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_recompute_all(self):
+        """Only expenses in the budget's category and date range count."""
+        with app.app_context():
+            changed = recompute_budget_spent()
+            db.session.commit()
+
+            self.assertEqual(changed, 2)
+            for budget_id in self.budget_ids:
+                self.assertEqual(db.session.get(Budgets, budget_id).spent, Decimal('50.00'))
+
+    def test_recompute_one_user(self):
+        """Scoping by user leaves other users' budgets alone."""
+        with app.app_context():
+            recompute_budget_spent(user_id=self.user_ids[0])
+            db.session.commit()
+
+            self.assertEqual(db.session.get(Budgets, self.budget_ids[0]).spent, Decimal('50.00'))
+            self.assertIsNone(db.session.get(Budgets, self.budget_ids[1]).spent)
+
+    def test_recompute_is_idempotent(self):
+        """A second pass finds nothing to change."""
+        with app.app_context():
+            recompute_budget_spent()
+            db.session.commit()
+
+            self.assertEqual(recompute_budget_spent(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+from flask import Flask
+from models import db, connect_db, Category
+from categories import CategoryRegistry
+
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql:///wealthwatcher_test'
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['TESTING'] = True
+
+with app.app_context():
+    connect_db(app)
+    db.create_all()
+
+class CategoryRegistryTestCase(unittest.TestCase):
+    def setUp(self):
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            db.session.add_all([Category(name="Groceries"), Category(name="Rent")])
+            db.session.commit()
+
+        self.registry = CategoryRegistry(check_interval=0)
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_lookups(self):
+        with app.app_context():
+            self.assertEqual(self.registry.choices(), [('1', 'Groceries'), ('2', 'Rent')])
+            self.assertEqual(self.registry.name(2), 'Rent')
+            self.assertEqual(self.registry.id_for_name(' groceries '), 1)
+            self.assertIsNone(self.registry.name(3))
+
+    def test_rename_is_noticed(self):
+        """A rename keeps the row count and highest id, but still changes the version."""
+        with app.app_context():
+            version = self.registry.version()
+            db.session.get(Category, 1).name = "Food"
+            db.session.commit()
+
+            self.assertNotEqual(self.registry.version(), version)
+            self.assertEqual(self.registry.name(1), 'Food')
+            self.assertEqual(self.registry.id_for_name('food'), 1)
+            self.assertIsNone(self.registry.id_for_name('groceries'))
+
+    def test_delete_and_insert_is_noticed(self):
+        with app.app_context():
+            self.registry.choices()
+            db.session.delete(db.session.get(Category, 1))
+            db.session.add(Category(id=1, name="Utilities"))
+            db.session.commit()
+
+            self.assertEqual(self.registry.choices(), [('2', 'Rent'), ('1', 'Utilities')])
+
+    def test_checks_at_most_every_interval(self):
+        with app.app_context():
+            registry = CategoryRegistry(check_interval=3600)
+            self.assertEqual(registry.name(1), 'Groceries')
+            db.session.get(Category, 1).name = "Food"
+            db.session.commit()
+
+            self.assertEqual(registry.name(1), 'Groceries')
+            registry.invalidate()
+            self.assertEqual(registry.name(1), 'Food')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import tempfile
+import time
+import unittest
+from flask import Flask
+from models import db, connect_db, User
+from chart_cache import ChartCache, MemoryBackend, FileSystemBackend
+from data_version import bump_data_version
+
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql:///wealthwatcher_test'
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['TESTING'] = True
+
+with app.app_context():
+    connect_db(app)
+    db.create_all()
+
+class CacheBackendTestCase(unittest.TestCase):
+    def test_memory_backend_evicts_least_recently_used(self):
+        backend = MemoryBackend(max_entries=2)
+        backend.set('a', b'1')
+        backend.set('b', b'2')
+        backend.get('a')
+        backend.set('c', b'3')
+
+        self.assertEqual(backend.get('a'), b'1')
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual(len(backend), 2)
+
+    def test_memory_backend_size_bound(self):
+        backend = MemoryBackend(max_entries=10, max_bytes=5)
+        backend.set('a', b'123')
+        backend.set('b', b'456')
+
+        self.assertIsNone(backend.get('a'))
+        self.assertEqual(backend.get('b'), b'456')
+
+    def test_filesystem_backend_shared_between_instances(self):
+        with tempfile.TemporaryDirectory() as directory:
+            FileSystemBackend(directory).set('key', b'payload')
+            self.assertEqual(FileSystemBackend(directory).get('key'), b'payload')
+
+    def test_filesystem_backend_evicts_oldest(self):
+        with tempfile.TemporaryDirectory() as directory:
+            backend = FileSystemBackend(directory, max_entries=2)
+            backend.set('a', b'1')
+            time.sleep(0.01)
+            backend.set('b', b'2')
+            time.sleep(0.01)
+            backend.set('c', b'3')
+
+            self.assertIsNone(backend.get('a'))
+            self.assertEqual(len(backend), 2)
+
+
+class ChartCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            user = User(first_name="John", last_name="Doe", username="johndoe", email="john@example.com", password="password")
+            db.session.add(user)
+            db.session.commit()
+            self.user_id = user.id
+
+        self.calls = 0
+        self.cache = ChartCache()
+
+        @self.cache.cached('test')
+        def chart(user_id):
+            self.calls += 1
+            return f"<div>{user_id}:{self.calls}</div>"
+
+        self.chart = chart
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_hit_until_data_version_bumped(self):
+        with app.app_context():
+            first = self.chart(self.user_id)
+            self.assertEqual(self.chart(self.user_id), first)
+
+            bump_data_version(self.user_id)
+            db.session.commit()
+
+            self.assertNotEqual(self.chart(self.user_id), first)
+            self.assertEqual(self.calls, 2)
+            self.assertEqual(self.cache.stats()['charts']['test'], {'hits': 1, 'misses': 2})
+
+if __name__ == '__main__':
+    unittest.main()
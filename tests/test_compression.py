@@ -0,0 +1,54 @@
+import gzip
+import unittest
+from flask import Flask, Response, jsonify, stream_with_context
+from compression import Compression, MIN_SIZE
+
+app = Flask(__name__)
+app.config['TESTING'] = True
+
+compression = Compression()
+compression.init_app(app)
+
+PAGE = '<p>' + 'row ' * MIN_SIZE + '</p>'
+
+@app.route('/page')
+def page():
+    response = Response(PAGE, mimetype='text/html')
+    response.set_etag('v1')
+    return response
+
+@app.route('/small')
+def small():
+    return jsonify(ok=True)
+
+@app.route('/stream')
+def stream():
+    return Response(stream_with_context(iter([PAGE])), mimetype='text/csv')
+
+@app.route('/binary')
+def binary():
+    return Response(b'\0' * 2 * MIN_SIZE, mimetype='application/octet-stream')
+
+class CompressionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_compresses_pages_the_client_accepts(self):
+        response = self.client.get('/page', headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.data).decode(), PAGE)
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(response.headers['ETag'], 'W/"v1"')
+
+        plain = self.client.get('/page')
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertEqual(plain.text, PAGE)
+        self.assertIn('Accept-Encoding', plain.headers['Vary'])
+
+    def test_leaves_small_streamed_and_binary_responses(self):
+        for path in ['/small', '/stream', '/binary']:
+            response = self.client.get(path, headers={'Accept-Encoding': 'gzip'})
+            self.assertNotIn('Content-Encoding', response.headers, path)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+from config import TestingConfig
+from app import create_app
+from categories import category_registry
+from chart_cache import chart_cache
+from identity import identity_cache
+from jobs import job_queue
+from passwords import password_hasher
+
+class CachingConfig(TestingConfig):
+    CHART_CACHE_ENABLED = True
+    IDENTITY_CACHE_TTL = 30
+    CATEGORY_REGISTRY_CHECK_INTERVAL = 60
+    JOBS_BACKEND = 'thread'
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:2000'
+
+class SideBySideAppsTestCase(unittest.TestCase):
+    def test_each_app_keeps_its_own_settings(self):
+        """Building a second app does not reconfigure the first one's caches, queue or hasher."""
+        testing = create_app('testing')
+        caching = create_app(CachingConfig)
+
+        for app, config in ((testing, TestingConfig), (caching, CachingConfig)):
+            with app.app_context():
+                self.assertEqual(chart_cache._for_app().enabled, config.CHART_CACHE_ENABLED)
+                self.assertEqual(identity_cache._for_app().ttl, config.IDENTITY_CACHE_TTL)
+                self.assertEqual(category_registry._for_app().check_interval, config.CATEGORY_REGISTRY_CHECK_INTERVAL)
+                self.assertEqual(job_queue.stats()['backend'], config.JOBS_BACKEND)
+                self.assertFalse(password_hasher.needs_rehash(password_hasher.hash('secret')))
+                self.assertTrue(password_hasher.hash('secret').startswith(config.PASSWORD_HASH_METHOD + '$'))
+
+        self.assertIsNot(testing.extensions['job_queue'], caching.extensions['job_queue'])
+
+if __name__ == '__main__':
+    unittest.main()
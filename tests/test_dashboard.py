@@ -0,0 +1,100 @@
+import unittest
+from datetime import date
+from decimal import Decimal
+from flask import Flask
+from sqlalchemy import event
+from models import db, connect_db, User, Accounts, Transactions
+from chart_cache import chart_cache
+from charts import accounts_balance_data, financials_data
+from dashboard import DashboardSnapshot, dashboard_sections, dashboard_snapshot
+from monthly_totals import rebuild_monthly_totals
+
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql:///wealthwatcher_test'
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['TESTING'] = True
+
+with app.app_context():
+    connect_db(app)
+    db.create_all()
+
+class DashboardSnapshotTestCase(unittest.TestCase):
+    def setUp(self):
+        chart_cache.clear()
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            user = User(first_name="John", last_name="Doe", username="johndoe", email="john@example.com", password="password")
+            db.session.add(user)
+            db.session.commit()
+            self.user_id = user.id
+
+            checking = Accounts(name="Checking", account_type="Checking", balance=Decimal('1000.10'), user_id=user.id)
+            savings = Accounts(name="Savings", account_type="Savings", balance=Decimal('250.05'), user_id=user.id)
+            db.session.add_all([checking, savings])
+            db.session.flush()
+            for day in range(1, 8):
+                db.session.add(Transactions(type='expense' if day % 2 else 'income', description=f"t{day}",
+                                            amount=Decimal(f'{day}.25'), date=date(2025, day, day),
+                                            account_id=checking.id, user_id=user.id))
+            rebuild_monthly_totals(user.id)
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_matches_separate_queries(self):
+        """The snapshot carries the same data the page and chart endpoints used to query for."""
+        with app.app_context():
+            snapshot = dashboard_snapshot(self.user_id)
+            recent = Transactions.query.filter_by(user_id=self.user_id) \
+                .order_by(Transactions.date.desc(), Transactions.id.desc()).limit(5).all()
+
+            self.assertEqual(snapshot.recent_transactions,
+                             tuple((t.id, t.date, t.type, t.description, t.amount) for t in recent))
+            self.assertEqual(snapshot.charts(), {
+                'accounts-balance': accounts_balance_data.uncached(self.user_id),
+                'financials': financials_data.uncached(self.user_id),
+            })
+            self.assertEqual(snapshot.account_totals[0].total_balance, Decimal('1000.10'))
+
+    def test_accounts_without_a_balance(self):
+        """An account type whose balances are all NULL totals zero instead of failing."""
+        with app.app_context():
+            db.session.add(Accounts(name="Card", account_type="Credit", balance=None, user_id=self.user_id))
+            db.session.commit()
+
+            snapshot = dashboard_snapshot(self.user_id)
+
+            self.assertIn(('Credit', Decimal('0')), snapshot.account_totals)
+            self.assertEqual(snapshot.charts()['accounts-balance'], accounts_balance_data.uncached(self.user_id))
+
+    def test_single_statement(self):
+        with app.app_context():
+            statements = []
+            listener = lambda *args: statements.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                dashboard_sections.uncached(self.user_id)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+
+            self.assertEqual(len(statements), 1)
+
+    def test_empty_user_and_immutable(self):
+        with app.app_context():
+            user = User(first_name="Jane", last_name="Doe", username="janedoe", email="jane@example.com", password="password")
+            db.session.add(user)
+            db.session.commit()
+
+            snapshot = dashboard_snapshot(user.id)
+
+        self.assertEqual(snapshot, DashboardSnapshot((), (), ()))
+        self.assertEqual(snapshot.charts()['financials'], {'months': [], 'income': [], 'spending': []})
+        with self.assertRaises(AttributeError):
+            snapshot.recent_transactions = ()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+from flask import Flask, flash, get_flashed_messages, session
+from models import db, connect_db, User
+from data_version import bump_data_version
+from etags import etagged
+
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql:///wealthwatcher_test'
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['TESTING'] = True
+app.config['SECRET_KEY'] = 'test'
+app.config['RELEASE'] = 'r1'
+
+with app.app_context():
+    connect_db(app)
+    db.create_all()
+
+renders = []
+
+@app.route('/list')
+@etagged
+def listing():
+    renders.append(session.get('user_id'))
+    return ' '.join(get_flashed_messages()) or 'list'
+
+@app.route('/write', methods=['POST'])
+def write():
+    bump_data_version(session['user_id'])
+    db.session.commit()
+    flash('Saved.')
+    return 'ok'
+
+class ETagTestCase(unittest.TestCase):
+    def setUp(self):
+        del renders[:]
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            jane = User(first_name="Jane", last_name="Doe", username="janedoe", email="jane@example.com", password="password")
+            john = User(first_name="John", last_name="Doe", username="johndoe", email="john@example.com", password="password")
+            db.session.add_all([jane, john])
+            db.session.commit()
+            self.user_ids = jane.id, john.id
+
+        self.client = app.test_client()
+        with self.client.session_transaction() as client_session:
+            client_session['user_id'] = self.user_ids[0]
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def revalidate(self, response, path='/list'):
+        return self.client.get(path, headers={'If-None-Match': response.headers['ETag']})
+
+    def test_not_modified_until_a_write(self):
+        """A matching If-None-Match is answered before the view runs, until the data version moves."""
+        first = self.client.get('/list')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.headers['Cache-Control'], 'private, no-cache')
+
+        again = self.revalidate(first)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.headers['ETag'], first.headers['ETag'])
+        self.assertEqual(renders, [self.user_ids[0]])
+
+        self.client.post('/write')
+        flashed = self.revalidate(first)
+        self.assertEqual((flashed.status_code, flashed.text), (200, 'Saved.'))
+        self.assertNotIn('ETag', flashed.headers)
+
+        fresh = self.revalidate(first)
+        self.assertEqual(fresh.status_code, 200)
+        self.assertNotEqual(fresh.headers['ETag'], first.headers['ETag'])
+        self.assertEqual(self.revalidate(fresh).status_code, 304)
+
+    def test_tag_depends_on_user_query_and_release(self):
+        first = self.client.get('/list')
+        self.assertEqual(self.revalidate(first, '/list?page=2').status_code, 200)
+
+        with self.client.session_transaction() as client_session:
+            client_session['user_id'] = self.user_ids[1]
+        self.assertEqual(self.revalidate(first).status_code, 200)
+
+        with self.client.session_transaction() as client_session:
+            client_session['user_id'] = self.user_ids[0]
+        app.extensions['etag_release'] = 'r2'
+        try:
+            self.assertEqual(self.revalidate(first).status_code, 200)
+        finally:
+            app.extensions['etag_release'] = 'r1'
+
+    def test_logged_out_requests_are_not_tagged(self):
+        with self.client.session_transaction() as client_session:
+            del client_session['user_id']
+        response = self.client.get('/list')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response.headers)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import csv
+import io
+import json
+import unittest
+from datetime import date, timedelta
+from decimal import Decimal
+from app import create_app
+from models import db, User, Accounts, Category, Transactions
+from exporter import export_rows, csv_chunks, ndjson_chunks, EXPORT_COLUMNS, FORMATS
+
+app = create_app('testing')
+
+FIRST_DAY = date(2023, 1, 1)
+ROWS = 1200
+
+class ExporterTestCase(unittest.TestCase):
+    def setUp(self):
+        """Jane has more rows than fit in two chunks, spread over two accounts; John has one."""
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+
+            jane = User(first_name="Jane", last_name="Doe", username="janedoe", email="jane@example.com", password="password")
+            john = User(first_name="John", last_name="Doe", username="johndoe", email="john@example.com", password="password")
+            groceries = Category(name="Groceries")
+            db.session.add_all([jane, john, groceries])
+            db.session.flush()
+            checking = Accounts(name="Checking", account_type="checking", balance=0, user_id=jane.id)
+            savings = Accounts(name="Savings", account_type="savings", balance=0, user_id=jane.id)
+            other = Accounts(name="Checking", account_type="checking", balance=0, user_id=john.id)
+            db.session.add_all([checking, savings, other])
+            db.session.flush()
+
+            # Four transactions a day; every tenth one is from savings
+            db.session.add_all([
+                Transactions(type='expense', description=f"Purchase {n}", amount=Decimal('12.50'),
+                             date=FIRST_DAY + timedelta(days=n // 4),
+                             account_id=(savings if n % 10 == 0 else checking).id,
+                             user_id=jane.id, category_id=groceries.id if n % 2 else None)
+                for n in range(ROWS)
+            ])
+            db.session.add(Transactions(type='expense', description="Not Jane's", amount=Decimal('1.00'),
+                                        date=FIRST_DAY, account_id=other.id, user_id=john.id))
+            db.session.commit()
+
+            self.user_id = jane.id
+            self.savings_id = savings.id
+
+        self.client = app.test_client()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def export(self, **params):
+        with self.client.session_transaction() as session:
+            session['user_id'] = self.user_id
+        return self.client.get('/transaction/export', query_string=params)
+
+    def test_formats(self):
+        self.assertEqual(FORMATS, {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'})
+
+    def test_csv_is_written_in_chunks(self):
+        """The header goes out with the first 500 rows, then every 500 rows, then the rest."""
+        with app.app_context():
+            chunks = list(csv_chunks(export_rows(self.user_id, yield_per=100)))
+
+        self.assertEqual(len(chunks), 3)
+        self.assertTrue(chunks[0].startswith(','.join(EXPORT_COLUMNS) + '\r\n'))
+        self.assertEqual([chunk.count('\r\n') for chunk in chunks], [501, 500, 200])
+
+        rows = list(csv.DictReader(io.StringIO(''.join(chunks))))
+        self.assertEqual(len(rows), ROWS)
+        self.assertEqual(rows[0]['date'], FIRST_DAY.isoformat())
+        self.assertEqual(rows[0]['account'], 'Savings')
+        self.assertEqual(rows[0]['category'], '')
+        self.assertEqual(rows[1]['category'], 'Groceries')
+        self.assertEqual(rows[0]['amount'], '12.50')
+
+    def test_ndjson_is_written_in_chunks(self):
+        with app.app_context():
+            chunks = list(ndjson_chunks(export_rows(self.user_id, yield_per=100)))
+
+        self.assertEqual([chunk.count('\n') for chunk in chunks], [500, 500, 200])
+        records = [json.loads(line) for line in ''.join(chunks).splitlines()]
+        self.assertEqual(len(records), ROWS)
+        self.assertEqual(list(records[0]), EXPORT_COLUMNS)
+        self.assertEqual(records[-1]['date'], (FIRST_DAY + timedelta(days=(ROWS - 1) // 4)).isoformat())
+
+    def test_csv_download(self):
+        response = self.export()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/csv')
+        self.assertEqual(response.headers['Content-Disposition'], 'attachment; filename=transactions.csv')
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        self.assertEqual(len(rows), ROWS)
+        self.assertNotIn("Not Jane's", {row['description'] for row in rows})
+
+    def test_ndjson_download(self):
+        response = self.export(format='ndjson')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertEqual(response.headers['Content-Disposition'], 'attachment; filename=transactions.ndjson')
+        self.assertEqual(len(response.get_data(as_text=True).splitlines()), ROWS)
+
+    def test_filter_by_date_and_account(self):
+        start, end = FIRST_DAY + timedelta(days=10), FIRST_DAY + timedelta(days=19)
+
+        response = self.export(format='ndjson', start=start.isoformat(), end=end.isoformat())
+        records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(len(records), 40)
+        self.assertEqual({record['date'] for record in records},
+                         {(start + timedelta(days=n)).isoformat() for n in range(10)})
+
+        response = self.export(format='ndjson', account_id=self.savings_id)
+        records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(len(records), ROWS // 10)
+        self.assertEqual({record['account'] for record in records}, {'Savings'})
+
+        response = self.export(format='ndjson', account_id=self.savings_id, start=start.isoformat(), end=end.isoformat())
+        self.assertEqual(len(response.get_data(as_text=True).splitlines()), 4)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.export(format='xlsx').status_code, 400)
+        self.assertEqual(self.export(start='01/02/2023').status_code, 400)
+
+    def test_login_required(self):
+        response = self.client.get('/transaction/export')
+        self.assertEqual(response.status_code, 302)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+from flask import Flask
+from sqlalchemy import event
+from models import db, connect_db, User
+from identity import CurrentUser, identity_cache
+
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql:///wealthwatcher_test'
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['TESTING'] = True
+
+with app.app_context():
+    connect_db(app)
+    db.create_all()
+
+class CurrentUserTestCase(unittest.TestCase):
+    def setUp(self):
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            user = User(first_name="John", last_name="Doe", username="johndoe", email="john@example.com", password="password")
+            db.session.add(user)
+            db.session.commit()
+            self.user_id = user.id
+
+        identity_cache.clear()
+        self.statements = []
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def count_statements(self):
+        event.listen(db.engine, 'before_cursor_execute', self.record)
+        self.addCleanup(event.remove, db.engine, 'before_cursor_execute', self.record)
+
+    def record(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def test_id_without_query(self):
+        with app.app_context():
+            self.count_statements()
+            self.assertEqual(CurrentUser(self.user_id).id, self.user_id)
+            self.assertEqual(self.statements, [])
+
+    def test_identity_cached_between_requests(self):
+        with app.app_context():
+            self.count_statements()
+            self.assertTrue(CurrentUser(self.user_id))
+            self.assertEqual(CurrentUser(self.user_id).username, "johndoe")
+            self.assertEqual(len(self.statements), 1)
+
+    def test_profile_change_invalidates(self):
+        with app.app_context():
+            self.assertEqual(CurrentUser(self.user_id).first_name, "John")
+            user = db.session.get(User, self.user_id)
+            user.first_name = "Johnny"
+            db.session.commit()
+            self.assertEqual(CurrentUser(self.user_id).first_name, "Johnny")
+
+    def test_missing_user_is_falsy(self):
+        with app.app_context():
+            self.assertFalse(CurrentUser(self.user_id + 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import io
+import unittest
+from datetime import date
+from decimal import Decimal
+from flask import Flask
+from models import db, connect_db, User, Accounts, Budgets, Category, Transactions, MonthlyTotals
+from importer import import_transactions, read_ofx
+from categories import category_registry
+
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql:///wealthwatcher_test'
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['TESTING'] = True
+
+with app.app_context():
+    connect_db(app)
+    db.create_all()
+
+CSV = """Date,Description,Amount,Type,Category
+2024-03-01,Salary,2000.00,income,
+2024-03-02,Supermarket,-45.10,,Groceries
+03/05/2024,Corner shop,4.90,expense,groceries
+2024-03-06,Mystery,abc,expense,
+2024-03-07,Spa,30.00,expense,Wellness
+"""
+
+OFX = """OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240310120000[-5:EST]<TRNAMT>-12.50<NAME>Coffee</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240311<TRNAMT>100.00<MEMO>Refund</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+class ImporterTestCase(unittest.TestCase):
+    def setUp(self):
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+
+            user = User(first_name="Jane", last_name="Doe", username="janedoe", email="jane@example.com", password="password")
+            category = Category(name="Groceries")
+            db.session.add_all([user, category])
+            db.session.commit()
+
+            account = Accounts(name="Checking", account_type="checking", balance=100, user_id=user.id)
+            budget = Budgets(category_name="Groceries", amount=200, start_date=date(2024, 3, 1),
+                             end_date=date(2024, 3, 31), category_id=category.id, user_id=user.id)
+            db.session.add_all([account, budget])
+            db.session.commit()
+
+            self.account_id = account.id
+            self.budget_id = budget.id
+
+        category_registry.invalidate()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_csv_import(self):
+        """Valid rows are imported and derived data adjusted; bad rows are reported."""
+        with app.app_context():
+            account = db.session.get(Accounts, self.account_id)
+            result = import_transactions(io.StringIO(CSV), account, batch_size=2)
+            db.session.commit()
+
+            self.assertEqual(result.rows_read, 5)
+            self.assertEqual(result.imported, 3)
+            self.assertEqual([line for line, message in result.errors], [5, 6])
+
+            self.assertEqual(Transactions.query.count(), 3)
+            self.assertEqual(db.session.get(Accounts, self.account_id).balance, Decimal('2050.00'))
+            self.assertEqual(db.session.get(Budgets, self.budget_id).spent, Decimal('50.00'))
+            self.assertEqual(sum(row.count for row in MonthlyTotals.query.all()), 3)
+
+    def test_read_ofx_across_chunks(self):
+        """OFX transactions split across read chunks are still parsed."""
+        rows = [row for number, row in read_ofx(io.StringIO(OFX), chunk_size=16)]
+
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['amount'], '-12.50')
+        self.assertEqual(rows[0]['type'], 'expense')
+        self.assertEqual(rows[1]['description'], 'Refund')
+
+if __name__ == '__main__':
+    unittest.main()
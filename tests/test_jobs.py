@@ -0,0 +1,135 @@
+import threading
+import unittest
+from flask import Flask
+from models import db, connect_db, User, Job
+from jobs import JobQueue
+
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql:///wealthwatcher_test'
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['TESTING'] = True
+app.config['JOBS_RETRY_DELAY'] = 0
+app.config['JOBS_POLL_INTERVAL'] = 0.05
+
+with app.app_context():
+    connect_db(app)
+    db.create_all()
+
+def make_queue(backend, **config):
+    app.config.update(JOBS_BACKEND=backend, JOBS_MAX_PENDING=100, JOBS_MAX_ATTEMPTS=3, **config)
+    JobQueue().init_app(app)
+    return app.extensions['job_queue']
+
+class JobQueueTestCase(unittest.TestCase):
+    def setUp(self):
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            user = User(first_name="Jane", last_name="Doe", username="janedoe", email="jane@example.com", password="password")
+            db.session.add(user)
+            db.session.commit()
+            self.user_id = user.id
+
+        self.calls = []
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_runs_after_commit_once_per_user(self):
+        """Jobs wait for commit, are deduplicated, and are dropped on rollback."""
+        job_queue = make_queue('thread')
+        job_queue.handler('record')(self.calls.append)
+
+        with app.app_context():
+            job_queue.defer('record', self.user_id)
+            db.session.rollback()
+
+            job_queue.defer('record', self.user_id)
+            job_queue.defer('record', self.user_id)
+            self.assertEqual(self.calls, [])
+            db.session.commit()
+
+        self.assertTrue(job_queue.drain(timeout=5))
+        self.assertEqual(self.calls, [self.user_id])
+
+    def test_retries_failed_jobs(self):
+        job_queue = make_queue('inline')
+
+        @job_queue.handler('flaky')
+        def flaky(user_id):
+            self.calls.append(user_id)
+            if len(self.calls) < 2:
+                raise RuntimeError("try again")
+
+        with app.app_context():
+            job_queue.defer('flaky', self.user_id)
+            db.session.commit()
+
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(job_queue.stats()['retried'], 1)
+        self.assertEqual(job_queue.stats()['succeeded'], 1)
+
+    def test_full_queue_runs_in_caller(self):
+        """Backpressure: with the queue full the caller's thread runs the job."""
+        job_queue = make_queue('thread', JOBS_WORKERS=1)
+        job_queue._queue.maxsize = 1
+        started = threading.Event()
+        release = threading.Event()
+
+        @job_queue.handler('slow')
+        def slow(user_id):
+            self.calls.append((user_id, threading.current_thread().name))
+            started.set()
+            release.wait(5)
+
+        with app.app_context():
+            job_queue.defer('slow', 1)
+            db.session.commit()
+            started.wait(5)
+            job_queue.defer('slow', 2)
+            db.session.commit()
+            # one job is running, one is queued; the third runs here
+            release.set()
+            job_queue.defer('slow', 3)
+            db.session.commit()
+
+        self.assertTrue(job_queue.drain(timeout=5))
+        self.assertEqual(job_queue.stats()['ran_in_caller'], 1)
+        self.assertIn((3, threading.current_thread().name), self.calls)
+
+    def test_durable_backend(self):
+        """Postgres-backed jobs are stored with the write, run once, and give up after the last attempt."""
+        job_queue = make_queue('postgres')
+        job_queue.handler('record')(self.calls.append)
+
+        @job_queue.handler('broken')
+        def broken(user_id):
+            raise RuntimeError("always fails")
+
+        # a second queue stands in for another worker process deferring the same job
+        other_process = make_queue('postgres')
+        other_process.handler('record')(self.calls.append)
+
+        with app.app_context():
+            job_queue.defer('record', self.user_id)
+            other_process.defer('record', self.user_id)
+            job_queue.defer('broken', self.user_id)
+            self.assertEqual(Job.query.count(), 2)
+            db.session.commit()
+
+        with app.app_context():
+            for _ in range(100):
+                if not Job.query.filter(Job.status != 'failed').count():
+                    break
+                job_queue._wakeup.wait(0.05)
+            jobs = Job.query.all()
+
+        self.assertTrue(job_queue.drain(timeout=5))
+        self.assertTrue(other_process.drain(timeout=5))
+        self.assertEqual(self.calls, [self.user_id])
+        self.assertEqual([(job.name, job.status, job.attempts) for job in jobs], [('broken', 'failed', 3)])
+
+if __name__ == '__main__':
+    unittest.main()
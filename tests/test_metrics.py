@@ -0,0 +1,62 @@
+import unittest
+from flask import Flask
+from sqlalchemy import text
+from models import db, connect_db
+from metrics import Metrics, Histogram, timed_chart
+
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql:///wealthwatcher_test'
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['TESTING'] = True
+
+with app.app_context():
+    connect_db(app)
+
+metrics = Metrics()
+metrics.init_app(app)
+
+@timed_chart
+def build_chart():
+    return '{}'
+
+@app.route('/report')
+def report():
+    db.session.execute(text('SELECT 1'))
+    db.session.execute(text('SELECT 2'))
+    return build_chart()
+
+class MetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram((1, 5))
+        for value in (0.5, 1, 3, 9):
+            histogram.observe(value)
+
+        self.assertEqual(list(histogram.samples('h', {'endpoint': 'x'})), [
+            'h_bucket{endpoint="x",le="1.0"} 2',
+            'h_bucket{endpoint="x",le="5.0"} 3',
+            'h_bucket{endpoint="x",le="+Inf"} 4',
+            'h_sum{endpoint="x"} 13.5',
+            'h_count{endpoint="x"} 4',
+        ])
+
+    def test_request_metrics_per_endpoint(self):
+        """Latency, SQL statement count and chart time are recorded per endpoint."""
+        client = app.test_client()
+        client.get('/report')
+        client.get('/report')
+        client.get('/missing')
+
+        output = metrics.render()
+
+        self.assertIn('wealthwatcher_requests_total{endpoint="report",method="GET",status="200"} 2', output)
+        self.assertIn('wealthwatcher_requests_total{endpoint="unmatched",method="GET",status="404"} 1', output)
+        self.assertIn('wealthwatcher_request_duration_seconds_count{endpoint="report"} 2', output)
+        self.assertIn('wealthwatcher_sql_statements_total{endpoint="report"} 4', output)
+        self.assertIn('wealthwatcher_sql_statements_per_request_bucket{endpoint="report",le="2.0"} 2', output)
+        self.assertIn('wealthwatcher_chart_seconds_total{endpoint="report"}', output)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+from datetime import date
+from decimal import Decimal
+from flask import Flask
+from models import db, connect_db, User, Accounts, Category, Transactions, MonthlyTotals
+from monthly_totals import record_transaction, rebuild_monthly_totals, monthly_totals_by_type
+
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql:///wealthwatcher_test'
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['TESTING'] = True
+
+with app.app_context():
+    connect_db(app)
+    db.create_all()
+
+class MonthlyTotalsModelTestCase(unittest.TestCase):
+    def setUp(self):
+        """Create a user with an account and a category."""
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+
+            user = User(first_name="Jane", last_name="Doe", username="janedoe", email="jane@example.com", password="password")
+            category = Category(name="Groceries")
+            db.session.add_all([user, category])
+            db.session.commit()
+
+            account = Accounts(name="Checking", account_type="checking", balance=1000, user_id=user.id)
+            db.session.add(account)
+            db.session.commit()
+
+            self.user_id = user.id
+            self.account_id = account.id
+            self.category_id = category.id
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def add_transaction(self, type, amount, day, category_id=None):
+        transaction = Transactions(type=type, amount=Decimal(amount), date=day, description="test",
+                                   account_id=self.account_id, user_id=self.user_id, category_id=category_id)
+        db.session.add(transaction)
+        record_transaction(transaction)
+        db.session.commit()
+        return transaction
+
+    def test_record_transaction_accumulates(self):
+        """Transactions in the same month and category share one rollup row."""
+        with app.app_context():
+            self.add_transaction('expense', '20.00', date(2024, 3, 1), self.category_id)
+            self.add_transaction('expense', '5.50', date(2024, 3, 28), self.category_id)
+
+            rows = MonthlyTotals.query.all()
+            self.assertEqual(len(rows), 1)
+            self.assertEqual(rows[0].total, Decimal('25.50'))
+            self.assertEqual(rows[0].count, 2)
+
+    def test_record_transaction_removal(self):
+        """Deleting a transaction takes it back out of the rollup."""
+        with app.app_context():
+            transaction = self.add_transaction('income', '100.00', date(2024, 1, 15))
+            record_transaction(transaction, sign=-1)
+            db.session.delete(transaction)
+            db.session.commit()
+
+            row = MonthlyTotals.query.one()
+            self.assertEqual(row.total, Decimal('0.00'))
+            self.assertEqual(row.count, 0)
+
+    def test_rebuild_matches_incremental(self):
+        """A rebuild from the transactions table gives the same monthly totals."""
+        with app.app_context():
+            self.add_transaction('income', '100.00', date(2024, 1, 15))
+            self.add_transaction('expense', '40.00', date(2024, 1, 20), self.category_id)
+            self.add_transaction('expense', '10.00', date(2024, 2, 2), self.category_id)
+            incremental = monthly_totals_by_type(self.user_id)
+
+            rebuild_monthly_totals(self.user_id)
+            db.session.commit()
+            rebuilt = monthly_totals_by_type(self.user_id)
+
+            self.assertEqual([tuple(row) for row in incremental], [tuple(row) for row in rebuilt])
+            self.assertEqual(len(monthly_totals_by_type(self.user_id, year=2024)), 3)
+
+if __name__ == '__main__':
+    unittest.main()
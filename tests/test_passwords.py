@@ -0,0 +1,95 @@
+import threading
+import unittest
+import bcrypt
+from flask import Flask
+from werkzeug.security import generate_password_hash
+from models import db, connect_db, User
+from passwords import PasswordHasher, PasswordHasherBusy, hash_method, password_hasher
+
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql:///wealthwatcher_test'
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['TESTING'] = True
+app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+app.config['PASSWORD_HASH_WORKERS'] = 2
+
+with app.app_context():
+    connect_db(app)
+    db.create_all()
+
+password_hasher.init_app(app)
+
+BCRYPT_HASH = bcrypt.hashpw(b'secret', bcrypt.gensalt(4)).decode('ascii')
+
+class PasswordHasherTestCase(unittest.TestCase):
+    def test_verifies_every_scheme(self):
+        with app.app_context():
+            for stored in [generate_password_hash('secret', method='scrypt:1024:8:1'),
+                           generate_password_hash('secret', method='pbkdf2:sha256:1000'),
+                           BCRYPT_HASH]:
+                self.assertTrue(password_hasher.verify(stored, 'secret'), stored)
+                self.assertFalse(password_hasher.verify(stored, 'wrong'), stored)
+
+            self.assertFalse(password_hasher.verify('not a hash', 'secret'))
+            self.assertFalse(password_hasher.verify(BCRYPT_HASH, 'x' * 100))
+
+    def test_hash_methods(self):
+        self.assertEqual(hash_method(BCRYPT_HASH), 'bcrypt:4')
+        with app.app_context():
+            self.assertEqual(hash_method(password_hasher.hash('secret')), 'pbkdf2:sha256:1000')
+            self.assertFalse(password_hasher.needs_rehash(password_hasher.hash('secret')))
+            self.assertTrue(password_hasher.needs_rehash(BCRYPT_HASH))
+            self.assertTrue(password_hasher.needs_rehash(generate_password_hash('secret', method='pbkdf2:sha256:2000')))
+
+        hasher = PasswordHasher(method='bcrypt:4', workers=0, max_pending=0)
+        self.assertTrue(hasher.verify(hasher.hash('secret'), 'secret'))
+
+    def test_busy_when_pool_is_full(self):
+        """Past workers + max_pending hashes in flight, callers are turned away instead of queued."""
+        hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=1, max_pending=0)
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+
+        caller = threading.Thread(target=hasher._call, args=(slow,))
+        caller.start()
+        started.wait(5)
+        try:
+            with self.assertRaises(PasswordHasherBusy):
+                hasher.hash('secret')
+        finally:
+            release.set()
+            caller.join(5)
+        self.assertTrue(hasher.hash('secret'))
+
+
+class RehashOnLoginTestCase(unittest.TestCase):
+    def setUp(self):
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            user = User(first_name="John", last_name="Doe", username="johndoe", email="john@example.com", password=BCRYPT_HASH)
+            db.session.add(user)
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_bcrypt_user_logs_in_and_is_upgraded(self):
+        with app.app_context():
+            self.assertIsNone(User.authentication('john@example.com', 'wrong'))
+            self.assertEqual(User.query.one().password, BCRYPT_HASH)
+
+            user = User.authentication('john@example.com', 'secret')
+            self.assertIsNotNone(user)
+            db.session.expire_all()
+            self.assertEqual(hash_method(User.query.one().password), 'pbkdf2:sha256:1000')
+            self.assertIsNotNone(User.authentication('john@example.com', 'secret'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+from datetime import date
+from decimal import Decimal
+from flask import Flask
+from models import db, connect_db, User, Accounts, Transactions
+from balance_snapshots import record_balance
+from reconcile import Drift, find_drift, repair_drift
+
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql:///wealthwatcher_test'
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['TESTING'] = True
+
+with app.app_context():
+    connect_db(app)
+    db.create_all()
+
+class ReconcileTestCase(unittest.TestCase):
+    def setUp(self):
+        """Two users, each with an account opened at 100."""
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+
+            self.user_ids = []
+            self.account_ids = []
+            for name in ("jane", "john"):
+                user = User(first_name=name, last_name="Doe", username=name, email=f"{name}@example.com", password="password")
+                db.session.add(user)
+                db.session.flush()
+                account = Accounts(name="Checking", account_type="checking", balance=100, opening_balance=100, user_id=user.id)
+                db.session.add(account)
+                db.session.flush()
+                self.user_ids.append(user.id)
+                self.account_ids.append(account.id)
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def add_transaction(self, account_id, user_id, type, amount):
+        transaction = Transactions(type=type, amount=Decimal(amount), date=date(2024, 5, 1),
+                                   account_id=account_id, user_id=user_id)
+        db.session.add(transaction)
+        record_balance(transaction)
+        db.session.commit()
+        return transaction
+
+    def test_writes_keep_balances_reconciled(self):
+        """Adding and deleting transactions moves the stored balance both ways."""
+        with app.app_context():
+            self.add_transaction(self.account_ids[0], self.user_ids[0], 'income', '40.00')
+            expense = self.add_transaction(self.account_ids[0], self.user_ids[0], 'expense', '15.00')
+            record_balance(expense, sign=-1)
+            db.session.delete(expense)
+            db.session.commit()
+
+            self.assertEqual(db.session.get(Accounts, self.account_ids[0]).balance, Decimal('140.00'))
+            self.assertEqual(list(find_drift()), [])
+
+    def test_reports_and_repairs_drift(self):
+        with app.app_context():
+            self.add_transaction(self.account_ids[0], self.user_ids[0], 'expense', '30.00')
+            # drift: a transaction the balance never saw, and a stored balance edited by hand
+            db.session.add(Transactions(type='income', amount=Decimal('5.00'), date=date(2024, 5, 2),
+                                        account_id=self.account_ids[0], user_id=self.user_ids[0]))
+            db.session.get(Accounts, self.account_ids[1]).balance = Decimal('90.00')
+            db.session.commit()
+
+            self.assertEqual(list(find_drift(batch_size=1)), [
+                Drift(self.account_ids[0], self.user_ids[0], Decimal('70.00'), Decimal('75.00')),
+                Drift(self.account_ids[1], self.user_ids[1], Decimal('90.00'), Decimal('100.00')),
+            ])
+            self.assertEqual(len(list(find_drift(user_id=self.user_ids[1]))), 1)
+
+            versions = [db.session.get(User, user_id).data_version for user_id in self.user_ids]
+            self.assertEqual(repair_drift(user_id=self.user_ids[0]), (1, 1))
+            db.session.commit()
+            db.session.expire_all()
+
+            self.assertEqual(db.session.get(Accounts, self.account_ids[0]).balance, Decimal('75.00'))
+            self.assertEqual(db.session.get(User, self.user_ids[0]).data_version, versions[0] + 1)
+            self.assertEqual(db.session.get(User, self.user_ids[1]).data_version, versions[1])
+            self.assertEqual([drift.account_id for drift in find_drift()], [self.account_ids[1]])
+
+            self.assertEqual(repair_drift(), (1, 1))
+            db.session.commit()
+            self.assertEqual(list(find_drift()), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+from flask import Flask
+from models import db, connect_db, User, Accounts
+from charts import accounts_balance_data
+from config import configure_database
+from data_version import bump_data_version
+from routing import init_replica, reading_from_replica
+
+# Two SQLite files stand in for the primary and its replica
+directory = tempfile.mkdtemp()
+
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(directory, 'primary.db')}"
+app.config['REPLICA_DATABASE_URL'] = f"sqlite:///{os.path.join(directory, 'replica.db')}"
+app.config['STATEMENT_TIMEOUT_MS'] = 15000
+app.config['REPLICA_STATEMENT_TIMEOUT_MS'] = 60000
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['TESTING'] = True
+configure_database(app.config)
+
+with app.app_context():
+    connect_db(app)
+    init_replica(app)
+
+class ReplicaRoutingTestCase(unittest.TestCase):
+    def setUp(self):
+        with app.app_context():
+            for engine in db.engine, app.extensions['replica_engine']:
+                db.metadata.drop_all(engine)
+                db.metadata.create_all(engine)
+
+            # The replica has replayed the user's version but the account balance differs,
+            # so each assertion shows which database answered
+            db.session.add(User(id=1, first_name="Jane", last_name="Doe", username="janedoe",
+                                email="jane@example.com", password="password"))
+            db.session.add(Accounts(id=1, name="Checking", account_type="checking", balance=100, user_id=1))
+            db.session.commit()
+
+            with app.extensions['replica_engine'].begin() as connection:
+                connection.execute(User.__table__.insert().values(
+                    id=1, first_name="Jane", last_name="Doe", username="janedoe", email="jane@example.com",
+                    password="password", data_version=0))
+                connection.execute(Accounts.__table__.insert().values(
+                    id=1, name="Checking", account_type="checking", balance=90, user_id=1))
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+
+    def test_chart_data_reads_current_replica(self):
+        """Chart data comes from the replica when it has the user's latest version."""
+        with app.app_context():
+            self.assertEqual(accounts_balance_data.uncached(1)['balances'], [90.0])
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        """A replica behind the user's data version is skipped."""
+        with app.app_context():
+            bump_data_version(1)
+            db.session.commit()
+
+            self.assertEqual(accounts_balance_data.uncached(1)['balances'], [100.0])
+
+    def test_writes_stay_on_primary(self):
+        """Writes inside a replica block, and reads after them, use the primary."""
+        with app.app_context():
+            with reading_from_replica():
+                account = db.session.get(Accounts, 1)
+                self.assertEqual(account.balance, 90)
+
+                db.session.add(Accounts(name="Savings", account_type="savings", balance=5, user_id=1))
+                db.session.flush()
+                self.assertEqual(db.session.query(Accounts).count(), 2)
+                db.session.commit()
+
+            with app.extensions['replica_engine'].connect() as connection:
+                self.assertEqual(connection.execute(Accounts.__table__.select()).all()[0].balance, 90)
+            self.assertEqual(db.session.query(Accounts).count(), 2)
+
+class NoReplicaTestCase(unittest.TestCase):
+    def test_no_replica_configured(self):
+        """Without REPLICA_DATABASE_URL nothing is bound and reads use the primary."""
+        config = {'SQLALCHEMY_DATABASE_URI': 'postgresql:///wealthwatcher_test',
+                  'STATEMENT_TIMEOUT_MS': 15000, 'REPLICA_STATEMENT_TIMEOUT_MS': 60000}
+        configure_database(config)
+
+        self.assertNotIn('REPLICA_ENGINE_OPTIONS', config)
+        self.assertEqual(config['SQLALCHEMY_ENGINE_OPTIONS']['connect_args'],
+                         {'options': '-c statement_timeout=15000'})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+from unittest import mock
+from datetime import date
+from decimal import Decimal
+from flask import Flask
+from models import db, connect_db, User, Accounts, Category, Transactions
+from search import search_transactions, prefix_query
+
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql:///wealthwatcher_test'
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['TESTING'] = True
+
+with app.app_context():
+    connect_db(app)
+    db.create_all()
+
+class SearchTestCase(unittest.TestCase):
+    def setUp(self):
+        """Two users; the first has two accounts with a spread of descriptions."""
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+
+            jane = User(first_name="Jane", last_name="Doe", username="janedoe", email="jane@example.com", password="password")
+            john = User(first_name="John", last_name="Doe", username="johndoe", email="john@example.com", password="password")
+            groceries = Category(name="Groceries")
+            db.session.add_all([jane, john, groceries])
+            db.session.flush()
+            checking = Accounts(name="Checking", account_type="checking", balance=0, user_id=jane.id)
+            savings = Accounts(name="Savings", account_type="savings", balance=0, user_id=jane.id)
+            other = Accounts(name="Checking", account_type="checking", balance=0, user_id=john.id)
+            db.session.add_all([checking, savings, other])
+            db.session.flush()
+
+            rows = [
+                ("Weekly groceries at Fresh Market", checking, groceries.id),
+                ("Groceries", savings, groceries.id),
+                ("Farmers market", checking, None),
+                ("Rent payment", checking, None),
+            ] + [(f"Coffee shop {n}", checking, None) for n in range(5)]
+            for day, (description, account, category_id) in enumerate(rows, start=1):
+                db.session.add(Transactions(type='expense', description=description, amount=Decimal('10.00'),
+                                            date=date(2024, 1, day), account_id=account.id,
+                                            user_id=jane.id, category_id=category_id))
+            db.session.add(Transactions(type='expense', description="Groceries", amount=Decimal('1.00'),
+                                        date=date(2024, 1, 1), account_id=other.id, user_id=john.id))
+            db.session.commit()
+
+            self.user_id = jane.id
+            self.savings_id = savings.id
+            self.category_id = groceries.id
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def descriptions(self, terms, **kwargs):
+        return [transaction.description for transaction in search_transactions(self.user_id, terms, **kwargs).items]
+
+    def pages(self, terms, per_page):
+        seen = []
+        page = search_transactions(self.user_id, terms, per_page=per_page)
+        while True:
+            seen += [transaction.description for transaction in page.items]
+            if not page.next_cursor:
+                return seen
+            page = search_transactions(self.user_id, terms, after=page.next_cursor, per_page=per_page)
+
+    def test_prefix_query(self):
+        self.assertEqual(prefix_query("Groc  mark!"), "groc:* & mark:*")
+        self.assertEqual(prefix_query("'; --"), "")
+
+    def test_prefix_and_stemmed_matches(self):
+        """Partial words and word forms match; other users' rows never do."""
+        with app.app_context():
+            self.assertCountEqual(self.descriptions("groc"), ["Weekly groceries at Fresh Market", "Groceries"])
+            self.assertEqual(self.descriptions("grocery market"), ["Weekly groceries at Fresh Market"])
+            self.assertCountEqual(self.descriptions("markets"), ["Weekly groceries at Fresh Market", "Farmers market"])
+            self.assertEqual(self.descriptions(""), [])
+
+    def test_filters(self):
+        with app.app_context():
+            self.assertEqual(self.descriptions("groceries", account_id=self.savings_id), ["Groceries"])
+            self.assertEqual(self.descriptions("market", category_id=self.category_id), ["Weekly groceries at Fresh Market"])
+
+    def test_keyset_pages(self):
+        """Equal ranks page by date and id, with no row skipped or repeated."""
+        with app.app_context():
+            self.assertEqual(self.pages("coffee", 2), [f"Coffee shop {n}" for n in reversed(range(5))])
+
+    def test_common_words_rank_newest_matches(self):
+        """Once the newest rows hold MAX_RANKED matches, only those are ranked on the first pages."""
+        with app.app_context():
+            with mock.patch('search.MAX_RANKED', 3):
+                self.assertCountEqual(self.descriptions("coffee", per_page=3),
+                                      ["Coffee shop 4", "Coffee shop 3", "Coffee shop 2"])
+                self.assertCountEqual(self.descriptions("groceries"), ["Weekly groceries at Fresh Market", "Groceries"])
+
+    def test_older_matches_of_common_words_are_reachable(self):
+        """Paging past the MAX_RANKED newest matches goes on to the older ones, none skipped or repeated."""
+        with app.app_context():
+            with mock.patch('search.MAX_RANKED', 3):
+                for per_page in (1, 2, 3, 10):
+                    self.assertEqual(self.pages("coffee", per_page), [f"Coffee shop {n}" for n in reversed(range(5))])
+
+    def test_undated_transactions(self):
+        """Rows without a date sort after dated ones of equal rank and page like any other."""
+        with app.app_context():
+            account_id = db.session.query(Accounts.id).filter_by(user_id=self.user_id).first()[0]
+            db.session.add(Transactions(type='expense', description="Coffee shop undated", amount=Decimal('3.00'),
+                                        date=None, account_id=account_id, user_id=self.user_id))
+            db.session.commit()
+
+            self.assertEqual(self.pages("coffee", 2),
+                             [f"Coffee shop {n}" for n in reversed(range(5))] + ["Coffee shop undated"])
+            with mock.patch('search.MAX_RANKED', 3):
+                self.assertCountEqual(self.pages("coffee", 2),
+                                      [f"Coffee shop {n}" for n in range(5)] + ["Coffee shop undated"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+from datetime import date
+from flask import Flask
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from models import db, connect_db, User, Accounts, Budgets, Transactions, MonthlyTotals
+from budget_spent import budget_spent_totals
+from synthetic import SeedPlan, seed
+
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql:///wealthwatcher_test'
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['TESTING'] = True
+
+with app.app_context():
+    connect_db(app)
+    db.create_all()
+
+PLAN = SeedPlan(users=3, years=1, transactions_per_month=20, seed=7, end_date=date(2025, 12, 31), chunk_size=100)
+
+def snapshot():
+    transactions = db.session.query(
+        Transactions.user_id, Transactions.account_id, Transactions.date, Transactions.type,
+        Transactions.description, Transactions.amount, Transactions.category_id
+    ).order_by(Transactions.id).all()
+    balances = db.session.query(Accounts.id, Accounts.balance).order_by(Accounts.id).all()
+    return transactions, balances
+
+class SyntheticSeedTestCase(unittest.TestCase):
+    def setUp(self):
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_same_seed_same_data(self):
+        """A seed and end date always produce the same rows."""
+        with app.app_context():
+            result = seed(PLAN)
+            db.session.commit()
+            first = snapshot()
+
+            db.session.close()
+            db.drop_all()
+            db.create_all()
+            seed(PLAN._replace(chunk_size=7))
+            db.session.commit()
+
+            self.assertEqual(result.users, 3)
+            self.assertEqual(result.transactions, len(first[0]))
+            self.assertEqual(snapshot(), first)
+
+    def test_derived_data_is_consistent(self):
+        """Budgets.spent and monthly_totals agree with the generated transactions."""
+        with app.app_context():
+            result = seed(PLAN)
+            db.session.commit()
+
+            self.assertEqual(db.session.query(User).count(), 3)
+            self.assertEqual(db.session.query(func.sum(MonthlyTotals.count)).scalar(), result.transactions)
+
+            expected = {row.budget_id: row.spent for row in db.session.execute(budget_spent_totals())}
+            for budget in Budgets.query.all():
+                self.assertEqual(budget.spent, expected[budget.id])
+            self.assertTrue(any(budget.spent for budget in Budgets.query.all()))
+
+            # The foreign keys dropped for the bulk load are back
+            with self.assertRaises(IntegrityError):
+                db.session.add(Transactions(type='expense', amount=1, date=date(2025, 1, 1), account_id=999999, user_id=1))
+                db.session.flush()
+            db.session.rollback()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import unittest
+from datetime import date
+from decimal import Decimal
+from flask import Flask
+from models import db, connect_db, User, Accounts, Category, Transactions
+from transaction_filters import SORTS, TransactionFilter, filtered_transactions
+
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql:///wealthwatcher_test'
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['TESTING'] = True
+
+with app.app_context():
+    connect_db(app)
+    db.create_all()
+
+class TransactionFilterTestCase(unittest.TestCase):
+    def setUp(self):
+        """Jane has ten transactions over two accounts and two categories; John has one."""
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+
+            jane = User(first_name="Jane", last_name="Doe", username="janedoe", email="jane@example.com", password="password")
+            john = User(first_name="John", last_name="Doe", username="johndoe", email="john@example.com", password="password")
+            groceries = Category(name="Groceries")
+            rent = Category(name="Rent")
+            db.session.add_all([jane, john, groceries, rent])
+            db.session.flush()
+            checking = Accounts(name="Checking", account_type="checking", balance=0, user_id=jane.id)
+            savings = Accounts(name="Savings", account_type="savings", balance=0, user_id=jane.id)
+            other = Accounts(name="Checking", account_type="checking", balance=0, user_id=john.id)
+            db.session.add_all([checking, savings, other])
+            db.session.flush()
+
+            for day in range(1, 11):
+                db.session.add(Transactions(
+                    type='income' if day % 5 == 0 else 'expense', amount=Decimal(day * 10),
+                    date=date(2024, 1, day), account_id=(savings if day > 8 else checking).id, user_id=jane.id,
+                    category_id=groceries.id if day % 2 else (rent.id if day < 9 else None)))
+            db.session.add(Transactions(type='expense', amount=Decimal('5.00'), date=date(2024, 1, 1),
+                                        account_id=other.id, user_id=john.id, category_id=groceries.id))
+            db.session.commit()
+
+            self.user_id = jane.id
+            self.savings_id = savings.id
+            self.groceries_id = groceries.id
+            self.rent_id = rent.id
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def amounts(self, **kwargs):
+        page = filtered_transactions(self.user_id, TransactionFilter(**kwargs), per_page=100)
+        return [int(transaction.amount) for transaction in page.items]
+
+    def test_filters_combine(self):
+        with app.app_context():
+            self.assertEqual(self.amounts(), [100, 90, 80, 70, 60, 50, 40, 30, 20, 10])
+            self.assertEqual(self.amounts(type='income'), [100, 50])
+            self.assertEqual(self.amounts(account_id=self.savings_id), [100, 90])
+            self.assertEqual(self.amounts(category_id=self.groceries_id, start=date(2024, 1, 3), end=date(2024, 1, 7)), [70, 50, 30])
+            self.assertEqual(self.amounts(type='expense', min_amount=Decimal('30'), max_amount=Decimal('60')), [60, 40, 30])
+            self.assertEqual(self.amounts(sort='largest', max_amount=Decimal('45')), [40, 30, 20, 10])
+            self.assertEqual(self.amounts(sort='smallest', category_id=self.rent_id), [20, 40, 60, 80])
+
+    def test_pages_in_both_directions(self):
+        """Cursors follow the sort order, forwards and back, with no row skipped or repeated."""
+        with app.app_context():
+            transaction_filter = TransactionFilter(sort='smallest')
+            pages = [filtered_transactions(self.user_id, transaction_filter, per_page=4)]
+            while pages[-1].next_cursor:
+                pages.append(filtered_transactions(self.user_id, transaction_filter, after=pages[-1].next_cursor, per_page=4))
+            self.assertEqual([[int(t.amount) for t in page.items] for page in pages],
+                             [[10, 20, 30, 40], [50, 60, 70, 80], [90, 100]])
+            self.assertIsNone(pages[0].prev_cursor)
+
+            back = filtered_transactions(self.user_id, transaction_filter, before=pages[-1].prev_cursor, per_page=4)
+            self.assertEqual([int(t.amount) for t in back.items], [50, 60, 70, 80])
+            self.assertEqual((back.next_cursor, back.prev_cursor), (pages[1].next_cursor, pages[1].prev_cursor))
+
+    def test_rows_without_a_date_or_amount(self):
+        """Undated rows and rows without an amount sort past every value and page like any other."""
+        with app.app_context():
+            checking_id = Transactions.query.filter_by(user_id=self.user_id).first().account_id
+            db.session.add_all([
+                Transactions(type='expense', amount=Decimal('15.00'), date=None, account_id=checking_id, user_id=self.user_id),
+                Transactions(type='expense', amount=None, date=date(2024, 1, 4), account_id=checking_id, user_id=self.user_id),
+                Transactions(type='expense', amount=None, date=None, account_id=checking_id, user_id=self.user_id),
+            ])
+            db.session.commit()
+            everything = {transaction.id for transaction in Transactions.query.filter_by(user_id=self.user_id)}
+
+            for sort in SORTS:
+                transaction_filter = TransactionFilter(sort=sort)
+                pages = [filtered_transactions(self.user_id, transaction_filter, per_page=2)]
+                while pages[-1].next_cursor and len(pages) <= len(everything):
+                    pages.append(filtered_transactions(self.user_id, transaction_filter, after=pages[-1].next_cursor, per_page=2))
+                forwards = [transaction.id for page in pages for transaction in page.items]
+                self.assertEqual(len(forwards), len(everything), sort)
+                self.assertEqual(set(forwards), everything, sort)
+
+                backwards = []
+                page = pages[-1]
+                while page.prev_cursor and len(backwards) <= len(everything):
+                    page = filtered_transactions(self.user_id, transaction_filter, before=page.prev_cursor, per_page=2)
+                    backwards = [transaction.id for transaction in page.items] + backwards
+                self.assertEqual(backwards + [transaction.id for transaction in pages[-1].items], forwards, sort)
+
+            newest = filtered_transactions(self.user_id, TransactionFilter(), per_page=2)
+            self.assertEqual([transaction.date for transaction in newest.items], [None, None])
+            self.assertEqual(newest.next_cursor.rsplit('.', 1)[0], '9999-12-31')
+
+    def test_count_and_subtotals(self):
+        """Aggregates cover every match, not just the page, and survive a page past the end."""
+        with app.app_context():
+            page = filtered_transactions(self.user_id, TransactionFilter(), per_page=2, with_subtotals=True)
+            self.assertEqual(page.total, 10)
+            self.assertEqual(page.subtotals, [
+                (self.groceries_id, 5, Decimal('50.00'), Decimal('200.00')),
+                (self.rent_id, 4, Decimal('0'), Decimal('200.00')),
+                (None, 1, Decimal('100.00'), Decimal('0')),
+            ])
+
+            page = filtered_transactions(self.user_id, TransactionFilter(type='income'), with_count=True)
+            self.assertEqual((page.total, page.subtotals), (2, None))
+
+            past_end = filtered_transactions(self.user_id, TransactionFilter(), after='2023-12-31.0', with_count=True)
+            self.assertEqual((past_end.items, past_end.total), ([], 10))
+
+            plain = filtered_transactions(self.user_id, TransactionFilter(), per_page=2)
+            self.assertEqual((plain.total, plain.subtotals), (None, None))
+
+    def test_from_args(self):
+        self.assertEqual(TransactionFilter.from_args({}), TransactionFilter())
+        transaction_filter = TransactionFilter.from_args({'start': '2024-01-01', 'type': 'income', 'account_id': '3',
+                                                          'min_amount': '9.50', 'sort': 'largest', 'end': ''})
+        self.assertEqual(transaction_filter, TransactionFilter(start=date(2024, 1, 1), type='income', account_id=3,
+                                                               min_amount=Decimal('9.50'), sort='largest'))
+        self.assertEqual(TransactionFilter.from_args(transaction_filter.to_args()), transaction_filter)
+
+        for args in [{'start': 'yesterday'}, {'type': 'transfer'}, {'min_amount': 'NaN'},
+                     {'max_amount': 'ten'}, {'sort': 'random'}, {'account_id': 'x'}]:
+            with self.assertRaises(ValueError):
+                TransactionFilter.from_args(args)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,279 @@
+"""Filtered listings of a user's transactions.
+
+A `TransactionFilter` narrows the list by date range, type, account,
+category and amount range, and picks a sort order. `filtered_transactions`
+turns it into one statement that returns a keyset page and, when asked, the
+number of matching transactions and their per-category subtotals. The
+aggregates are a one-row subquery the page is outer-joined to, so they come
+back in the same round trip, even for a page past the last row.
+
+Every combination of filters has an index to read: the equality filters
+match an index's leading columns and the sort column comes next, so most
+pages are read in index order and stop after per_page + 1 rows. Amount
+sorts read (user_id, amount). `serving_indexes` lists the indexes that fit
+a filter and verify_indexes.py checks the planner picks one of them.
+
+Dates and amounts may be NULL. Such rows sort as if they held the largest
+value (where Postgres puts NULLs, so the indexes still return rows in order)
+and their cursors carry that value as a stand-in.
+
+Amounts travel as text so they come back as exact Decimals.
+"""
+from collections import namedtuple
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from itertools import takewhile
+
+from sqlalchemy import Integer, Text, and_, cast, func, null, or_, select, true, tuple_
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import aliased
+
+from models import db, Transactions
+from pagination import DEFAULT_PER_PAGE, decode_cursor, encode_cursor
+
+
+# name: (column, descending, how a cursor's value is parsed back)
+SORTS = {
+    'newest': (Transactions.date, True, date.fromisoformat),
+    'oldest': (Transactions.date, False, date.fromisoformat),
+    'largest': (Transactions.amount, True, Decimal),
+    'smallest': (Transactions.amount, False, Decimal),
+}
+DEFAULT_SORT = 'newest'
+# what a NULL sort key is coalesced to in cursors: past every real value
+NULL_KEYS = {
+    Transactions.date.key: date.max,
+    Transactions.amount.key: Decimal('Infinity'),
+}
+TYPES = ('income', 'expense')
+
+FilteredPage = namedtuple('FilteredPage', 'items next_cursor prev_cursor per_page total subtotals')
+Subtotal = namedtuple('Subtotal', 'category_id count income expenses')
+
+
+def _amount(value):
+    amount = Decimal(value)
+    if not amount.is_finite():
+        raise ValueError(value)
+    return amount
+
+
+def _arg(args, name, parse, message):
+    value = args.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        return parse(value)
+    except (ValueError, InvalidOperation):
+        raise ValueError(message)
+
+
+class TransactionFilter(namedtuple('TransactionFilter',
+                                   'start end type account_id category_id min_amount max_amount sort',
+                                   defaults=(None,) * 7 + (DEFAULT_SORT,))):
+    """What a transaction listing is narrowed to; None means no restriction."""
+
+    __slots__ = ()
+
+    @classmethod
+    def from_args(cls, args):
+        """Build a filter from request args. Raises ValueError with a message fit for the user."""
+
+        type = args.get('type') or None
+        if type is not None and type not in TYPES:
+            raise ValueError(f"Type must be one of {', '.join(TYPES)}.")
+        sort = args.get('sort') or DEFAULT_SORT
+        if sort not in SORTS:
+            raise ValueError(f"Sort must be one of {', '.join(SORTS)}.")
+
+        return cls(
+            start=_arg(args, 'start', date.fromisoformat, "Dates must be given as YYYY-MM-DD."),
+            end=_arg(args, 'end', date.fromisoformat, "Dates must be given as YYYY-MM-DD."),
+            type=type,
+            account_id=_arg(args, 'account_id', int, "Account must be an id."),
+            category_id=_arg(args, 'category_id', int, "Category must be an id."),
+            min_amount=_arg(args, 'min_amount', _amount, "Amounts must be numbers."),
+            max_amount=_arg(args, 'max_amount', _amount, "Amounts must be numbers."),
+            sort=sort,
+        )
+
+    def to_args(self):
+        """The filter as request args, for links to other pages of the same listing."""
+
+        return {name: str(value) for name, value in self._asdict().items()
+                if value is not None and not (name == 'sort' and value == DEFAULT_SORT)}
+
+
+def filter_conditions(user_id, transaction_filter):
+    conditions = [Transactions.user_id == user_id]
+    if transaction_filter.account_id is not None:
+        conditions.append(Transactions.account_id == transaction_filter.account_id)
+    if transaction_filter.category_id is not None:
+        conditions.append(Transactions.category_id == transaction_filter.category_id)
+    if transaction_filter.type is not None:
+        conditions.append(Transactions.type == transaction_filter.type)
+    if transaction_filter.start is not None:
+        conditions.append(Transactions.date >= transaction_filter.start)
+    if transaction_filter.end is not None:
+        conditions.append(Transactions.date <= transaction_filter.end)
+    if transaction_filter.min_amount is not None:
+        conditions.append(Transactions.amount >= transaction_filter.min_amount)
+    if transaction_filter.max_amount is not None:
+        conditions.append(Transactions.amount <= transaction_filter.max_amount)
+    return conditions
+
+
+def serving_indexes(transaction_filter):
+    """Names of the transactions indexes that can serve a listing with this filter.
+
+    An index serves it when its leading columns are all compared for
+    equality (user_id always is) and it then either returns the rows in the
+    sort order, narrows them by a further filter, or scans a filtered range.
+    """
+
+    equal = {'user_id'} | {name for name in ('account_id', 'category_id', 'type')
+                           if getattr(transaction_filter, name) is not None}
+    ranged = set()
+    if transaction_filter.start is not None or transaction_filter.end is not None:
+        ranged.add('date')
+    if transaction_filter.min_amount is not None or transaction_filter.max_amount is not None:
+        ranged.add('amount')
+    sort_column = SORTS[transaction_filter.sort][0].key
+
+    names = set()
+    for index in Transactions.__table__.indexes:
+        columns = [column.key for column in index.columns]
+        prefix = list(takewhile(lambda column: column in equal, columns))
+        following = columns[len(prefix):len(prefix) + 1]
+        if prefix and (following == [sort_column] or ranged & set(following) or set(prefix) - {'user_id'}):
+            names.add(index.name)
+    return names
+
+
+def sort_order(column, row_id, descending):
+    """ORDER BY clauses for (column, id), NULLs ranking above every value."""
+
+    if descending:
+        return [column.desc().nulls_first(), row_id.desc()]
+    return [column.asc().nulls_last(), row_id.asc()]
+
+
+def past_cursor(column, cursor, descending):
+    """Rows after `cursor` in the sort order; a None key is a NULL row's position.
+
+    Spelled out rather than compared as coalesced tuples, so a non-NULL
+    cursor is still a range on the index.
+    """
+
+    key, row_id = cursor
+    if key is None:
+        nulls_past = and_(column.is_(None), Transactions.id < row_id if descending else Transactions.id > row_id)
+        return or_(nulls_past, column.is_not(None)) if descending else nulls_past
+
+    keyset = tuple_(column, Transactions.id)
+    if descending:
+        return keyset < tuple_(key, row_id)
+    return or_(keyset > tuple_(key, row_id), column.is_(None))
+
+
+def filter_statement(user_id, transaction_filter, cursor=None, backwards=False, per_page=DEFAULT_PER_PAGE):
+    """Up to per_page + 1 matching transactions past `cursor` in the filter's sort order.
+
+    Paging backwards returns the rows before the cursor, nearest first.
+    """
+
+    column, descending, _ = SORTS[transaction_filter.sort]
+    descending = descending != backwards
+    statement = select(Transactions).where(*filter_conditions(user_id, transaction_filter))
+
+    if cursor:
+        statement = statement.where(past_cursor(column, cursor, descending))
+    return statement.order_by(*sort_order(column, Transactions.id, descending)).limit(per_page + 1)
+
+
+def _decode(value, column, parse):
+    cursor = decode_cursor(value, parse)
+    if cursor is not None and cursor[0] == NULL_KEYS[column.key]:
+        return None, cursor[1]
+    return cursor
+
+
+def summary_statement(user_id, transaction_filter, with_subtotals=True):
+    """One row: the number of matching transactions and, optionally, their per-category subtotals."""
+
+    conditions = filter_conditions(user_id, transaction_filter)
+    if not with_subtotals:
+        return select(func.count().label('total'), null().label('subtotals')).where(*conditions)
+
+    zero = cast(0, Transactions.amount.type)
+    by_category = select(
+        Transactions.category_id,
+        func.count().label('count'),
+        func.coalesce(func.sum(Transactions.amount).filter(Transactions.type == 'income'), zero).label('income'),
+        func.coalesce(func.sum(Transactions.amount).filter(Transactions.type == 'expense'), zero).label('expenses'),
+    ).where(*conditions).group_by(Transactions.category_id).subquery('by_category')
+
+    subtotals = func.json_agg(aggregate_order_by(
+        func.json_build_array(by_category.c.category_id, by_category.c.count,
+                              cast(by_category.c.income, Text), cast(by_category.c.expenses, Text)),
+        by_category.c.category_id.asc().nulls_last()
+    ))
+    return select(
+        cast(func.coalesce(func.sum(by_category.c.count), 0), Integer).label('total'),
+        func.coalesce(subtotals, func.json_build_array()).label('subtotals'),
+    ).select_from(by_category)
+
+
+def filtered_transactions(user_id, transaction_filter=TransactionFilter(), after=None, before=None,
+                          per_page=DEFAULT_PER_PAGE, with_count=False, with_subtotals=False):
+    """One page of the user's transactions matching the filter, plus the aggregates asked for.
+
+    `after` moves further along the sort order, `before` back towards its
+    start. `total` and `subtotals` are None unless requested; asking for
+    subtotals gives the total too, since it is their sum.
+    """
+
+    column, descending, parse = SORTS[transaction_filter.sort]
+    before_key = _decode(before, column, parse)
+    after_key = _decode(after, column, parse)
+    backwards = before_key is not None
+
+    page = filter_statement(user_id, transaction_filter, before_key if backwards else after_key,
+                            backwards, per_page).subquery('page')
+    row = aliased(Transactions, page)
+    row_order = sort_order(getattr(row, column.key), row.id, descending != backwards)
+
+    if with_count or with_subtotals:
+        summary = summary_statement(user_id, transaction_filter, with_subtotals).subquery('summary')
+        statement = select(row, summary.c.total, summary.c.subtotals) \
+            .select_from(summary).outerjoin(page, true())
+    else:
+        statement = select(row, null(), null())
+    results = db.session.execute(statement.order_by(*row_order)).all()
+
+    rows = [transaction for transaction, _, _ in results if transaction is not None]
+    total, subtotals = (results[0][1], results[0][2]) if results else (None, None)
+
+    has_more = len(rows) > per_page
+    items = rows[:per_page]
+    if backwards:
+        items.reverse()
+        has_previous, has_next = has_more, True
+    else:
+        has_previous, has_next = after_key is not None, has_more
+
+    def cursor(transaction):
+        key = getattr(transaction, column.key)
+        return encode_cursor(NULL_KEYS[column.key] if key is None else key, transaction.id)
+
+    return FilteredPage(
+        items,
+        next_cursor=cursor(items[-1]) if items and has_next else None,
+        prev_cursor=cursor(items[0]) if items and has_previous else None,
+        per_page=per_page,
+        total=total,
+        subtotals=None if subtotals is None else [
+            Subtotal(category_id, count, Decimal(income), Decimal(expenses))
+            for category_id, count, income, expenses in subtotals
+        ],
+    )
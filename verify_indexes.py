@@ -0,0 +1,194 @@
+"""Check that the hot per-user queries are served by an index.
+
+Runs EXPLAIN on the statements each route issues, built with the same
+helpers the routes call, and fails if a plan does not touch the index the
+query is designed for. The plans are made against a scratch copy of the
+schema holding a fixed fixture (two users with three years of history), which
+is ANALYZEd first and rolled back afterwards, so the result is the same on an
+empty database and on a full one. Sequential scans are disabled for the
+check: we only want to know that a usable index exists for the access path.
+Bitmap scans are off too: they cost the same through any index that leads on
+user_id, which hides whether the one that also returns the rows in order
+exists.
+
+    python verify_indexes.py
+"""
+import sys
+from datetime import date, timedelta
+
+from sqlalchemy import select, text
+
+from app import app
+from balance_snapshots import balance_before, rebuild_balance_snapshots
+from budget_spent import budget_spent_totals, recompute_budget_spent
+from charts import account_balance_statement, accounts_balance_statement
+from dashboard import dashboard_statement
+from models import db, Accounts, Budgets, Category, Goals, User
+from monthly_totals import monthly_totals_statement, rebuild_monthly_totals
+from transaction_filters import TransactionFilter, filter_statement, serving_indexes
+
+
+SCHEMA = 'verify_indexes'
+FIXTURE_USERS = 2
+FIXTURE_ACCOUNTS = 3
+FIXTURE_TRANSACTIONS = 20000
+FIXTURE_CATEGORIES = ['Groceries', 'Rent', 'Utilities', 'Transport', 'Dining', 'Health', 'Entertainment', 'Travel']
+
+
+def route_queries(user_id=1, account_id=1, category_id=1, budget_id=1, day=None):
+    """(route, description, statement, expected index names) for each hot query.
+
+    A plan passes when it uses one of the expected indexes. A statement with
+    several sections (the dashboard) is listed once per section.
+    """
+
+    day = day or date.today()
+    dashboard = dashboard_statement(user_id)
+
+    return [
+        ('/main-page', 'account totals', dashboard, {'ix_accounts_user_id'}),
+        ('/main-page', 'monthly totals', dashboard, {'ix_monthly_totals_user_id_year_month'}),
+        ('/main-page', 'recent transactions', dashboard, {'ix_transactions_user_id_date'}),
+        ('/account', 'accounts',
+         select(Accounts).where(Accounts.user_id == user_id),
+         {'ix_accounts_user_id'}),
+        ('/budget', 'budgets',
+         select(Budgets).where(Budgets.user_id == user_id),
+         {'ix_budgets_user_id_category_id_dates'}),
+        ('/goal', 'goals',
+         select(Goals).where(Goals.user_id == user_id),
+         {'ix_goals_user_id'}),
+        ('/api/charts', 'financials',
+         monthly_totals_statement(user_id),
+         {'ix_monthly_totals_user_id_year_month'}),
+        ('/api/charts', 'accounts-balance',
+         accounts_balance_statement(user_id),
+         {'ix_accounts_user_id'}),
+        ('/api/charts', 'account-balance',
+         account_balance_statement(user_id),
+         {'account_balance_snapshots_pkey'}),
+    ] + [
+        ('/transaction', description, filter_statement(user_id, transaction_filter),
+         serving_indexes(transaction_filter))
+        for description, transaction_filter in [
+            ('transactions', TransactionFilter()),
+            ('by date range', TransactionFilter(start=day.replace(day=1), end=day)),
+            ('by type', TransactionFilter(type='expense')),
+            ('by account', TransactionFilter(account_id=account_id, type='income')),
+            ('by category', TransactionFilter(category_id=category_id, start=day.replace(day=1))),
+            ('by amount', TransactionFilter(min_amount=10, max_amount=100)),
+            ('largest first', TransactionFilter(sort='largest', type='expense')),
+            ('by category, largest', TransactionFilter(sort='largest', category_id=category_id)),
+        ]
+    ] + [
+        ('/transaction/add', 'active budget',
+         select(Budgets).where(Budgets.category_id == category_id,
+                               Budgets.start_date <= day,
+                               Budgets.end_date >= day,
+                               Budgets.user_id == user_id).limit(1),
+         {'ix_budgets_user_id_category_id_dates'}),
+        ('/transaction/add', 'balance before',
+         select(balance_before(account_id, day)),
+         {'account_balance_snapshots_pkey'}),
+        ('/budget/set', 'budget spent',
+         budget_spent_totals(budget_id=budget_id),
+         {'ix_transactions_user_id_category_id_date'}),
+    ]
+
+
+def load_fixture(today=None):
+    """Fill the (scratch) tables with the users, accounts, budgets and
+    transactions the checks are planned against, then ANALYZE them."""
+
+    today = today or date.today()
+    start = today - timedelta(days=3 * 365)
+
+    db.session.add_all([Category(name=name) for name in FIXTURE_CATEGORIES])
+    db.session.add_all([User(id=user_id, first_name="Index", last_name="Check", username=f"check{user_id}",
+                             email=f"check{user_id}@example.com", password="not-a-real-hash")
+                        for user_id in range(1, FIXTURE_USERS + 1)])
+    db.session.flush()
+
+    for user_id in range(1, FIXTURE_USERS + 1):
+        db.session.add_all([Accounts(name=f"Account {n}", account_type=('checking', 'savings', 'credit')[n % 3],
+                                     balance=0, opening_balance=0, user_id=user_id)
+                            for n in range(FIXTURE_ACCOUNTS)])
+        db.session.add_all([Budgets(category_name=name, amount=500, spent=0, category_id=category_id,
+                                    start_date=today.replace(month=1, day=1), end_date=today.replace(month=12, day=31),
+                                    user_id=user_id)
+                            for category_id, name in enumerate(FIXTURE_CATEGORIES, 1)])
+        db.session.add_all([Goals(name=f"Goal {n}", target_amount=1000, user_id=user_id) for n in range(2)])
+    db.session.flush()
+
+    # Every tenth transaction is income; dates advance evenly up to today
+    db.session.execute(text("""
+        INSERT INTO transactions (type, description, amount, date, account_id, user_id, category_id)
+        SELECT
+            CASE WHEN n % 10 = 0 THEN 'income' ELSE 'expense' END,
+            'Transaction ' || n,
+            CASE WHEN n % 10 = 0 THEN 1500 + (n * 37) % 1000 ELSE 1 + ((n * 7919) % 20000) / 100.0 END,
+            CAST(:start AS date) + (n * (:today - CAST(:start AS date)) / :transactions)::int,
+            (user_id - 1) * :accounts + 1 + n % :accounts,
+            user_id,
+            CASE WHEN n % 10 = 0 THEN NULL ELSE 1 + (n * 31) % :categories END
+        FROM generate_series(1, :users) AS user_id, generate_series(1, :transactions) AS n
+    """), {'start': start, 'today': today, 'transactions': FIXTURE_TRANSACTIONS, 'users': FIXTURE_USERS,
+           'accounts': FIXTURE_ACCOUNTS, 'categories': len(FIXTURE_CATEGORIES)})
+
+    rebuild_monthly_totals()
+    rebuild_balance_snapshots()
+    recompute_budget_spent()
+    db.session.execute(text('ANALYZE'))
+
+
+def plan_indexes(node):
+    """Collect every index name referenced in an EXPLAIN (FORMAT JSON) plan node."""
+
+    names = set()
+    if 'Index Name' in node:
+        names.add(node['Index Name'])
+    for child in node.get('Plans', []):
+        names |= plan_indexes(child)
+    return names
+
+
+def explain_indexes(connection, statement):
+    compiled = statement.compile(dialect=connection.dialect)
+    result = connection.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + str(compiled), compiled.params)
+    plan = result.scalar()
+    return plan_indexes(plan[0]['Plan'])
+
+
+def verify():
+    failures = 0
+
+    with app.app_context():
+        try:
+            # Unqualified names resolve to the scratch tables first; public stays
+            # on the path for extensions such as pg_trgm. Everything is rolled back.
+            db.session.execute(text(f'CREATE SCHEMA {SCHEMA}'))
+            db.session.execute(text(f'SET LOCAL search_path = {SCHEMA}, public'))
+            db.metadata.create_all(db.session.connection(), checkfirst=False)
+            load_fixture()
+
+            connection = db.session.connection()
+            connection.execute(text('SET LOCAL enable_seqscan = off'))
+            connection.execute(text('SET LOCAL enable_bitmapscan = off'))
+
+            for route, description, statement, expected in route_queries():
+                used = explain_indexes(connection, statement)
+                ok = bool(used & expected)
+                failures += not ok
+                status = 'ok  ' if ok else 'FAIL'
+                print(f"{status} {route:<18} {description:<22} uses {', '.join(sorted(used)) or 'no index'}")
+        finally:
+            db.session.rollback()
+
+    return failures
+
+
+if __name__ == '__main__':
+    failed = verify()
+    if failed:
+        print(f"{failed} quer{'y' if failed == 1 else 'ies'} not index-backed.")
+    sys.exit(1 if failed else 0)